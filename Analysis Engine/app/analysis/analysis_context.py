@@ -0,0 +1,41 @@
+import pandas as pd
+from app.service.data_processing_service import normalize_transaction
+from app.history.group_statistics import GroupStatistics
+from app.history.history_store import HistorySnapshot
+
+
+class AnalysisContext:
+    """Request scoped state shared by the transaction and customer analyses of one transaction."""
+
+    def __init__(self, transaction, history: HistorySnapshot = None, df: pd.DataFrame = None):
+        self.transaction = normalize_transaction(transaction)
+        self.history = history
+        self.df = df if df is not None else (history.df if history is not None else None)
+        self.group_statistics = history.group_statistics if history is not None else None
+        self.group_percentiles = history.group_percentiles if history is not None else None
+
+        self._customer_df = None
+        self._amount_statistics = {}
+
+    @property
+    def customer_df(self) -> pd.DataFrame:
+        # the account slice is the most expensive part of either analysis, it is cut once per request
+        if self._customer_df is None:
+            account_no = self.transaction['ACCOUNTNO']
+            if self.history is not None:
+                self._customer_df = self.history.account_history(account_no)
+            elif self.df is not None:
+                self._customer_df = self.df[self.df["ACCOUNTNO"] == account_no].copy()
+            else:
+                self._customer_df = pd.DataFrame()
+        return self._customer_df
+
+    def amount_statistics(self, column=None):
+        if column not in self._amount_statistics:
+            if self.group_statistics is not None:
+                stats = self.group_statistics.get(GroupStatistics.POPULATION) if column is None else self.group_statistics.get(column, self.transaction[column])
+            else:
+                data = self.df[self.df[column] == self.transaction[column]] if column is not None else self.df
+                stats = GroupStatistics.describe(data['AMOUNTINBIRR'])
+            self._amount_statistics[column] = stats
+        return self._amount_statistics[column]
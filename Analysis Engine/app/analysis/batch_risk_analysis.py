@@ -0,0 +1,428 @@
+import bisect
+import numpy as np
+import pandas as pd
+from app.service.data_processing_service import preprocessing
+from app.history.group_statistics import GroupStatistics
+from app.history.history_store import HistorySnapshot
+from app.history.beneficiary_index import to_datetime64
+from app.history.history_compaction import completeness_ratio, completeness_ratios
+from app.analysis.transaction_risk_analysis import TransactionRiskAnalysis
+from app.analysis.customer_risk_analysis import CustomerRiskAnalysis
+from app.analysis.risk_formulas import (z_score, turnover_ratio, digit_distribution, peer_profile, time_gaps,
+                                        screening_report, pep_report, demographics_report)
+from app.service.analysis_settings_service import analysis_settings
+
+
+def prefix_moments(amounts: np.ndarray, shift: float) -> np.ndarray:
+    # cumulative sum, non-missing count and the first two moments around shift, one row per prefix length
+    valid = ~np.isnan(amounts)
+    centered = np.where(valid, amounts - shift, 0.0)
+    moments = np.column_stack((np.where(valid, amounts, 0.0), valid, centered, centered ** 2))
+    return np.vstack((np.zeros((1, 4)), np.cumsum(moments, axis=0)))
+
+
+def moments_variance(moments: np.ndarray) -> np.ndarray:
+    count, s1, s2 = moments[:, 1], moments[:, 2], moments[:, 3]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (s2 - s1 ** 2 / count) / (count - 1)
+    return np.where(count > 1, np.maximum(variance, 0.0), np.nan)
+
+
+class BatchRiskAnalysis:
+    """Transaction and customer risk reports for a batch of transactions, computed column-wise over the batch."""
+
+    WINDOW_HOURS = TransactionRiskAnalysis.WINDOW_HOURS
+    POSITION = "BATCH_POSITION"
+
+    def __init__(self, transactions: pd.DataFrame, history: HistorySnapshot):
+        self.history = history
+        self.group_statistics = history.group_statistics
+        self.group_percentiles = history.group_percentiles
+
+        df = transactions.reset_index(drop=True).copy()
+        df[self.POSITION] = np.arange(len(df))
+        df = preprocessing(df)
+
+        # the batch is scored in TIMESTAMP order, every transaction sees the ones of its account posted before it
+        df = df.sort_values(by=["TIMESTAMP", self.POSITION], kind="stable").reset_index(drop=True)
+        self.positions = df.pop(self.POSITION).to_numpy()
+        self.transactions = df
+
+        self.timestamps = to_datetime64(df["TIMESTAMP"])
+        self.amounts = pd.to_numeric(df["AMOUNTINBIRR"], errors="coerce").to_numpy(dtype=float)
+        self.accounts = df.groupby("ACCOUNTNO", sort=False).indices
+        self.beneficiaries = df.groupby("BENACCOUNTNO", sort=False).indices
+        self.account_histories = {account: history.account_history(account) for account in self.accounts}
+
+        # number of transactions of the same account earlier in the batch
+        self.earlier = df.groupby("ACCOUNTNO", sort=False).cumcount().to_numpy()
+
+        self.transaction_analysis = TransactionRiskAnalysis(None)
+        self.customer_analysis = CustomerRiskAnalysis(None, None)
+
+    def __len__(self):
+        return len(self.transactions)
+
+    @staticmethod
+    def _as_list(values):
+        # plain python values, the reports are serialized and stored as they are
+        return values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+    def _reports(self, registry, columns, enabled):
+        # only the enabled features are computed, the registry fills in the defaults of the others
+        values = {key: self._as_list(column()) for key, column in columns.items() if key in enabled}
+        return [registry.complete({key: column[row] for key, column in values.items()}) for row in range(len(self))]
+
+    def _in_batch_order(self, rows):
+        ordered = [None] * len(rows)
+        for row, position in zip(rows, self.positions):
+            ordered[position] = row
+        return ordered
+
+    @staticmethod
+    def _history_amounts(history):
+        if history.empty or 'AMOUNTINBIRR' not in history.columns:
+            return np.array([], dtype=float)
+        return pd.to_numeric(history['AMOUNTINBIRR'], errors='coerce').to_numpy(dtype=float)
+
+    @staticmethod
+    def _shift(*amounts):
+        # moments are taken around the first amount so a run of equal amounts has exactly zero variance
+        for values in amounts:
+            values = values[~np.isnan(values)]
+            if len(values):
+                return float(values[0])
+        return 0.0
+
+    def _account_features(self, turnover=True):
+        n = len(self)
+        features = {hours: {"sum": np.zeros(n), "count": np.zeros(n, dtype=int), "variance": np.full(n, np.nan)} for hours in self.WINDOW_HOURS}
+        features.update({
+            "z_individual": np.zeros(n),
+            "debit": {hours: np.full(n, np.nan) for hours in self.WINDOW_HOURS},
+        })
+
+        for account, rows in self.accounts.items():
+            history = self.account_histories[account]
+            h_amounts = self._history_amounts(history)
+            if 'TIMESTAMP' in history.columns and not history.empty:
+                h_times = to_datetime64(history['TIMESTAMP'])
+            else:
+                h_times = np.array([], dtype="datetime64[ns]")
+            timed = ~np.isnat(h_times)
+            h_times, h_timed_amounts = h_times[timed], h_amounts[timed]
+
+            b_times, b_amounts = self.timestamps[rows], self.amounts[rows]
+            shift = self._shift(h_amounts, b_amounts)
+
+            h_total = prefix_moments(h_amounts, shift)[-1]
+            h_prefix = prefix_moments(h_timed_amounts, shift)
+            b_prefix = prefix_moments(b_amounts, shift)
+            k = np.arange(len(rows))
+
+            # z-score against everything the account did before, whatever its timestamp
+            moments = h_total + b_prefix[k]
+            count = moments[:, 1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = shift + moments[:, 2] / count
+                std = np.sqrt(moments_variance(moments))
+                z_score = np.where(std == 0, 0.0, (b_amounts - mean) / std)
+            features["z_individual"][rows] = np.nan_to_num(z_score)
+
+            timed = ~np.isnat(b_times)
+            if not timed.any():
+                continue
+            k, current = k[timed], b_times[timed]
+            rows = rows[timed]
+
+            # batch rows of the account are ordered by time, so a window is a contiguous run ending just before the row
+            h_end = np.searchsorted(h_times, current, side="right")
+            ben_rows = self.beneficiaries.get(account)
+            for hours in self.WINDOW_HOURS:
+                start = current - np.timedelta64(hours, "h")
+                h_start = np.searchsorted(h_times, start, side="right")
+                b_start = np.minimum(np.searchsorted(b_times, start, side="right"), k)
+
+                moments = h_prefix[h_end] - h_prefix[h_start] + b_prefix[k] - b_prefix[b_start]
+                features[hours]["sum"][rows] = moments[:, 0]
+                features[hours]["count"][rows] = (h_end - h_start) + (k - b_start)
+                features[hours]["variance"][rows] = moments_variance(moments)
+
+                if not turnover:
+                    continue
+                debit = self.history.inbound_amounts(account, start, current)
+                if ben_rows is not None:
+                    ben_prefix = np.concatenate(([0.0], np.cumsum(np.nan_to_num(self.amounts[ben_rows]))))
+                    high = np.searchsorted(ben_rows, rows, side="left")
+                    low = np.minimum(np.searchsorted(self.timestamps[ben_rows], start, side="right"), high)
+                    debit = debit + ben_prefix[high] - ben_prefix[low]
+                features["debit"][hours][rows] = debit
+
+        return features
+
+    def _pattern_features(self):
+        n = len(self)
+        df = self.transactions
+        digits = df['BRENTFORDIGIT'].to_numpy(dtype=object) if 'BRENTFORDIGIT' in df.columns else np.full(n, np.nan, dtype=object)
+        regions = df['BENREGION']
+
+        earlier_round = (df['AMOUNTINBIRR'] % 100 == 0).groupby(df['ACCOUNTNO'], sort=False).cumsum().to_numpy() - (df['AMOUNTINBIRR'] % 100 == 0).to_numpy()
+        earlier_region = df.groupby(['ACCOUNTNO', 'BENREGION'], sort=False).cumcount().reindex(df.index).fillna(0).to_numpy()
+        earlier_located = regions.notna().groupby(df['ACCOUNTNO'], sort=False).cumsum().to_numpy() - regions.notna().to_numpy()
+
+        leading_digits = [None] * n
+        round_numbers = np.zeros(n)
+        geography = np.zeros(n)
+
+        for account, rows in self.accounts.items():
+            history = self.account_histories[account]
+            h_rows = len(history)
+            h_amounts = self._history_amounts(history)
+            h_round = int((h_amounts % 100 == 0).sum())
+
+            if 'BENREGION' in history.columns and h_rows:
+                h_regions = history['BENREGION'].value_counts(dropna=True).to_dict()
+                h_located = int(history['BENREGION'].notna().sum())
+            else:
+                h_regions, h_located = {}, 0
+
+            counts = history['BRENTFORDIGIT'].value_counts(dropna=True).to_dict() if 'BRENTFORDIGIT' in history.columns and h_rows else {}
+            for row in rows:
+                total = h_rows + self.earlier[row]
+                if total:
+                    round_numbers[row] = (h_round + earlier_round[row]) / total
+
+                    region = regions.iat[row]
+                    if h_located + earlier_located[row] > 0 and pd.notna(region):
+                        geography[row] = (h_regions.get(region, 0) + earlier_region[row]) / total
+
+                leading_digits[row] = digit_distribution(counts)
+
+                digit = digits[row]
+                if not pd.isna(digit):
+                    counts[digit] = counts.get(digit, 0) + 1
+
+        return leading_digits, round_numbers, geography
+
+    def _earlier_moments(self, codes):
+        # count, mean and squared deviations of the amounts earlier in the batch that fall in the same group
+        n = len(self)
+        count, mean, m2 = np.zeros(n), np.full(n, np.nan), np.zeros(n)
+
+        for code, rows in pd.Series(codes).groupby(codes, sort=False).indices.items():
+            if code < 0:
+                continue
+            amounts = self.amounts[rows]
+            shift = self._shift(amounts)
+            moments = prefix_moments(amounts, shift)[:-1]
+
+            count[rows] = moments[:, 1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean[rows] = shift + moments[:, 2] / moments[:, 1]
+                m2[rows] = np.where(moments[:, 1] > 0, moments[:, 3] - moments[:, 2] ** 2 / moments[:, 1], 0.0)
+
+        return count, mean, m2
+
+    def _group_moments(self, column=None):
+        # the statistics as the single transaction path would read them, with the earlier batch rows of the group appended
+        if column is None:
+            codes, snapshot = np.zeros(len(self), dtype=int), [self.group_statistics.moments(GroupStatistics.POPULATION)]
+        else:
+            codes, uniques = pd.factorize(self.transactions[column])
+            snapshot = [self.group_statistics.moments(column, value) for value in uniques]
+
+        # factorize marks missing values with -1, which picks the trailing empty group
+        snapshot = np.array([entry if entry is not None else (0, np.nan, 0.0) for entry in snapshot] + [(0, np.nan, 0.0)], dtype=float)[codes]
+        count_a, mean_a, m2_a = snapshot[:, 0], snapshot[:, 1], snapshot[:, 2]
+        count_b, mean_b, m2_b = self._earlier_moments(codes)
+
+        count = count_a + count_b
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = mean_b - mean_a
+            mean = np.where(count_b == 0, mean_a, np.where(count_a == 0, mean_b, mean_a + delta * count_b / count))
+            m2 = m2_a + m2_b + np.where((count_a > 0) & (count_b > 0), delta ** 2 * count_a * count_b / count, 0.0)
+            std = np.where(count > 1, np.sqrt(np.maximum(m2, 0.0) / (count - 1)), np.nan)
+
+        return count > 0, mean, std
+
+    def _z_scores(self, column=None):
+        found, mean, std = self._group_moments(column)
+        return np.where(found, z_score(self.amounts, mean, std), 0.0)
+
+    def _percentiles(self, column):
+        percentiles = np.zeros(len(self))
+        codes, uniques = pd.factorize(self.transactions[column])
+
+        for code, rows in pd.Series(codes).groupby(codes, sort=False).indices.items():
+            if code < 0:
+                continue
+            amounts = self.amounts[rows]
+            below, total = self.group_percentiles.ranks(column, uniques[code], amounts)
+
+            # earlier batch rows of the group count as if they had been appended, a missing amount only adds to the size
+            earlier = []
+            for k, (row, amount) in enumerate(zip(rows, amounts)):
+                if total + k and not np.isnan(amount):
+                    percentiles[row] = (below[k] + bisect.bisect_left(earlier, amount)) / (total + k) * 100
+                if not np.isnan(amount):
+                    bisect.insort(earlier, amount)
+
+        return percentiles
+
+    def generate_transaction_risk_reports(self):
+        settings = analysis_settings.transaction()
+        enabled = TransactionRiskAnalysis.FEATURES.enabled_keys(settings)
+
+        # the beneficiary walk and the per account pattern scans are the expensive parts, skipped when switched off
+        features = self._account_features(turnover="TurnOverRatio24hr" in enabled or "TurnOverRatio7day" in enabled)
+        if enabled & {"LeadingDigitDistribution", "RoundNumberHoarding", "TransactionGeographyRisk"}:
+            leading_digits, round_numbers, geography = self._pattern_features()
+
+        columns = {
+            "TimeWindow1hr": lambda: features[1]["sum"],
+            "TimeWindow24hr": lambda: features[24]["sum"],
+            "TimeWindow7day": lambda: features[7*24]["sum"],
+            "Variance24hr": lambda: np.nan_to_num(features[24]["variance"]),
+            "Variance7day": lambda: np.nan_to_num(features[7*24]["variance"]),
+            "ZScoreIndividual": lambda: features["z_individual"],
+            "ZScoreBranch": lambda: self._z_scores("BRANCHNAME"),
+            "ZScorePopulation": lambda: self._z_scores(),
+            "PercentileBranch": lambda: self._percentiles("BRANCHNAME"),
+            "PercentileTransactionType": lambda: self._percentiles("TRANSACTIONTYPE"),
+            "Frequency1hr": lambda: features[1]["count"],
+            "Frequency24hr": lambda: features[24]["count"],
+            "Frequency7day": lambda: features[7*24]["count"],
+            "TurnOverRatio24hr": lambda: turnover_ratio(features["debit"][24], features[24]["sum"]),
+            "TurnOverRatio7day": lambda: turnover_ratio(features["debit"][7*24], features[7*24]["sum"]),
+            "LeadingDigitDistribution": lambda: leading_digits,
+            "RoundNumberHoarding": lambda: round_numbers,
+            "TransactionGeographyRisk": lambda: geography,
+        }
+
+        reports = self._reports(TransactionRiskAnalysis.FEATURES, columns, enabled)
+        for report in reports:
+            overall_risk_score, risk_level, reason_codes = self.transaction_analysis.calculate_comprehensive_risk(report)
+
+            report["overall_risk_score"] = overall_risk_score
+            report["risk_level"] = risk_level
+            report["reason_codes"] = ",".join(reason_codes)
+
+        return self._in_batch_order(reports)
+
+    def _screening(self, sanctions=True, watchlist=True):
+        analysis = self.customer_analysis
+        screening = analysis.screening
+        names = pd.unique(pd.concat([self.transactions['FULL_NAME'], self.transactions['BENFULLNAME']]).dropna())
+
+        results = {}
+        for name in names:
+            sanctioned = screening.is_sanctioned(name)
+            watchlisted = screening.is_watchlisted(name)
+            results[name] = {
+                "sanction": (sanctioned,) + analysis._fuzzy_hit(sanctioned, screening.closest_sanction, name) if sanctions else (False, False, 0.0),
+                "watchlist": (watchlisted,) + analysis._fuzzy_hit(watchlisted, screening.closest_watchlist, name) if watchlist else (False, False, 0.0),
+                "pep": screening.is_pep(name),
+            }
+        return results
+
+    def _kyc_matches(self, column):
+        values = self.transactions[column]
+        valid = (values.notna() & (values.astype(str).str.strip() != "")).to_numpy()
+
+        value_counts = self.history.value_counts
+        counts = np.array([value_counts.count(column, value) if ok else 0 for value, ok in zip(values, valid)])
+        earlier = values.groupby(values, sort=False).cumcount().reindex(values.index).fillna(0).to_numpy(dtype=int)
+
+        return np.where(valid, counts + earlier, 0)
+
+    def _completeness(self):
+        ratios = np.zeros(len(self))
+        # the account slices follow the snapshot's columns, the store may have been swapped to others since
+        columns = self.history.columns
+        batch_ratios = completeness_ratios(self.transactions.reindex(columns=columns))
+
+        for account, rows in self.accounts.items():
+            history = self.account_histories[account]
+            if history.empty:
+                ratios[rows[1:]] = batch_ratios[rows[:-1]]
+                continue
+
+            latest = history.iloc[-1]
+            ratios[rows] = completeness_ratio(latest)
+
+            # the latest record is the previous batch transaction unless the history holds a later one
+            latest_time = to_datetime64([latest.get('TIMESTAMP')])[0]
+            previous_times = self.timestamps[rows[:-1]]
+            newer = np.isnat(previous_times) | (~np.isnat(latest_time) & (previous_times >= latest_time))
+            ratios[rows[1:][newer]] = batch_ratios[rows[:-1][newer]]
+
+        return ratios
+
+    def _time_series_gaps(self):
+        gaps = [None] * len(self)
+        batch_times = self.transactions['TIMESTAMP']
+
+        for account, rows in self.accounts.items():
+            history = self.account_histories[account]
+            h_times = history['TIMESTAMP'] if 'TIMESTAMP' in history.columns else pd.Series([], dtype=batch_times.dtype)
+            combined = pd.concat([h_times, batch_times.iloc[rows]], ignore_index=True)
+
+            if combined.notna().all() and combined.is_monotonic_increasing:
+                # the usual case, the batch is newer than the history and every row sees a prefix of one list
+                full = time_gaps(combined)
+                for k, row in enumerate(rows):
+                    end = len(h_times) + k
+                    gaps[row] = {"TIMESTAMP": full["TIMESTAMP"][:end], "TIME_DIFF": full["TIME_DIFF"][:end]}
+            else:
+                for k, row in enumerate(rows):
+                    gaps[row] = time_gaps(combined.iloc[:len(h_times) + k])
+
+        return gaps
+
+    def _peer_profiles(self, column):
+        _, mean, std = self._group_moments(column)
+        return [peer_profile(peer_average, peer_std, amount) for peer_average, peer_std, amount in zip(mean, std, self.amounts)]
+
+    def _kyc_uniqueness(self):
+        matches = zip(self._kyc_matches("PASSPORTNO"), self._kyc_matches("IDCARDNO"), self._kyc_matches("FULL_NAME"))
+        return [{"passport_matches": int(passport), "idcard_matches": int(idcard), "fullname_matches": int(fullname)}
+                for passport, idcard, fullname in matches]
+
+    def generate_customer_risk_reports(self):
+        df = self.transactions
+        settings = analysis_settings.customer()
+        enabled = CustomerRiskAnalysis.FEATURES.enabled_keys(settings)
+
+        if enabled & {"sanctions_screening", "watchlist_screening", "pep_screening"}:
+            screening = self._screening(sanctions="sanctions_screening" in enabled, watchlist="watchlist_screening" in enabled)
+            no_hit = {"sanction": (False, False, 0.0), "watchlist": (False, False, 0.0), "pep": False}
+            screened = [(screening.get(account, no_hit), screening.get(beneficiary, no_hit)) for account, beneficiary in zip(df['FULL_NAME'], df['BENFULLNAME'])]
+
+        high_risk_countries = set(self.customer_analysis.countries["name"].astype(str))
+
+        columns = {
+            "sanctions_screening": lambda: [screening_report("sanction", account["sanction"], beneficiary["sanction"]) for account, beneficiary in screened],
+            "watchlist_screening": lambda: [screening_report("watchlist", account["watchlist"], beneficiary["watchlist"]) for account, beneficiary in screened],
+            "pep_screening": lambda: [pep_report(account["pep"], beneficiary["pep"]) for account, beneficiary in screened],
+            "demographics_risk": lambda: [demographics_report(hit) for hit in df['BENREGION'].isin(high_risk_countries).tolist()],
+            "kyc_uniqueness_check": self._kyc_uniqueness,
+            "kyc_completeness_ratio": self._completeness,
+            "peer_profile_occupation": lambda: self._peer_profiles("OCCUPATION"),
+            "peer_profile_region": lambda: self._peer_profiles("REGION"),
+            "peer_profile_account_age": lambda: self._peer_profiles("ACCOUNT_AGE_DAYS"),
+            "time_series_gap": self._time_series_gaps,
+        }
+
+        reports = self._reports(CustomerRiskAnalysis.FEATURES, columns, enabled)
+        for report in reports:
+            overall_risk_score, risk_level, reason_codes = self.customer_analysis.calculate_customer_profile_risk(report)
+
+            report["overall_risk_score"] = overall_risk_score
+            report["risk_level"] = risk_level
+            report["reason_codes"] = ",".join(reason_codes)
+
+        return self._in_batch_order(reports)
+
+
+if __name__ == "__main__":
+    pass
@@ -1,33 +1,74 @@
 import random
 import pandas as pd
 import numpy as np
-from app.repository.swc_repository import get_all_countries, get_all_sanction_list_entries, get_all_watch_list_entries
-from app.service.data_processing_service import preprocessing
+from app.service.reference_data_service import reference_data
+from app.service.analysis_settings_service import analysis_settings
+from app.analysis.analysis_context import AnalysisContext
+from app.analysis.feature_registry import FeatureRegistry
+from app.history.history_store import HistorySnapshot
+from app.history.history_compaction import completeness_ratio
+from app.analysis.risk_formulas import peer_profile, time_gaps, screening_report, pep_report, demographics_report
+
+NO_PEER_PROFILE = {"peer_average": 0.0, "peer_std": 0.0, "amount": 0.0, "amount_std": 0.0}
+# the peer profiles are the z-score anomaly checks of the customer report
+PEER_ANOMALY = ("Peer Group Analysis", "Anomaly Detection")
 
 class CustomerRiskAnalysis:
+
+    # costs are relative: 1 reads shared statistics or lists, 2 scans the account slice, 3 runs fuzzy name matching
+    FEATURES = (
+        FeatureRegistry("Customer Risk Analysis")
+        .input("customer_df", "_customer_history")
+        .feature("sanctions_screening", "risk_score_sanctions", "Sanctions List Check", cost=3, default={
+            "account_sanction_hit": False, "beneficiary_sanction_hit": False,
+            "account_sanction_fuzzy_hit": False, "beneficiary_sanction_fuzzy_hit": False,
+            "account_sanction_similarity": 0.0, "beneficiary_sanction_similarity": 0.0,
+            "sanction_risk_score": 0})
+        .feature("watchlist_screening", "risk_score_watchlists", "Watchlist Check", cost=3, default={
+            "account_watchlist_hit": False, "beneficiary_watchlist_hit": False,
+            "account_watchlist_fuzzy_hit": False, "beneficiary_watchlist_fuzzy_hit": False,
+            "account_watchlist_similarity": 0.0, "beneficiary_watchlist_similarity": 0.0,
+            "watchlist_risk_score": 0})
+        # politically exposed persons are screened with the watch lists
+        .feature("pep_screening", "risk_score_pep", "Watchlist Check", cost=1, default=pep_report(False, False))
+        .feature("demographics_risk", "risk_score_demographics", "Geographic Risk Assessment", cost=1, default={
+            "high_risk_country_hit": False, "demographics_risk_score": 0})
+        .feature("kyc_uniqueness_check", "kyc_integrity_uniqueness_check", "KYC Integrity Check", cost=1, default={
+            "passport_matches": 0, "idcard_matches": 0, "fullname_matches": 0})
+        .feature("kyc_completeness_ratio", "kyc_integrity_completeness_ratio", "KYC Integrity Check", ("customer_df",), cost=2, default=1.0)
+        .feature("peer_profile_occupation", "peer_group_behavior_profile_occupation", PEER_ANOMALY, cost=1, default=NO_PEER_PROFILE)
+        .feature("peer_profile_region", "peer_group_behavior_profile_region", PEER_ANOMALY, cost=1, default=NO_PEER_PROFILE)
+        .feature("peer_profile_account_age", "peer_group_behavior_profile_account_age", PEER_ANOMALY, cost=1, default=NO_PEER_PROFILE)
+        .feature("time_series_gap", "time_series_gap_analysis", "Time Gap Analysis", ("customer_df",), cost=2, default={})
+    )
     
-    def __init__(self, df: pd.DataFrame, transaction: pd.Series):
+    def __init__(self, df: pd.DataFrame, transaction: pd.Series, history: HistorySnapshot = None, context: AnalysisContext = None):
         
         self.df = df
         self.transaction = transaction
+        self.history = history
+        self.group_statistics = history.group_statistics if history is not None else None
         
         
-        self.sanctionlist = get_all_sanction_list_entries(pandas_df=True)
-        self.watchlist = get_all_watch_list_entries(pandas_df=True)
-        self.countries = get_all_countries(pandas_df=True)
-        self.pep_list = [] 
+        lists = reference_data.get()
+        self.sanctionlist = lists.sanctionlist
+        self.watchlist = lists.watchlist
+        self.countries = lists.countries
+        self.screening = lists.screening
+        self.fuzzy_threshold = self._fuzzy_threshold()
 
+        self.context = None
         if self.df is not None:
             #self.df = self.preprocessing(self.df)
-            
-            if isinstance(self.transaction, pd.Series):
-                 self.transaction = preprocessing(self.transaction.to_frame(name="0").T).iloc[0]
-            else:
-                 pass 
-                 
-            self.customer_df = self.df[self.df["ACCOUNTNO"] == self.transaction['ACCOUNTNO']].copy()
-        else:
-            self.customer_df = pd.DataFrame()
+            self.context = context if context is not None else AnalysisContext(transaction, history, df)
+            self.transaction = self.context.transaction
+
+    @property
+    def customer_df(self) -> pd.DataFrame:
+        return self.context.customer_df if self.context is not None else pd.DataFrame()
+
+    def _customer_history(self):
+        return self.customer_df
 
     def convert_nan(self, n):
         return float(np.nan_to_num(n))
@@ -61,59 +102,32 @@ class CustomerRiskAnalysis:
         return df
 
 
+    def _peer_amount_statistics(self, column):
+        stats = self.context.amount_statistics(column)
+
+        if stats is None:
+            return np.nan, np.nan
+
+        _, mean, std = stats
+        return mean, std
+
     def peer_group_behavior_profile_occupation(self):
-        data = self.df[self.df["OCCUPATION"] == self.transaction["OCCUPATION"]]
-        
-        peer_average = data['AMOUNTINBIRR'].mean()
-        peer_std = data['AMOUNTINBIRR'].std()
-        amount = self.transaction.get('AMOUNTINBIRR', 0)
-        amount_std = amount / peer_std if peer_std and peer_std !=0 else None
-        
-        return {"peer_average": self.convert_nan(peer_average), 
-                "peer_std": self.convert_nan(peer_std),
-                "amount": self.convert_nan(amount),
-                "amount_std": self.convert_nan(amount_std)
-                }
+        peer_average, peer_std = self._peer_amount_statistics("OCCUPATION")
+        return peer_profile(peer_average, peer_std, self.transaction.get('AMOUNTINBIRR', 0))
 
     def peer_group_behavior_profile_region(self):
-        data = self.df[self.df["REGION"] == self.transaction["REGION"]]
-        
-        std_dev = data['AMOUNTINBIRR'].std()
-        amount = self.transaction.get('AMOUNTINBIRR', 0)
-        
-        amount_std_dev_ratio = amount / std_dev if std_dev and std_dev !=0 else None
-        
-        return {"peer_average": self.convert_nan(data['AMOUNTINBIRR'].mean()), 
-                "peer_std": self.convert_nan(std_dev),
-                "amount": self.convert_nan(amount),
-                "amount_std": self.convert_nan(amount_std_dev_ratio)
-                }
+        peer_average, std_dev = self._peer_amount_statistics("REGION")
+        return peer_profile(peer_average, std_dev, self.transaction.get('AMOUNTINBIRR', 0))
 
     def peer_group_behavior_profile_account_age(self):
-        data = self.df[self.df["ACCOUNT_AGE_DAYS"] == self.transaction["ACCOUNT_AGE_DAYS"]]
-
-        peer_average = data['AMOUNTINBIRR'].mean()
-        peer_std = data['AMOUNTINBIRR'].std()
-        amount = self.transaction.get('AMOUNTINBIRR', 0)
-        amount_std = amount / peer_std if peer_std and peer_std !=0 else None
-
-        return {"peer_average": self.convert_nan(peer_average), 
-                "peer_std": self.convert_nan(peer_std),
-                "amount": self.convert_nan(amount),
-                "amount_std": self.convert_nan(amount_std)
-                }
+        peer_average, peer_std = self._peer_amount_statistics("ACCOUNT_AGE_DAYS")
+        return peer_profile(peer_average, peer_std, self.transaction.get('AMOUNTINBIRR', 0))
 
     def time_series_gap_analysis(self):
-        if self.customer_df.empty:
-            return pd.DataFrame(columns=['TIMESTAMP', 'TIME_DIFF'])
-            
-        data = self.customer_df.sort_values(by='TIMESTAMP')
-        data['TIME_DIFF'] = data['TIMESTAMP'].diff().dt.total_seconds().fillna(0) // 60
-        data['TIMESTAMP'] = data['TIMESTAMP'].astype(str)
-        
-        if not data.empty:
-            return data[['TIMESTAMP', 'TIME_DIFF']].to_dict('list')
-        return {}
+        if self.customer_df.empty or 'TIMESTAMP' not in self.customer_df.columns:
+            return time_gaps(pd.Series([], dtype="datetime64[ns, UTC]"))
+
+        return time_gaps(self.customer_df['TIMESTAMP'])
 
 
 
@@ -136,9 +150,15 @@ class CustomerRiskAnalysis:
         idcard = self.transaction.get("IDCARDNO")
         fullname = self.transaction.get("FULL_NAME")
 
-        passport_matches = len(self.df[self.df["PASSPORTNO"] == passport]) if is_valid(passport) else 0
-        idcard_matches = len(self.df[self.df["IDCARDNO"] == idcard]) if is_valid(idcard) else 0
-        fullname_matches = len(self.df[self.df["FULL_NAME"] == fullname]) if is_valid(fullname) else 0
+        if self.history is not None:
+            value_counts = self.history.value_counts
+            passport_matches = value_counts.count("PASSPORTNO", passport) if is_valid(passport) else 0
+            idcard_matches = value_counts.count("IDCARDNO", idcard) if is_valid(idcard) else 0
+            fullname_matches = value_counts.count("FULL_NAME", fullname) if is_valid(fullname) else 0
+        else:
+            passport_matches = len(self.df[self.df["PASSPORTNO"] == passport]) if is_valid(passport) else 0
+            idcard_matches = len(self.df[self.df["IDCARDNO"] == idcard]) if is_valid(idcard) else 0
+            fullname_matches = len(self.df[self.df["FULL_NAME"] == fullname]) if is_valid(fullname) else 0
 
         return {
             "passport_matches": passport_matches,
@@ -152,68 +172,55 @@ class CustomerRiskAnalysis:
             return 0.0
             
         latest_kyc = self.customer_df.iloc[-1]
-        
-        total_fields = len(latest_kyc)
-        filled_fields = latest_kyc.notnull().sum()
-        
-        completeness_ratio = filled_fields / total_fields if total_fields > 0 else 0.0
-        return completeness_ratio
+
+        return completeness_ratio(latest_kyc)
 
 
 
     def risk_score_demographics(self):
         
         high_risk_country_hit = self.transaction.get("BENREGION") in (self.countries["name"].astype(str)).values
-        return {
-            "high_risk_country_hit": high_risk_country_hit,
-            "demographics_risk_score": 100 if high_risk_country_hit else 0
-            }
+        return demographics_report(high_risk_country_hit)
+
+    def _fuzzy_threshold(self):
+        return analysis_settings.fuzzy_threshold()
+
+    def _fuzzy_hit(self, exact_hit, closest, name):
+        if exact_hit:
+            return False, 1.0
+        match = closest(name, self.fuzzy_threshold)
+        if match is None:
+            return False, 0.0
+        return True, round(match[1], 4)
 
     def risk_score_sanctions(self):
         
-        sanction_full_names = (self.sanctionlist["FirstName"].astype(str) + " " + self.sanctionlist["LastName"].astype(str)).str.upper().values
-        
-        account_name_upper = self.transaction.get("FULL_NAME", "").upper()
-        ben_name_upper = self.transaction.get("BENFULLNAME", "").upper()
+        account_name = self.transaction.get("FULL_NAME", "")
+        ben_name = self.transaction.get("BENFULLNAME", "")
         
-        sanction_hit_account = account_name_upper in sanction_full_names
-        sanction_hit_ben = ben_name_upper in sanction_full_names
-        
-        return {
-            "account_sanction_hit": sanction_hit_account,
-            "beneficiary_sanction_hit": sanction_hit_ben,
-            "sanction_risk_score": 100 if sanction_hit_account or sanction_hit_ben else 0
-        }
+        sanction_hit_account = self.screening.is_sanctioned(account_name)
+        sanction_hit_ben = self.screening.is_sanctioned(ben_name)
+
+        return screening_report("sanction",
+                                (sanction_hit_account,) + self._fuzzy_hit(sanction_hit_account, self.screening.closest_sanction, account_name),
+                                (sanction_hit_ben,) + self._fuzzy_hit(sanction_hit_ben, self.screening.closest_sanction, ben_name))
 
     def risk_score_watchlists(self):
-        watchlist_full_names = (self.watchlist["FirstName"].astype(str) + " " + self.watchlist["LastName"].astype(str)).str.upper().values
-        
-        account_name_upper = self.transaction.get("FULL_NAME", "").upper()
-        ben_name_upper = self.transaction.get("BENFULLNAME", "").upper()
+        account_name = self.transaction.get("FULL_NAME", "")
+        ben_name = self.transaction.get("BENFULLNAME", "")
         
-        watchlist_hit_account = account_name_upper in watchlist_full_names
-        watchlist_hit_ben = ben_name_upper in watchlist_full_names
-        
-        return {
-            "account_watchlist_hit": watchlist_hit_account,
-            "beneficiary_watchlist_hit": watchlist_hit_ben,
-            "watchlist_risk_score": 100 if watchlist_hit_account or watchlist_hit_ben else 0
-        }
+        watchlist_hit_account = self.screening.is_watchlisted(account_name)
+        watchlist_hit_ben = self.screening.is_watchlisted(ben_name)
+
+        return screening_report("watchlist",
+                                (watchlist_hit_account,) + self._fuzzy_hit(watchlist_hit_account, self.screening.closest_watchlist, account_name),
+                                (watchlist_hit_ben,) + self._fuzzy_hit(watchlist_hit_ben, self.screening.closest_watchlist, ben_name))
 
     def risk_score_pep(self):
-        pep_list_upper = [name.upper() for name in self.pep_list]
-        
-        account_name_upper = self.transaction.get("FULL_NAME", "").upper()
-        ben_name_upper = self.transaction.get("BENFULLNAME", "").upper()
+        account_name = self.transaction.get("FULL_NAME", "")
+        ben_name = self.transaction.get("BENFULLNAME", "")
 
-        pep_hit_account = account_name_upper in pep_list_upper
-        pep_hit_ben = ben_name_upper in pep_list_upper
-        
-        return {
-            "account_pep_hit": pep_hit_account,
-            "beneficiary_pep_hit": pep_hit_ben,
-            "pep_risk_score": 100 if pep_hit_account or pep_hit_ben else 0
-        }
+        return pep_report(self.screening.is_pep(account_name), self.screening.is_pep(ben_name))
 
 
 
@@ -326,21 +333,7 @@ class CustomerRiskAnalysis:
 
 
     def generate_customer_risk_report(self):
-        
-       
-        report = {}
-        report.update({"sanctions_screening": self.risk_score_sanctions()})
-        report.update({"watchlist_screening": self.risk_score_watchlists()})
-        report.update({"pep_screening": self.risk_score_pep()})
-        report.update({"demographics_risk": self.risk_score_demographics()})
-
-        report.update({"kyc_uniqueness_check": self.kyc_integrity_uniqueness_check()})
-        report.update({"kyc_completeness_ratio": self.kyc_integrity_completeness_ratio()})
-
-        report.update({"peer_profile_occupation": self.peer_group_behavior_profile_occupation()})
-        report.update({"peer_profile_region": self.peer_group_behavior_profile_region()})
-        report.update({"peer_profile_account_age": self.peer_group_behavior_profile_account_age()})
-        report.update({"time_series_gap": self.time_series_gap_analysis()})
+        report = self.FEATURES.run(self, analysis_settings.customer())
 
         overall_risk_score, risk_level, reason_codes = self.calculate_customer_profile_risk(report)
 
@@ -0,0 +1,142 @@
+import copy
+import heapq
+
+
+class Feature:
+    """One entry of a risk report: the analysis method computing it, the toggles gating it, its inputs and relative cost."""
+
+    def __init__(self, key, method, toggle=None, inputs=(), cost=1, default=0):
+        self.key = key
+        self.method = method
+        self.toggle = toggle
+        self.inputs = tuple(inputs)
+        self.cost = cost
+        self.default = default
+
+    def default_value(self):
+        # disabled features still fill their report entry, with a value that adds nothing to the risk score
+        return copy.deepcopy(self.default)
+
+
+class FeatureRegistry:
+    """The features of one report and the shared inputs they read, evaluated in dependency order when enabled."""
+
+    DISABLED_VALUES = ("false", "0", "no", "off")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.inputs = {}
+        self.features = {}
+
+    def input(self, name, method, requires=(), cost=1):
+        self.inputs[name] = (method, tuple(requires), cost)
+        return self
+
+    def feature(self, key, method, toggle=None, inputs=(), cost=1, default=0):
+        for name in inputs:
+            if name not in self.inputs:
+                raise ValueError(f"[{self.name}] Feature {key} reads unknown input {name}")
+        self.features[key] = Feature(key, method, toggle, inputs, cost, default)
+        return self
+
+    @classmethod
+    def is_enabled(cls, settings, toggle) -> bool:
+        if toggle is None or settings is None:
+            return True
+        # a feature gated by several settings runs only when every one of them is on
+        if isinstance(toggle, (tuple, list)):
+            return all(cls.is_enabled(settings, key) for key in toggle)
+        # unset toggles keep the feature on, only an explicit false turns it off
+        value = settings.get(toggle)
+        return value is None or str(value).strip().lower() not in cls.DISABLED_VALUES
+
+    def toggles(self) -> set:
+        keys = set()
+        for feature in self.features.values():
+            if isinstance(feature.toggle, (tuple, list)):
+                keys.update(feature.toggle)
+            elif feature.toggle is not None:
+                keys.add(feature.toggle)
+        return keys
+
+    def _needed(self, name, needed):
+        if name in needed:
+            return
+        if name not in self.inputs:
+            raise ValueError(f"[{self.name}] Unknown input {name}")
+        needed[name] = None
+        for required in self.inputs[name][1]:
+            self._needed(required, needed)
+
+    def plan(self, settings=None) -> list:
+        enabled = [feature for feature in self.features.values() if self.is_enabled(settings, feature.toggle)]
+
+        # only the inputs of enabled features are prepared, a disabled feature costs nothing
+        needed = {}
+        for feature in enabled:
+            for name in feature.inputs:
+                self._needed(name, needed)
+
+        # steps are ("input", name) or ("feature", key), each with the steps it waits for
+        requires = {("input", name): [("input", required) for required in self.inputs[name][1]] for name in needed}
+        requires.update({("feature", feature.key): [("input", name) for name in feature.inputs] for feature in enabled})
+        costs = {("input", name): self.inputs[name][2] for name in needed}
+        costs.update({("feature", feature.key): feature.cost for feature in enabled})
+
+        waiting = {step: len(required) for step, required in requires.items()}
+        dependents = {step: [] for step in requires}
+        for step, required in requires.items():
+            for dependency in required:
+                dependents[dependency].append(step)
+
+        # topological order over the declared inputs, the cheaper of the ready steps runs first
+        position = {step: index for index, step in enumerate(requires)}
+        ready = [(costs[step], position[step], step) for step, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+
+        steps = []
+        while ready:
+            step = heapq.heappop(ready)[2]
+            steps.append(step)
+            for dependent in dependents[step]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, (costs[dependent], position[dependent], dependent))
+
+        if len(steps) < len(requires):
+            cycle = sorted(name for (kind, name), count in waiting.items() if count > 0)
+            raise ValueError(f"[{self.name}] Inputs {cycle} depend on each other")
+
+        return steps
+
+    def run(self, analysis, settings=None) -> dict:
+        values = {}
+        for kind, name in self.plan(settings):
+            if kind == "input":
+                getattr(analysis, self.inputs[name][0])()
+            else:
+                values[name] = getattr(analysis, self.features[name].method)()
+
+        return self.complete(values)
+
+    def complete(self, values: dict, settings=None) -> dict:
+        # a report lists every feature in registry order, the disabled ones and those left out carry their defaults
+        enabled = self.enabled_keys(settings) if settings is not None else self.features.keys()
+        return {
+            key: values[key] if key in values and key in enabled else feature.default_value()
+            for key, feature in self.features.items()
+        }
+
+    def enabled_keys(self, settings=None) -> set:
+        return {name for kind, name in self.plan(settings) if kind == "feature"}
+
+    def disabled(self, settings=None) -> list:
+        enabled = self.enabled_keys(settings)
+        return [feature for key, feature in self.features.items() if key not in enabled]
+
+    def describe(self, settings=None) -> dict:
+        enabled = self.enabled_keys(settings)
+        return {
+            key: {"toggle": feature.toggle, "enabled": key in enabled, "cost": feature.cost, "inputs": list(feature.inputs)}
+            for key, feature in self.features.items()
+        }
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+def character_ngrams(name: str, n: int = 3) -> set:
+    if not name:
+        return set()
+
+    padded = f" {name} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def levenshtein_similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+
+    if len(a) < len(b):
+        a, b = b, a
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+
+    return 1.0 - previous[-1] / len(a)
+
+
+class FuzzyNameScreener:
+    """Approximate name matching: an n-gram inverted index shortlists candidates, edit distance scores them."""
+
+    def __init__(self, names, n: int = 3, max_candidates: int = 25, min_overlap: float = 0.3):
+        self.n = n
+        self.max_candidates = max_candidates
+        self.min_overlap = min_overlap
+        self.names = sorted({name for name in names if name})
+
+        postings = {}
+        gram_counts = np.zeros(len(self.names), dtype=np.int32)
+        for name_id, name in enumerate(self.names):
+            grams = character_ngrams(name, n)
+            gram_counts[name_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(name_id)
+
+        self.gram_counts = gram_counts
+        self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, name: str) -> np.ndarray:
+        grams = character_ngrams(name, self.n)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return np.array([], dtype=np.int32)
+
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        dice = 2.0 * shared / (len(grams) + self.gram_counts)
+
+        shortlist = np.flatnonzero(dice >= self.min_overlap)
+        if len(shortlist) > self.max_candidates:
+            top = np.argpartition(dice[shortlist], -self.max_candidates)[-self.max_candidates:]
+            shortlist = shortlist[top]
+
+        return shortlist[np.argsort(-dice[shortlist])]
+
+    def match(self, name: str, threshold: float):
+        if not name or not self.names:
+            return None
+
+        best_name, best_score = None, 0.0
+        for name_id in self.candidates(name):
+            candidate = self.names[name_id]
+            # edit distance can never beat the length difference, skip the ones that cannot reach the threshold
+            if 1.0 - abs(len(candidate) - len(name)) / max(len(candidate), len(name)) < threshold:
+                continue
+
+            score = levenshtein_similarity(name, candidate)
+            if score > best_score:
+                best_name, best_score = candidate, score
+
+        if best_name is None or best_score < threshold:
+            return None
+        return best_name, best_score
@@ -0,0 +1,79 @@
+import json
+import numpy as np
+import pandas as pd
+
+# the single transaction and the batch analyses report through these, so both score a transaction the same way
+
+
+def z_score(amount, mean, std):
+    # works on scalars and on whole batch columns alike, a group without spread scores every amount 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nan_to_num(np.where(std == 0, 0.0, (np.asarray(amount, dtype=float) - mean) / std))
+
+
+def turnover_ratio(debit, credit):
+    # a missing inbound amount means the window could not be read, it adds nothing to the score
+    debit, credit = np.asarray(debit, dtype=float), np.asarray(credit, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(credit == 0, np.where(debit > 0, np.inf, 0.0), np.nan_to_num(debit / credit))
+    return np.where(np.isnan(debit), 0.0, ratio)
+
+
+def digit_distribution(counts: dict) -> str:
+    total = sum(counts.values())
+    if not total:
+        return json.dumps({})
+
+    try:
+        keys = sorted(counts)
+    except TypeError:
+        keys = sorted(counts, key=str)
+    return json.dumps({key: counts[key] / total for key in keys})
+
+
+def peer_profile(peer_average, peer_std, amount) -> dict:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amount_std = amount / peer_std if peer_std != 0 else 0.0
+    return {"peer_average": float(np.nan_to_num(peer_average)),
+            "peer_std": float(np.nan_to_num(peer_std)),
+            "amount": float(np.nan_to_num(amount)),
+            "amount_std": float(np.nan_to_num(amount_std))}
+
+
+def time_gaps(timestamps: pd.Series) -> dict:
+    if timestamps.empty:
+        return {"TIMESTAMP": [], "TIME_DIFF": []}
+
+    timestamps = timestamps.sort_values().reset_index(drop=True)
+    time_diff = timestamps.diff().dt.total_seconds().fillna(0) // 60
+    return {"TIMESTAMP": timestamps.astype(str).tolist(), "TIME_DIFF": time_diff.tolist()}
+
+
+def screening_report(kind: str, account, beneficiary) -> dict:
+    # account and beneficiary are (exact hit, fuzzy hit, similarity) for the sanction or the watch list
+    account_hit, account_fuzzy_hit, account_similarity = account
+    beneficiary_hit, beneficiary_fuzzy_hit, beneficiary_similarity = beneficiary
+    return {
+        f"account_{kind}_hit": account_hit,
+        f"beneficiary_{kind}_hit": beneficiary_hit,
+        f"account_{kind}_fuzzy_hit": account_fuzzy_hit,
+        f"beneficiary_{kind}_fuzzy_hit": beneficiary_fuzzy_hit,
+        f"account_{kind}_similarity": account_similarity,
+        f"beneficiary_{kind}_similarity": beneficiary_similarity,
+        f"{kind}_risk_score": 100 if account_hit or beneficiary_hit or account_fuzzy_hit or beneficiary_fuzzy_hit else 0
+    }
+
+
+def pep_report(account_hit, beneficiary_hit) -> dict:
+    return {
+        "account_pep_hit": account_hit,
+        "beneficiary_pep_hit": beneficiary_hit,
+        "pep_risk_score": 100 if account_hit or beneficiary_hit else 0
+    }
+
+
+def demographics_report(high_risk_country_hit) -> dict:
+    return {
+        "high_risk_country_hit": high_risk_country_hit,
+        "demographics_risk_score": 100 if high_risk_country_hit else 0
+    }
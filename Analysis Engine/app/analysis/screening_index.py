@@ -0,0 +1,58 @@
+import pandas as pd
+from app.analysis.fuzzy_name_screening import FuzzyNameScreener
+
+
+def normalize_name(name) -> str:
+    if name is None or (not isinstance(name, str) and pd.isna(name)):
+        return ""
+
+    # case, spacing and token order are ignored, "Doe  john" and "JOHN DOE" are the same name
+    return " ".join(sorted(str(name).upper().split()))
+
+
+def full_names(df: pd.DataFrame) -> pd.Series:
+    if df is None or df.empty:
+        return pd.Series([], dtype=object)
+    return df["FirstName"].astype(str) + " " + df["LastName"].astype(str)
+
+
+class ScreeningIndex:
+    """Normalized sanction, watch list and PEP names in hash sets, with fuzzy screeners for near matches."""
+
+    def __init__(self, sanction_names=(), watchlist_names=(), pep_names=()):
+        self.sanctions = self._build(sanction_names)
+        self.watchlist = self._build(watchlist_names)
+        self.peps = self._build(pep_names)
+
+        self.sanctions_fuzzy = FuzzyNameScreener(self.sanctions)
+        self.watchlist_fuzzy = FuzzyNameScreener(self.watchlist)
+
+    @classmethod
+    def from_lists(cls, sanctionlist: pd.DataFrame, watchlist: pd.DataFrame, pep_list=()):
+        return cls(full_names(sanctionlist), full_names(watchlist), pep_list)
+
+    @staticmethod
+    def _build(names):
+        normalized = {normalize_name(name) for name in names}
+        normalized.discard("")
+        return frozenset(normalized)
+
+    @staticmethod
+    def _hit(names, name):
+        normalized = normalize_name(name)
+        return bool(normalized) and normalized in names
+
+    def is_sanctioned(self, name) -> bool:
+        return self._hit(self.sanctions, name)
+
+    def is_watchlisted(self, name) -> bool:
+        return self._hit(self.watchlist, name)
+
+    def is_pep(self, name) -> bool:
+        return self._hit(self.peps, name)
+
+    def closest_sanction(self, name, threshold: float):
+        return self.sanctions_fuzzy.match(normalize_name(name), threshold)
+
+    def closest_watchlist(self, name, threshold: float):
+        return self.watchlist_fuzzy.match(normalize_name(name), threshold)
@@ -1,89 +1,89 @@
-import pprint
 import pandas as pd
 import json
-from app.service.data_processing_service import preprocessing
+from app.analysis.analysis_context import AnalysisContext
+from app.analysis.feature_registry import FeatureRegistry
+from app.service.analysis_settings_service import analysis_settings
+from app.history.history_store import HistorySnapshot
+from app.analysis.window_aggregator import WindowAggregator
+from app.analysis.risk_formulas import z_score, turnover_ratio, digit_distribution
 import numpy as np
-import math
 
 class TransactionRiskAnalysis:
-    def __init__(self, df: pd.DataFrame, transaction = None):
+    WINDOW_HOURS = (1, 24, 7*24)
+
+    # costs are relative: 1 reads shared statistics, 2 scans the account slice, 3 also walks the beneficiary index
+    FEATURES = (
+        FeatureRegistry("Transaction Risk Analysis")
+        .input("customer_df", "_customer_history")
+        .input("window_aggregates", "_window_aggregates", requires=("customer_df",))
+        .feature("TimeWindow1hr", "time_window_1hr", "Transaction Amount Analysis", ("window_aggregates",), cost=2, default=0.0)
+        .feature("TimeWindow24hr", "time_window_24hr", "Transaction Amount Analysis", ("window_aggregates",), cost=2, default=0.0)
+        .feature("TimeWindow7day", "time_window_aggregation_7days", "Transaction Amount Analysis", ("window_aggregates",), cost=2, default=0.0)
+        .feature("Variance24hr", "variance_analysis_24hr", "Transaction Amount Analysis", ("window_aggregates",), cost=2, default=0.0)
+        .feature("Variance7day", "variance_analysis_7days", "Transaction Amount Analysis", ("window_aggregates",), cost=2, default=0.0)
+        .feature("ZScoreIndividual", "z_score_for_individual", "Transaction Amount Analysis", ("customer_df",), cost=2)
+        .feature("ZScoreBranch", "z_score_for_branch", "Transaction Amount Analysis", cost=1)
+        .feature("ZScorePopulation", "z_score_for_population", "Transaction Amount Analysis", cost=1)
+        .feature("PercentileBranch", "percentile_for_branch", "Transaction Amount Analysis", cost=1)
+        .feature("PercentileTransactionType", "percentile_for_transaction_type", "Transaction Amount Analysis", cost=1)
+        .feature("Frequency1hr", "frequency_analysis_1hr", "Transaction Frequency Analysis", ("window_aggregates",), cost=2)
+        .feature("Frequency24hr", "frequency_analysis_24hr", "Transaction Frequency Analysis", ("window_aggregates",), cost=2)
+        .feature("Frequency7day", "frequency_analysis_7day", "Transaction Frequency Analysis", ("window_aggregates",), cost=2)
+        .feature("TurnOverRatio24hr", "turn_over_ratio_24hr", "Transaction Turnover Analysis", ("window_aggregates",), cost=3)
+        .feature("TurnOverRatio7day", "turn_over_ratio_7day", "Transaction Turnover Analysis", ("window_aggregates",), cost=3)
+        .feature("LeadingDigitDistribution", "leading_digit_distribution", "BrentFord Digit Analysis", ("customer_df",), cost=2, default=json.dumps({}))
+        .feature("RoundNumberHoarding", "round_number_hoarding", "Round Number Hoarding Analysis", ("customer_df",), cost=2)
+        .feature("TransactionGeographyRisk", "transaction_geography_risk", "Transaction Geographic Analysis", ("customer_df",), cost=2)
+    )
+
+    def __init__(self, df: pd.DataFrame, transaction = None, history: HistorySnapshot = None, context: AnalysisContext = None):
         self.df = df
         self.transaction = transaction
+        self.history = history
+        self.group_statistics = history.group_statistics if history is not None else None
+        self.group_percentiles = history.group_percentiles if history is not None else None
+        self.window_aggregates = None
+        self.context = None
         if self.df is not None:
             #self.df = self.preprocessing(self.df)
-            self.transaction = preprocessing(self.transaction.to_frame(name="0").T).iloc[0]
-            self.customer_df = self.df[self.df["ACCOUNTNO"] == self.transaction['ACCOUNTNO']].copy()
-        else:
-            self.customer_df = pd.DataFrame()
+            self.context = context if context is not None else AnalysisContext(transaction, history, df)
+            self.transaction = self.context.transaction
+
+    @property
+    def customer_df(self) -> pd.DataFrame:
+        # cut on first use, a report whose account features are all disabled never slices the history
+        return self.context.customer_df if self.context is not None else pd.DataFrame()
 
-        """
-        print("Data filterd length: ", len(self.customer_df)) 
-        pprint.pprint(self.generate_transaction_risk_report())
-        pprint.pprint(self.df['BENACCOUNTNO'].head())
-        pprint.pprint(self.transaction['ACCOUNTNO'])
-        pprint.pprint(self.df["BENACCOUNTNO"].dtypes)
-        """
+    def _customer_history(self):
+        return self.customer_df
 
     def convert_nan(self, n):
         return float(np.nan_to_num(n))
 
-    def old_preprocessing(self, df):
-        if df is None or df.empty:
-            return
-
-        if 'TRANSACTIONDATE' in df.columns and 'TRANSACTIONTIME' in df.columns:
-            combined_series = df['TRANSACTIONDATE'].astype(str) + ' ' + df['TRANSACTIONTIME'].astype(str)
-            df['TIMESTAMP'] = pd.to_datetime(combined_series, errors='coerce')
-     
-        for col in ['TRANSACTIONDATE', 'TRANSACTIONTIME', 'BIRTHDATE', 'OPENEDDATE', 'CLOSEDDATE']:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
-
-        df.sort_values(by='TIMESTAMP', inplace=True)
-        df.reset_index(drop=True, inplace=True)
-
-    
-        if 'AMOUNTINBIRR' in df.columns:
-            df['BRENTFORDIGIT'] = df['AMOUNTINBIRR'].astype(str).str[0].astype(int, errors='ignore')
-
-        return (df)
-        
-
-    def _filter_time_window(self, df_source: pd.DataFrame, hours: int) -> pd.DataFrame:
-        if 'TIMESTAMP' not in self.transaction or 'TIMESTAMP' not in df_source.columns or df_source.empty:
-             return pd.DataFrame()
-             
-        current_time = self.transaction['TIMESTAMP']
-        start_time = current_time - pd.Timedelta(hours=hours)
-        
-        return df_source[
-            (df_source['TIMESTAMP'] > start_time) & 
-            (df_source['TIMESTAMP'] <= current_time)
-        ].copy()
-
-
+    def _window_aggregates(self):
+        if self.window_aggregates is None:
+            self.window_aggregates = WindowAggregator(self.customer_df).aggregate(
+                self.transaction.get('TIMESTAMP') if self.transaction is not None else None,
+                self.WINDOW_HOURS
+            )
+        return self.window_aggregates
 
     def time_window_1hr(self):
-        data = self._filter_time_window(self.customer_df, 1)
-        return self.convert_nan(data['AMOUNTINBIRR'].sum() if 'AMOUNTINBIRR' in data.columns else 0)
+        return self.convert_nan(self._window_aggregates()[1]["sum"])
 
     def time_window_24hr(self):
-        data = self._filter_time_window(self.customer_df, 24)
-        return self.convert_nan(data['AMOUNTINBIRR'].sum() if 'AMOUNTINBIRR' in data.columns else 0)
+        return self.convert_nan(self._window_aggregates()[24]["sum"])
 
     def time_window_aggregation_7days(self):
-        data = self._filter_time_window(self.customer_df, 7*24)
-        return self.convert_nan(data['AMOUNTINBIRR'].sum() if 'AMOUNTINBIRR' in data.columns else 0)
+        return self.convert_nan(self._window_aggregates()[7*24]["sum"])
 
     
 
     def variance_analysis_24hr(self):
-        data = self._filter_time_window(self.customer_df, 24)
-        return self.convert_nan(data['AMOUNTINBIRR'].var() if not data.empty and 'AMOUNTINBIRR' in data.columns else 0)
+        return self.convert_nan(self._window_aggregates()[24]["variance"])
 
     def variance_analysis_7days(self):
-        data = self._filter_time_window(self.customer_df, 7*24)
-        return self.convert_nan(data['AMOUNTINBIRR'].var() if not data.empty and 'AMOUNTINBIRR' in data.columns else 0)
+        return self.convert_nan(self._window_aggregates()[7*24]["variance"])
 
 
 
@@ -93,117 +93,103 @@ class TransactionRiskAnalysis:
              
         mean = self.customer_df['AMOUNTINBIRR'].mean()
         std = self.customer_df['AMOUNTINBIRR'].std()
+        return float(z_score(self.transaction['AMOUNTINBIRR'], mean, std))
         
-        if std == 0:
-            return 0
-            
-        z_score = (self.transaction['AMOUNTINBIRR'] - mean) / std
-        return self.convert_nan(z_score)
-        
+    def _group_amount_statistics(self, column=None):
+        return self.context.amount_statistics(column)
+
     def z_score_for_branch(self):
         if 'BRANCHNAME' not in self.transaction or 'AMOUNTINBIRR' not in self.transaction or 'BRANCHNAME' not in self.df.columns or 'AMOUNTINBIRR' not in self.df.columns:
             return 0
             
-        data = self.df[self.df["BRANCHNAME"] == self.transaction['BRANCHNAME']]
-        if data.empty:
+        stats = self._group_amount_statistics("BRANCHNAME")
+        if stats is None:
             return 0
             
-        mean = data['AMOUNTINBIRR'].mean()
-        std = data['AMOUNTINBIRR'].std()
-        
-        if std == 0:
-            return 0
-            
-        z_score = (self.transaction['AMOUNTINBIRR'] - mean) / std
-        return self.convert_nan(z_score)
+        _, mean, std = stats
+        return float(z_score(self.transaction['AMOUNTINBIRR'], mean, std))
 
     def z_score_for_population(self):
         if self.df.empty or 'AMOUNTINBIRR' not in self.transaction or 'AMOUNTINBIRR' not in self.df.columns:
              return 0
              
-        mean = self.df['AMOUNTINBIRR'].mean()
-        std = self.df['AMOUNTINBIRR'].std()
-        
-        if std == 0:
+        stats = self._group_amount_statistics()
+        if stats is None:
             return 0
-            
-        z_score = (self.transaction['AMOUNTINBIRR'] - mean) / std
-        return self.convert_nan(z_score)
+
+        _, mean, std = stats
+        return float(z_score(self.transaction['AMOUNTINBIRR'], mean, std))
+
 
 
+    def _group_percentile(self, column):
+        if self.group_percentiles is not None:
+            return self.group_percentiles.percentile(column, self.transaction[column], self.transaction['AMOUNTINBIRR'])
+
+        df = self.df[self.df[column] == self.transaction[column]]
+        if df.empty:
+             return None
+
+        return (df['AMOUNTINBIRR'] < self.transaction['AMOUNTINBIRR']).mean() * 100
 
     def percentile_for_branch(self):
         if 'BRANCHNAME' not in self.transaction or 'AMOUNTINBIRR' not in self.transaction or 'BRANCHNAME' not in self.df.columns or 'AMOUNTINBIRR' not in self.df.columns:
             return 0
             
-        df = self.df[self.df["BRANCHNAME"] == self.transaction['BRANCHNAME']]
-        if df.empty:
+        percentile = self._group_percentile("BRANCHNAME")
+        if percentile is None:
              return 0
              
-        percentile = (df['AMOUNTINBIRR'] < self.transaction['AMOUNTINBIRR']).mean() * 100
         return self.convert_nan(percentile)
         
     def percentile_for_transaction_type(self):
         if 'TRANSACTIONTYPE' not in self.transaction or 'AMOUNTINBIRR' not in self.transaction or 'TRANSACTIONTYPE' not in self.df.columns or 'AMOUNTINBIRR' not in self.df.columns:
              return 0
              
-        df = self.df[self.df["TRANSACTIONTYPE"] == self.transaction['TRANSACTIONTYPE']]
-        if df.empty:
+        percentile = self._group_percentile("TRANSACTIONTYPE")
+        if percentile is None:
              return 0
              
-        percentile = (df['AMOUNTINBIRR'] < self.transaction['AMOUNTINBIRR']).mean() * 100
         return self.convert_nan(percentile)
 
 
 
     def frequency_analysis_1hr(self):
-        data = self._filter_time_window(self.customer_df, 1)
-        return len(data)
+        return self._window_aggregates()[1]["count"]
 
     def frequency_analysis_24hr(self):
-        data = self._filter_time_window(self.customer_df, 24)
-        return len(data)
+        return self._window_aggregates()[24]["count"]
 
     def frequency_analysis_7day(self):
-        data = self._filter_time_window(self.customer_df, 7*24)
-        return len(data)
+        return self._window_aggregates()[7*24]["count"]
 
 
 
+    def _inbound_amount(self, hours):
+        current_time = self.transaction['TIMESTAMP']
+        if self.history is None or pd.isna(current_time):
+            return None
+        return self.history.inbound_amount(self.transaction['ACCOUNTNO'], current_time - pd.Timedelta(hours=hours), current_time)
+
     def turn_over_ratio_24hr(self):
         if 'TIMESTAMP' not in self.transaction or 'ACCOUNTNO' not in self.transaction or 'AMOUNTINBIRR' not in self.df.columns or 'BENACCOUNTNO' not in self.df.columns:
              return 0
              
-        time_window_df = self._filter_time_window(self.df, 24)
-        if time_window_df.empty:
+        debit = self._inbound_amount(24)
+        if debit is None:
             return 0
-            
-        debit = time_window_df[time_window_df['BENACCOUNTNO'] == self.transaction['ACCOUNTNO']]['AMOUNTINBIRR'].sum() 
         
-        credit = self._filter_time_window(self.customer_df, 24)['AMOUNTINBIRR'].sum()
-        
-        if credit == 0:
-            return float('inf') if debit > 0 else 0
-            
-        return self.convert_nan(debit / credit)
+        return float(turnover_ratio(debit, self._window_aggregates()[24]["sum"]))
 
     def turn_over_ratio_7day(self):
         if 'TIMESTAMP' not in self.transaction or 'ACCOUNTNO' not in self.transaction or 'AMOUNTINBIRR' not in self.df.columns or 'BENACCOUNTNO' not in self.df.columns:
              return 0
              
-        time_window_df = self._filter_time_window(self.df, 7*24)
-        if time_window_df.empty:
+        debit = self._inbound_amount(7*24)
+        if debit is None:
             return 0
-            
-        
-        debit = time_window_df[time_window_df['BENACCOUNTNO'] == self.transaction['ACCOUNTNO']]['AMOUNTINBIRR'].sum()
         
-        credit = self._filter_time_window(self.customer_df, 7*24)['AMOUNTINBIRR'].sum()
-        
-        if credit == 0:
-            return float('inf') if debit > 0 else 0
-            
-        return self.convert_nan(debit / credit)
+        return float(turnover_ratio(debit, self._window_aggregates()[7*24]["sum"]))
 
     
     
@@ -211,8 +197,7 @@ class TransactionRiskAnalysis:
         if self.customer_df.empty or 'BRENTFORDIGIT' not in self.customer_df.columns:
             return json.dumps({})
 
-        distribution = self.customer_df['BRENTFORDIGIT'].value_counts(normalize=True).sort_index()
-        return json.dumps(distribution.to_dict())
+        return digit_distribution(self.customer_df['BRENTFORDIGIT'].value_counts(dropna=True).to_dict())
 
     def round_number_hoarding(self):
         if self.customer_df.empty or 'AMOUNTINBIRR' not in self.customer_df.columns:
@@ -353,26 +338,7 @@ class TransactionRiskAnalysis:
 
     
     def generate_transaction_risk_report(self):
-        report = {
-            "TimeWindow1hr": self.time_window_1hr(),
-            "TimeWindow24hr": self.time_window_24hr(),
-            "TimeWindow7day": self.time_window_aggregation_7days(),
-            "Variance24hr": self.variance_analysis_24hr(),
-            "Variance7day": self.variance_analysis_7days(),
-            "ZScoreIndividual": self.z_score_for_individual(),
-            "ZScoreBranch": self.z_score_for_branch(),
-            "ZScorePopulation": self.z_score_for_population(),
-            "PercentileBranch": self.percentile_for_branch(),
-            "PercentileTransactionType": self.percentile_for_transaction_type(),
-            "Frequency1hr": self.frequency_analysis_1hr(),
-            "Frequency24hr": self.frequency_analysis_24hr(),
-            "Frequency7day": self.frequency_analysis_7day(),
-            "TurnOverRatio24hr": self.turn_over_ratio_24hr(),
-            "TurnOverRatio7day": self.turn_over_ratio_7day(),
-            "LeadingDigitDistribution": self.leading_digit_distribution(),
-            "RoundNumberHoarding": self.round_number_hoarding(),
-            "TransactionGeographyRisk": self.transaction_geography_risk(),
-        }
+        report = self.FEATURES.run(self, analysis_settings.transaction())
 
         overall_risk_score, risk_level, reason_codes = self.calculate_comprehensive_risk(report)
 
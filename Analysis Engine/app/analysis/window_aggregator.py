@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+
+class WindowAggregator:
+    """Sum, count and variance of an account's amounts over several trailing time windows."""
+
+    def __init__(self, df: pd.DataFrame, time_column: str = "TIMESTAMP", amount_column: str = "AMOUNTINBIRR"):
+        if df is None or df.empty or time_column not in df.columns:
+            self.timestamps = pd.Series([], dtype="datetime64[ns, UTC]")
+            self.amounts = np.array([], dtype=float)
+            return
+
+        timestamps = df[time_column]
+        valid = timestamps.notna().to_numpy()
+        if not valid.all():
+            timestamps = timestamps[valid]
+
+        # the history is kept ordered by TIMESTAMP, so window boundaries can be found by binary search
+        self.timestamps = timestamps.reset_index(drop=True)
+        if amount_column in df.columns:
+            self.amounts = pd.to_numeric(df[amount_column], errors="coerce").to_numpy(dtype=float)[valid]
+        else:
+            self.amounts = np.full(len(self.timestamps), np.nan)
+
+    @staticmethod
+    def _empty():
+        return {"sum": 0.0, "count": 0, "variance": np.nan}
+
+    def aggregate(self, current_time, windows_hours) -> dict:
+        if current_time is None or pd.isna(current_time) or self.timestamps.empty:
+            return {hours: self._empty() for hours in windows_hours}
+
+        current_time = pd.Timestamp(current_time)
+        starts = [current_time - pd.Timedelta(hours=hours) for hours in windows_hours]
+
+        # windows are (current_time - hours, current_time]; one searchsorted call covers every boundary
+        boundaries = self.timestamps.searchsorted(starts + [current_time], side="right")
+        end = boundaries[-1]
+
+        aggregates = {}
+        for hours, start in zip(windows_hours, boundaries[:-1]):
+            window = self.amounts[start:end]
+            values = window[~np.isnan(window)]
+
+            if len(values) > 1:
+                variance = float(((values - values.mean()) ** 2).sum() / (len(values) - 1))
+            else:
+                variance = np.nan
+
+            aggregates[hours] = {
+                "sum": float(values.sum()),
+                "count": int(max(end - start, 0)),
+                "variance": variance,
+            }
+
+        return aggregates
@@ -2,6 +2,20 @@ from app.configuration.configuration import Configuration
 
 configuration = Configuration ("kv_store.db")
 
+CUSTOMER = "customer"
+TRANSACTION = "transaction"
+
+_change_listeners = []
+
+
+def register_change_listener(listener):
+    _change_listeners.append(listener)
+
+
+def _notify_change(section):
+    for listener in _change_listeners:
+        listener(section)
+
 def get_customer_analysis_settings():
     return {
         'Peer Group Analysis': configuration.get("Peer Group Analysis"),
@@ -13,6 +27,7 @@ def get_customer_analysis_settings():
         'KYC Integrity Check': configuration.get("KYC Integrity Check"),
         'Sanctions List Check': configuration.get("Sanctions List Check"),
         'Watchlist Check': configuration.get("Watchlist Check"),
+        'Fuzzy Name Match Threshold': configuration.get("Fuzzy Name Match Threshold", "0.85"),
         'Geographic Risk Assessment': configuration.get("Geographic Risk Assessment")
     }
 
@@ -27,7 +42,9 @@ def set_customer_analysis_settings(analysis_parameters):
     configuration.set("KYC Integrity Check", analysis_parameters.get('KYC_Integrity_Check', ''))
     configuration.set("Sanctions List Check", analysis_parameters.get('Sanctions_List_Check', ''))
     configuration.set("Watchlist Check", analysis_parameters.get('Watchlist_Check', ''))
+    configuration.set("Fuzzy Name Match Threshold", analysis_parameters.get('Fuzzy_Name_Match_Threshold', ''))
     configuration.set("Geographic Risk Assessment", analysis_parameters.get('Geographic_Risk_Assessment', ''))
+    _notify_change(CUSTOMER)
 
     return {
         "message": "success",
@@ -53,6 +70,7 @@ def set_transaction_analysis_settings(analysis_parameters):
     configuration.set("BrentFord Digit Analysis", analysis_parameters.get('BrentFord_Digit_Analysis', ''))
     configuration.set("Round Number Hoarding Analysis", analysis_parameters.get('Round Number_Hoarding_Analysis', ''))
     configuration.set("Transaction Geographic Analysis", analysis_parameters.get('Transaction_Geographic_Analysis', ''))
+    _notify_change(TRANSACTION)
 
     return {
         "message": "success",
@@ -3,6 +3,9 @@ from app.configuration.configuration import Configuration
 
 configuration = Configuration ("kv_store.db")
 
+# how long the sanction, watch list and country cache is served before it is reloaded in the background
+DEFAULT_REFERENCE_DATA_TTL_SECONDS = "300"
+
 
 def get_database_connection_settings():
     return {
@@ -83,13 +86,15 @@ def get_sanctions_connection_countries_settings():
     return {
         "sanctions_table_name": configuration.get("sanctions_table_name"),
         "watchlist_table_name": configuration.get("watchlist_table_name"),
-        "high_risk_countries_table_name": configuration.get("high_risk_countries_table_name")
+        "high_risk_countries_table_name": configuration.get("high_risk_countries_table_name"),
+        "reference_data_ttl_seconds": configuration.get("reference_data_ttl_seconds") or DEFAULT_REFERENCE_DATA_TTL_SECONDS
     }
 
 def set_sanctionlist_watchlist_countries_settings(sanctions_parameters):
     configuration.set("sanctions_table_name", sanctions_parameters.get('sanctions_table_name', ''))
     configuration.set("watchlist_table_name", sanctions_parameters.get('watchlist_table_name', '')),
     configuration.set("high_risk_countries_table_name", sanctions_parameters.get('high_risk_countries_table_name', ''))
+    configuration.set("reference_data_ttl_seconds", sanctions_parameters.get('reference_data_ttl_seconds', ''))
 
     return {
         "message": "success",
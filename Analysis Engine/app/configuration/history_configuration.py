@@ -0,0 +1,37 @@
+from app.configuration.configuration import Configuration
+
+configuration = Configuration ("kv_store.db")
+
+DEFAULT_HISTORY_SETTINGS = {
+    'history_snapshot_enabled': 'True',
+    'history_snapshot_path': 'history_snapshot',
+    'history_compaction_enabled': 'True',
+    'history_category_columns': 'OCCUPATION,REGION,BRANCHNAME,TRANSACTIONTYPE,BENREGION,ACCOUNTNO',
+    'history_memory_limit_mb': '0',
+    'history_load_chunk_size': '50000',
+    'history_retention_days': '0',
+    'history_eviction_interval_seconds': '3600',
+    'history_refresh_interval_seconds': '60',
+    'history_refresh_overlap_seconds': '300',
+    'history_shared_enabled': 'False',
+    'history_shared_path': 'history_shared',
+    'history_publish_interval_seconds': '300',
+    'history_attach_poll_seconds': '5',
+    'history_scoring_workers': '0',
+    'history_scoring_timeout_seconds': '30',
+}
+
+
+def get_history_settings():
+    # keys added after a kv_store.db was initialized fall back to their defaults
+    return {key: configuration.get(key) or default for key, default in DEFAULT_HISTORY_SETTINGS.items()}
+
+
+def set_history_settings(history_parameters):
+    for key in DEFAULT_HISTORY_SETTINGS:
+        configuration.set(key, history_parameters.get(key, ''))
+
+    return {
+        "message": "success",
+        "setting": history_parameters
+    }
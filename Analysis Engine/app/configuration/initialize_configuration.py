@@ -2,6 +2,7 @@ import app.configuration.analysis_configuration as ac
 import app.configuration.connections_configuration as cc
 import app.configuration.schema_configuration as sc
 import app.configuration.websocket_configuration as wc
+import app.configuration.history_configuration as hc
 import pprint
 
 def initialize_configuration():
@@ -15,6 +16,7 @@ def initialize_configuration():
         'KYC Integrity Check': 'True',
         'Sanctions List Check': 'True',
         'Watchlist Check': 'True',
+        'Fuzzy Name Match Threshold': '0.85',
         'Geographic Risk Assessment': 'True'
     }
     tas = {
@@ -65,7 +67,8 @@ def initialize_configuration():
     swcs = {
         "sanctions_table_name": "sanction_list",
         "watchlist_table_name": "watch_list",
-        "high_risk_countries_table_name": "countries"
+        "high_risk_countries_table_name": "countries",
+        "reference_data_ttl_seconds": "300"
     }
     cc.set_database_connection_settings(dcs)
     cc.set_broker_connection_settings(bcs)
@@ -202,6 +205,8 @@ def initialize_configuration():
     sc.set_schema_configuration_settings(scs)
     wc.set_websocket_settings(wcs)
 
+    hc.set_history_settings(dict(hc.DEFAULT_HISTORY_SETTINGS))
+
 
 
 if __name__ == "__main__":
@@ -222,4 +227,6 @@ if __name__ == "__main__":
     print("\n++++++++++++++++ Schema Configuration Settings ++++++++++++++++\n")
     pprint.pprint(sc.get_schema_configuration_settings())
     print("\n++++++++++++++++ Websocket Configuration Settings ++++++++++++++++\n")
-    pprint.pprint(wc.get_websocket_settings())
\ No newline at end of file
+    pprint.pprint(wc.get_websocket_settings())
+    print("\n++++++++++++++++ History Settings ++++++++++++++++\n")
+    pprint.pprint(hc.get_history_settings())
\ No newline at end of file
@@ -6,16 +6,16 @@ import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-logging.info("[Database Service] Checking and Creating Tables for the engine .....")
-engine = get_engine()
-Base.metadata.create_all(engine)
-logging.info("[Database Service] Checked and Created tables successfully!")
 
-if __name__ == "__main__":
-    logging.info("Initializing database and creating tables...")
+def create_tables():
+    # called by the startup initializer, importing this module no longer touches the database
+    logging.info("[Database Service] Checking and Creating Tables for the engine .....")
     engine = get_engine()
     Base.metadata.create_all(engine)
-    logging.info("Database tables created successfully.")
-
+    logging.info("[Database Service] Checked and Created tables successfully!")
 
 
+if __name__ == "__main__":
+    logging.info("Initializing database and creating tables...")
+    create_tables()
+    logging.info("Database tables created successfully.")
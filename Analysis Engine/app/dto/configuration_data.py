@@ -22,6 +22,7 @@ class CustomerRelatedAnalysis(BaseModel):
     KYC_Integrity_Check: Optional[str] = None
     Sanctions_List_Check: Optional[str] = None
     Watchlist_Check: Optional[str] = None
+    Fuzzy_Name_Match_Threshold: Optional[str] = None 
     Geographic_Risk_Assessment: Optional[str] = None
 
 class DataAnalysisConfigurations(BaseModel):
@@ -64,6 +65,7 @@ class OtherSettings(BaseModel):
     sanctions_table_name: Optional[str] = None
     watchlist_table_name: Optional[str] = None
     high_risk_countries_table_name: Optional[str] = None
+    reference_data_ttl_seconds: Optional[str] = None # Stored as string
 
 class ConnectionConfigurations(BaseModel):
     """Main container for Connection settings."""
@@ -139,10 +141,30 @@ class WebhookConfigurations(BaseModel):
     use_ssl: Optional[str] = None
     send_interval: Optional[str] = None # Stored as string
 
+class HistorySettings(BaseModel):
+    """In-memory Transaction History Settings."""
+    history_snapshot_enabled: Optional[str] = None
+    history_snapshot_path: Optional[str] = None
+    history_compaction_enabled: Optional[str] = None
+    history_category_columns: Optional[str] = None
+    history_memory_limit_mb: Optional[str] = None
+    history_load_chunk_size: Optional[str] = None
+    history_retention_days: Optional[str] = None
+    history_eviction_interval_seconds: Optional[str] = None
+    history_refresh_interval_seconds: Optional[str] = None
+    history_refresh_overlap_seconds: Optional[str] = None
+    history_shared_enabled: Optional[str] = None
+    history_shared_path: Optional[str] = None
+    history_publish_interval_seconds: Optional[str] = None
+    history_attach_poll_seconds: Optional[str] = None
+    history_scoring_workers: Optional[str] = None
+    history_scoring_timeout_seconds: Optional[str] = None
+
 
 class SettingsRootDTO(BaseModel):
   
     Data_Analysis_Configurations: Optional[DataAnalysisConfigurations] = None
     Connection_Configurations: Optional[ConnectionConfigurations] = None
     Central_Core_Database_Data_Schema_Mapping: Optional[DataSchemaMapping] = None
-    Webhook_Configurations: Optional[WebhookConfigurations] = None
\ No newline at end of file
+    Webhook_Configurations: Optional[WebhookConfigurations] = None
+    History_Settings: Optional[HistorySettings] = None
\ No newline at end of file
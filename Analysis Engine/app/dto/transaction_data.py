@@ -1,6 +1,7 @@
 from dataclasses import dataclass, asdict
 from typing import Optional, List
 import pandas as pd
+from app.dto.transaction_record import TransactionRecord
 
 @dataclass
 class TransactionDataDTO:
@@ -67,11 +68,15 @@ class TransactionDataDTO:
         df = pd.DataFrame(data_list)
         return df
     
-    def generate_transaction_series(cls, transaction: TransactionDataDTO) -> pd.Series:
+    def generate_transaction_series(cls, transaction: 'TransactionDataDTO') -> pd.Series:
         data = asdict(transaction)
         ps = pd.Series(data)
 
         return ps
 
+    def to_record(self) -> TransactionRecord:
+        # the scoring path normalizes one transaction at a time, a Series and preprocessing() cost milliseconds per request
+        return TransactionRecord.from_values(self.__dict__)
+
     def get_timestamp(self) -> pd.Timestamp:
         return pd.to_datetime(f"{self.TRANSACTIONDATE} {self.TRANSACTIONTIME}")
\ No newline at end of file
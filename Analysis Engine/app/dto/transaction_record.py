@@ -0,0 +1,76 @@
+from datetime import datetime, date, time, timezone
+import math
+import pandas as pd
+
+DATE_COLUMNS = ('TRANSACTIONDATE', 'TRANSACTIONTIME', 'BIRTHDATE', 'OPENEDDATE', 'CLOSEDDATE')
+# amounts that do not start with a digit, such as negative or missing ones
+NO_LEADING_DIGIT = -1
+
+
+def parse_utc(value, day: date = None):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return pd.NaT
+
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            try:
+                # a bare time of day lands on the transaction's own date, today only when there is none
+                parsed = datetime.combine(day if day is not None else date.today(), time.fromisoformat(text))
+            except ValueError:
+                return pd.to_datetime(value, errors='coerce', utc=True)
+    elif isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime(value.year, value.month, value.day)
+    else:
+        return pd.to_datetime(value, errors='coerce', utc=True)
+
+    parsed = parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+    return pd.Timestamp(parsed)
+
+
+def leading_digit(amount) -> int:
+    text = str(amount)
+    return int(text[0]) if text[:1].isdigit() else NO_LEADING_DIGIT
+
+
+class TransactionRecord(dict):
+    """One normalized transaction, the single row counterpart of preprocessing() built without a DataFrame."""
+
+    @classmethod
+    def from_values(cls, values, now=None):
+        record = cls(values)
+        # kept for the risk profiles, which store the timestamp as it was received
+        record.received_timestamp = f"{values.get('TRANSACTIONDATE')} {values.get('TRANSACTIONTIME')}"
+
+        if 'TRANSACTIONDATE' in values and 'TRANSACTIONTIME' in values:
+            record['TIMESTAMP'] = parse_utc(record.received_timestamp)
+
+        for column in DATE_COLUMNS:
+            if column in values:
+                record[column] = parse_utc(values[column])
+
+        if 'TRANSACTIONTIME' in values and not pd.isna(record.get('TRANSACTIONDATE', pd.NaT)):
+            record['TRANSACTIONTIME'] = parse_utc(values['TRANSACTIONTIME'], day=record['TRANSACTIONDATE'].date())
+
+        if 'AMOUNTINBIRR' in values:
+            record['BRENTFORDIGIT'] = leading_digit(values['AMOUNTINBIRR'])
+
+        if 'OPENEDDATE' in values:
+            now = now if now is not None else pd.Timestamp.now(tz="UTC")
+            opened = record['OPENEDDATE']
+            record['ACCOUNT_AGE_DAYS'] = math.nan if opened is pd.NaT else (now - opened).days
+
+        record['ACCOUNTNO'] = str(values.get('ACCOUNTNO'))
+        return record
+
+    @property
+    def timestamp(self) -> pd.Timestamp:
+        return self.get('TIMESTAMP', pd.NaT)
+
+    @property
+    def account_age_days(self):
+        return self.get('ACCOUNT_AGE_DAYS', math.nan)
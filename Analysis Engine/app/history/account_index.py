@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+
+class AccountIndex:
+    """Transaction history ordered by ACCOUNTNO and TIMESTAMP with an offset table per account."""
+
+    def __init__(self, df: pd.DataFrame, account_column: str = "ACCOUNTNO", time_column: str = "TIMESTAMP", offsets: dict = None):
+        self.account_column = account_column
+        self.time_column = time_column
+
+        if offsets is not None:
+            # a frame published by another process is already in account order
+            self.df = df
+            self.offsets = offsets
+            return
+
+        self.df = self._sort(df)
+        self.offsets = self._build_offsets(self.df)
+
+    def _sort(self, df):
+        if df is None:
+            return pd.DataFrame()
+        if df.empty or self.account_column not in df.columns:
+            return df
+
+        by = [self.account_column]
+        if self.time_column in df.columns:
+            by.append(self.time_column)
+
+        # lexsort on several keys is stable, so rows sharing a timestamp keep their load order
+        df = df.sort_values(by=by, kind="stable")
+        df.reset_index(drop=True, inplace=True)
+        return df
+
+    def _build_offsets(self, df):
+        if df.empty or self.account_column not in df.columns:
+            return {}
+
+        accounts = df[self.account_column].to_numpy()
+        boundaries = np.flatnonzero(accounts[1:] != accounts[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(accounts)]))
+
+        return {accounts[start]: (int(start), int(end)) for start, end in zip(starts, ends)}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, account_no):
+        return account_no in self.offsets
+
+    def get(self, account_no) -> pd.DataFrame:
+        bounds = self.offsets.get(account_no)
+        if bounds is None:
+            return self.df.iloc[0:0]
+
+        start, end = bounds
+        return self.df.iloc[start:end]
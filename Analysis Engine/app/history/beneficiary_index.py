@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+
+def to_datetime64(values) -> np.ndarray:
+    timestamps = pd.to_datetime(pd.Series(values), errors="coerce", utc=True)
+    return timestamps.dt.tz_convert(None).to_numpy(dtype="datetime64[ns]")
+
+
+class BeneficiaryIndex:
+    """Inbound transfers grouped by BENACCOUNTNO and ordered by TIMESTAMP."""
+
+    def __init__(self, df: pd.DataFrame, beneficiary_column: str = "BENACCOUNTNO", time_column: str = "TIMESTAMP", amount_column: str = "AMOUNTINBIRR"):
+        self.timestamps = np.array([], dtype="datetime64[ns]")
+        self.amounts = np.array([], dtype=float)
+        self.offsets = {}
+
+        if df is None or df.empty or any(column not in df.columns for column in (beneficiary_column, time_column, amount_column)):
+            return
+
+        timestamps = to_datetime64(df[time_column])
+        valid = ~np.isnat(timestamps)
+
+        beneficiaries = df[beneficiary_column].to_numpy()[valid]
+        timestamps = timestamps[valid]
+        amounts = pd.to_numeric(df[amount_column], errors="coerce").to_numpy(dtype=float)[valid]
+
+        codes, uniques = pd.factorize(beneficiaries)
+        order = np.lexsort((timestamps, codes))
+        codes = codes[order]
+
+        self.timestamps = timestamps[order]
+        self.amounts = amounts[order]
+
+        boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(codes)]))
+
+        self.offsets = {uniques[codes[start]]: (int(start), int(end)) for start, end in zip(starts, ends) if codes[start] >= 0}
+
+    @classmethod
+    def from_arrays(cls, timestamps: np.ndarray, amounts: np.ndarray, offsets: dict):
+        index = cls(None)
+        index.timestamps = timestamps
+        index.amounts = amounts
+        index.offsets = offsets
+        return index
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def amount_between(self, beneficiary, start_time, end_time) -> float:
+        # same (start_time, end_time] convention as the account time windows
+        bounds = self.offsets.get(beneficiary)
+        if bounds is None:
+            return 0.0
+
+        start, end = bounds
+        timestamps = self.timestamps[start:end]
+        low, high = np.searchsorted(timestamps, [start_time, end_time], side="right")
+
+        return float(np.nansum(self.amounts[start + low:start + high]))
+
+    def amounts_between(self, beneficiary, start_times, end_times) -> np.ndarray:
+        bounds = self.offsets.get(beneficiary)
+        if bounds is None:
+            return np.zeros(len(start_times))
+
+        start, end = bounds
+        timestamps = self.timestamps[start:end]
+        prefix = np.concatenate(([0.0], np.cumsum(np.nan_to_num(self.amounts[start:end]))))
+
+        low = np.searchsorted(timestamps, start_times, side="right")
+        high = np.maximum(np.searchsorted(timestamps, end_times, side="right"), low)
+
+        return prefix[high] - prefix[low]
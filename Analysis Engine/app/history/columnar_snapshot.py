@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import time
+import logging
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype, is_bool_dtype
+
+
+class ColumnarSnapshot:
+    """Preprocessed history persisted one .npy file per column, with the TIMESTAMP watermark it covers."""
+
+    FORMAT_VERSION = 1
+    META_FILE = "meta.json"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, self.META_FILE))
+
+    def read_meta(self):
+        if not self.exists():
+            return None
+        with open(os.path.join(self.path, self.META_FILE)) as f:
+            return json.load(f)
+
+    @staticmethod
+    def watermark_of(df: pd.DataFrame):
+        if df.empty or 'TIMESTAMP' not in df.columns:
+            return None
+        watermark = df['TIMESTAMP'].max()
+        return None if pd.isna(watermark) else pd.Timestamp(watermark).isoformat()
+
+    def save(self, df: pd.DataFrame, watermark=None):
+        started = time.perf_counter()
+        temporary_path = f"{self.path}.tmp"
+        shutil.rmtree(temporary_path, ignore_errors=True)
+        os.makedirs(temporary_path)
+
+        columns = {}
+        for position, column in enumerate(df.columns):
+            series = df[column]
+            file_name = f"{position:03d}.npy"
+            entry = {"file": file_name, "dtype": str(series.dtype)}
+
+            if is_datetime64_any_dtype(series.dtype):
+                timezone = getattr(series.dt, "tz", None)
+                values = series.dt.tz_convert(None) if timezone is not None else series
+                entry.update(kind="datetime", tz=str(timezone) if timezone is not None else None)
+                np.save(os.path.join(temporary_path, file_name), values.to_numpy())
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                # the codes are stored as they are, so a loaded categorical can sit directly on the mapped file
+                entry.update(kind="categorical", values=f"{position:03d}.values.npy")
+                np.save(os.path.join(temporary_path, file_name), series.cat.codes.to_numpy())
+                np.save(os.path.join(temporary_path, entry["values"]), np.asarray(series.cat.categories, dtype=object), allow_pickle=True)
+            elif is_numeric_dtype(series.dtype) or is_bool_dtype(series.dtype):
+                entry.update(kind="numeric")
+                np.save(os.path.join(temporary_path, file_name), series.to_numpy())
+            else:
+                # text columns are dictionary encoded: int32 codes plus the distinct values
+                codes, uniques = pd.factorize(series, use_na_sentinel=True)
+                entry.update(kind="dictionary", values=f"{position:03d}.values.npy")
+                np.save(os.path.join(temporary_path, file_name), codes.astype(np.int32))
+                np.save(os.path.join(temporary_path, entry["values"]), np.asarray(uniques, dtype=object), allow_pickle=True)
+
+            columns[column] = entry
+
+        meta = {
+            "version": self.FORMAT_VERSION,
+            "rows": len(df),
+            "watermark": watermark if watermark is not None else self.watermark_of(df),
+            "created_at": time.time(),
+            "columns": columns,
+        }
+        with open(os.path.join(temporary_path, self.META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(temporary_path, self.path)
+
+        logging.info(f"[Columnar Snapshot] Wrote {len(df)} rows up to {meta['watermark']} to {self.path} in {time.perf_counter() - started:.2f}s")
+        return meta
+
+    def load(self, columns=None):
+        meta = self.read_meta()
+        if meta is None:
+            return None, None
+
+        if meta.get("version") != self.FORMAT_VERSION:
+            logging.info(f"[Columnar Snapshot] {self.path} has format version {meta.get('version')}, expected {self.FORMAT_VERSION}; ignoring it")
+            return None, None
+
+        if columns is not None and not set(columns) <= set(meta["columns"]):
+            logging.info(f"[Columnar Snapshot] {self.path} is missing columns {sorted(set(columns) - set(meta['columns']))}; ignoring it")
+            return None, None
+
+        started = time.perf_counter()
+        data = {}
+        for column, entry in meta["columns"].items():
+            values = np.load(os.path.join(self.path, entry["file"]), mmap_mode="r")
+
+            if entry["kind"] == "datetime":
+                if entry.get("tz"):
+                    # tz_localize would copy, the stored values are UTC already and are viewed as such
+                    unit = np.datetime_data(values.dtype)[0]
+                    data[column] = pd.array(values.view("int64"), dtype=pd.DatetimeTZDtype(unit, entry["tz"]), copy=False)
+                else:
+                    data[column] = pd.array(values, copy=False)
+            elif entry["kind"] == "numeric":
+                data[column] = values
+            elif entry["kind"] == "categorical":
+                categories = np.load(os.path.join(self.path, entry["values"]), allow_pickle=True)
+                data[column] = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(categories))
+            else:
+                uniques = np.load(os.path.join(self.path, entry["values"]), allow_pickle=True)
+                decoded = np.empty(len(values), dtype=object)
+                present = values >= 0
+                decoded[present] = uniques[values[present]]
+                decoded[~present] = None
+                data[column] = decoded
+                if entry["dtype"] != "object":
+                    # string extension dtypes are restored, anything that does not convert stays as objects
+                    try:
+                        data[column] = pd.array(decoded, dtype=entry["dtype"])
+                    except (TypeError, ValueError):
+                        pass
+
+        # without a copy the numeric, datetime and categorical columns stay on the memory mapped files
+        df = pd.DataFrame(data, copy=False)
+        logging.info(f"[Columnar Snapshot] Loaded {len(df)} rows up to {meta['watermark']} from {self.path} in {time.perf_counter() - started:.2f}s")
+        return df, meta["watermark"]
@@ -0,0 +1,145 @@
+import bisect
+import math
+import threading
+import numpy as np
+import pandas as pd
+
+
+class _SortedAmounts:
+    __slots__ = ("values", "pending", "missing")
+
+    def __init__(self, values, missing=0):
+        self.values = values
+        self.pending = []
+        self.missing = missing
+
+    def __len__(self):
+        return len(self.values) + len(self.pending) + self.missing
+
+
+class GroupPercentiles:
+    """Sorted AMOUNTINBIRR arrays per (dimension, value) so a percentile rank is a binary search."""
+
+    DIMENSIONS = ("BRANCHNAME", "TRANSACTIONTYPE")
+
+    def __init__(self, df: pd.DataFrame = None, dimensions=DIMENSIONS, amount_column: str = "AMOUNTINBIRR", merge_threshold: int = 1024):
+        self.dimensions = tuple(dimensions)
+        self.amount_column = amount_column
+        self.merge_threshold = merge_threshold
+        self.groups = {}
+        self._lock = threading.Lock()
+
+        if df is not None:
+            self.build(df)
+
+    def build(self, df: pd.DataFrame):
+        groups = {}
+        if df.empty or self.amount_column not in df.columns:
+            self.groups = groups
+            return
+
+        amounts = pd.to_numeric(df[self.amount_column], errors="coerce").to_numpy(dtype=float)
+
+        for dimension in self.dimensions:
+            if dimension not in df.columns:
+                continue
+
+            codes, uniques = pd.factorize(df[dimension])
+            order = np.lexsort((amounts, codes))
+            sorted_codes = codes[order]
+            sorted_amounts = amounts[order]
+
+            boundaries = np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(sorted_codes)]))
+
+            for start, end in zip(starts, ends):
+                code = sorted_codes[start]
+                if code < 0:
+                    continue
+
+                values = sorted_amounts[start:end]
+                missing = np.isnan(values)
+                # lexsort places NaN last, so the non-missing prefix stays sorted
+                groups[(dimension, uniques[code])] = _SortedAmounts(values[~missing].copy(), int(missing.sum()))
+
+        self.groups = groups
+
+    def update(self, record):
+        amount = pd.to_numeric(record.get(self.amount_column), errors="coerce")
+
+        with self._lock:
+            for dimension in self.dimensions:
+                value = record.get(dimension)
+                if value is None or pd.isna(value):
+                    continue
+
+                group = self.groups.get((dimension, value))
+                if group is None:
+                    group = self.groups[(dimension, value)] = _SortedAmounts(np.array([], dtype=float))
+
+                if pd.isna(amount):
+                    group.missing += 1
+                    continue
+
+                bisect.insort(group.pending, float(amount))
+                if len(group.pending) >= self.merge_threshold:
+                    pending = np.asarray(group.pending, dtype=float)
+                    group.values = np.insert(group.values, np.searchsorted(group.values, pending), pending)
+                    group.pending = []
+
+    def state(self) -> dict:
+        # merged arrays are replaced rather than modified, only the pending lists need copying
+        with self._lock:
+            return {key: (group.values, list(group.pending), group.missing) for key, group in self.groups.items()}
+
+    def frozen(self) -> "GroupPercentiles":
+        # the merged arrays are shared, only the short pending lists are copied
+        frozen = GroupPercentiles(dimensions=self.dimensions, amount_column=self.amount_column, merge_threshold=self.merge_threshold)
+        frozen.load_state(self.state())
+        return frozen
+
+    def load_state(self, state: dict):
+        groups = {}
+        for key, (values, pending, missing) in state.items():
+            group = groups[key] = _SortedAmounts(values, missing)
+            group.pending = list(pending)
+        self.groups = groups
+
+    def percentile(self, dimension, value, amount):
+        if value is None or pd.isna(value):
+            return None
+
+        with self._lock:
+            group = self.groups.get((dimension, value))
+            if group is None or len(group) == 0:
+                return None
+
+            amount = float(amount)
+            if math.isnan(amount):
+                return 0.0
+
+            below = int(np.searchsorted(group.values, amount, side="left")) + bisect.bisect_left(group.pending, amount)
+            return below / len(group) * 100
+
+    def ranks(self, dimension, value, amounts):
+        # the number of amounts of the group below each of the given ones, and the size of the group
+        amounts = np.asarray(amounts, dtype=float)
+        if value is None or pd.isna(value):
+            return np.zeros(len(amounts), dtype=int), 0
+
+        with self._lock:
+            group = self.groups.get((dimension, value))
+            if group is None or len(group) == 0:
+                return np.zeros(len(amounts), dtype=int), 0
+
+            below = np.searchsorted(group.values, amounts, side="left") + np.searchsorted(np.asarray(group.pending, dtype=float), amounts, side="left")
+            return below, len(group)
+
+    def percentiles(self, dimension, value, amounts):
+        amounts = np.asarray(amounts, dtype=float)
+        below, total = self.ranks(dimension, value, amounts)
+        if total == 0:
+            return None
+
+        return np.where(np.isnan(amounts), 0.0, below / total * 100)
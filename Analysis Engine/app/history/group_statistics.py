@@ -0,0 +1,110 @@
+import math
+import threading
+import pandas as pd
+
+
+class GroupStatistics:
+    """Count, mean and variance of AMOUNTINBIRR per (dimension, value), maintained online with Welford's method."""
+
+    POPULATION = "POPULATION"
+    DIMENSIONS = ("BRANCHNAME", "TRANSACTIONTYPE", "OCCUPATION", "REGION", "ACCOUNT_AGE_DAYS")
+
+    def __init__(self, df: pd.DataFrame = None, dimensions=DIMENSIONS, amount_column: str = "AMOUNTINBIRR"):
+        self.dimensions = tuple(dimensions)
+        self.amount_column = amount_column
+        self.stats = {}
+        self._lock = threading.Lock()
+
+        if df is not None:
+            self.build(df)
+
+    def build(self, df: pd.DataFrame):
+        stats = {}
+        if df.empty or self.amount_column not in df.columns:
+            self.stats = stats
+            return
+
+        amounts = pd.to_numeric(df[self.amount_column], errors="coerce")
+        stats[(self.POPULATION, None)] = self._from_moments(amounts.count(), amounts.mean(), amounts.var())
+
+        for dimension in self.dimensions:
+            if dimension not in df.columns:
+                continue
+
+            grouped = amounts.groupby(df[dimension], observed=True, sort=False).agg(["count", "mean", "var"])
+            for value, count, mean, var in zip(grouped.index.tolist(), grouped["count"].tolist(),
+                                               grouped["mean"].tolist(), grouped["var"].tolist()):
+                stats[(dimension, value)] = self._from_moments(count, mean, var)
+
+        self.stats = stats
+
+    @staticmethod
+    def _from_moments(count, mean, var):
+        count = int(count)
+        m2 = float(var) * (count - 1) if count > 1 else 0.0
+        return (count, float(mean), m2)
+
+    @staticmethod
+    def describe(amounts: pd.Series):
+        if len(amounts) == 0:
+            return None
+
+        amounts = pd.to_numeric(amounts, errors="coerce")
+        return (int(amounts.count()), amounts.mean(), amounts.std())
+
+    def _keys(self, record):
+        yield (self.POPULATION, None)
+        for dimension in self.dimensions:
+            value = record.get(dimension)
+            if value is not None and not pd.isna(value):
+                yield (dimension, value)
+
+    def update(self, record):
+        amount = pd.to_numeric(record.get(self.amount_column), errors="coerce")
+        if pd.isna(amount):
+            return
+        amount = float(amount)
+
+        with self._lock:
+            for key in self._keys(record):
+                count, mean, m2 = self.stats.get(key, (0, math.nan, 0.0))
+
+                count += 1
+                if count == 1:
+                    mean, m2 = amount, 0.0
+                else:
+                    delta = amount - mean
+                    mean += delta / count
+                    m2 += delta * (amount - mean)
+
+                # entries are replaced, never mutated, so readers always see a consistent tuple
+                self.stats[key] = (count, mean, m2)
+
+    def state(self) -> dict:
+        # entries are immutable tuples, a shallow copy is a consistent picture
+        with self._lock:
+            return dict(self.stats)
+
+    def load_state(self, state: dict):
+        self.stats = dict(state)
+
+    def frozen(self) -> "GroupStatistics":
+        # a copy for one snapshot, later updates replace entries of the live dict only
+        frozen = GroupStatistics(dimensions=self.dimensions, amount_column=self.amount_column)
+        frozen.load_state(self.state())
+        return frozen
+
+    def moments(self, dimension, value=None):
+        # count, mean and the sum of squared deviations, the form two sets of amounts are merged in
+        if value is not None and pd.isna(value):
+            return None
+        return self.stats.get((dimension, value))
+
+    def get(self, dimension, value=None):
+        entry = self.moments(dimension, value)
+        if entry is None:
+            return None
+
+        count, mean, m2 = entry
+        std = math.sqrt(max(m2, 0.0) / (count - 1)) if count > 1 else math.nan
+        return (count, mean, std)
@@ -0,0 +1,172 @@
+import logging
+import time
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from pandas.api.types import is_bool_dtype, is_float_dtype, is_integer_dtype, is_object_dtype, is_string_dtype
+
+
+# columns that are only read to build another one, a dropped column counts as filled whenever its source is
+DERIVED_COLUMNS = {
+    'TRANSACTIONDATE': 'TIMESTAMP',
+    'TRANSACTIONTIME': 'TIMESTAMP',
+}
+
+# the risk statistics are computed in the column's own dtype, float32 amounts would shift the scores
+FULL_PRECISION_COLUMNS = ("AMOUNTINBIRR",)
+
+CATEGORY_COLUMNS = ("OCCUPATION", "REGION", "BRANCHNAME", "TRANSACTIONTYPE", "BENREGION", "ACCOUNTNO")
+
+# a category only pays off when values repeat, past this share of distinct values the column is left alone
+CATEGORY_MAX_DISTINCT_RATIO = 0.5
+
+
+def completeness_ratios(df: pd.DataFrame) -> np.ndarray:
+    if len(df.columns) == 0:
+        return np.zeros(len(df))
+
+    filled = df.notna().sum(axis=1).to_numpy()
+    total = len(df.columns)
+
+    for column, source in DERIVED_COLUMNS.items():
+        if column not in df.columns and source in df.columns:
+            filled = filled + df[source].notna().to_numpy()
+            total += 1
+
+    return filled / total
+
+
+def completeness_ratio(record: pd.Series) -> float:
+    return float(completeness_ratios(record.to_frame().T)[0])
+
+
+def compact_history(df: pd.DataFrame, category_columns=CATEGORY_COLUMNS, drop_derived: bool = True) -> pd.DataFrame:
+    if df is None or df.empty:
+        return df
+
+    if drop_derived:
+        dropped = [column for column, source in DERIVED_COLUMNS.items() if column in df.columns and source in df.columns]
+        df = df.drop(columns=dropped)
+
+    for column in df.columns:
+        series = df[column]
+        dtype = series.dtype
+
+        if isinstance(dtype, pd.CategoricalDtype) or is_bool_dtype(dtype):
+            continue
+
+        if is_integer_dtype(dtype):
+            df[column] = pd.to_numeric(series, downcast='integer')
+        elif is_float_dtype(dtype) and column not in FULL_PRECISION_COLUMNS:
+            narrowed = series.astype(np.float32)
+            # only narrowed when every value survives the round trip
+            if np.array_equal(narrowed.to_numpy(dtype=float), series.to_numpy(dtype=float), equal_nan=True):
+                df[column] = narrowed
+        elif column in category_columns and (is_object_dtype(dtype) or is_string_dtype(dtype)):
+            if series.nunique(dropna=True) <= CATEGORY_MAX_DISTINCT_RATIO * len(series):
+                df[column] = series.astype('category')
+
+    return df
+
+
+def concat_compacted(frames) -> pd.DataFrame:
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+
+    # chunks carry their own categories, concat would fall back to objects unless they are unioned first
+    categorical = [
+        column for column in frames[0].columns
+        if all(column in frame.columns and isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames)
+    ]
+    unioned = {column: union_categoricals([frame[column] for frame in frames]) for column in categorical}
+
+    df = pd.concat([frame.drop(columns=categorical) for frame in frames], ignore_index=True)
+    for column in categorical:
+        df[column] = unioned[column]
+
+    columns = list(frames[0].columns)
+    return df[columns + [column for column in df.columns if column not in columns]]
+
+
+class MemoryLimitReport:
+    """Counts the transactions the memory limit dropped from the history, for /metrics."""
+
+    def __init__(self):
+        self.limit_mb = 0
+        self.usage_mb = None
+        self.rows = None
+        self.dropped = 0
+        self.last_dropped = 0
+        self.last_trim = None
+
+    def stats(self) -> dict:
+        return {
+            "limit_mb": self.limit_mb,
+            "usage_mb": self.usage_mb,
+            "rows": self.rows,
+            "dropped": self.dropped,
+            "last_dropped": self.last_dropped,
+            "last_trim": self.last_trim,
+        }
+
+    def record(self, limit_mb: float, usage: float, rows: int, dropped: int = 0):
+        self.limit_mb = limit_mb
+        self.usage_mb = round(usage / 1024**2, 2)
+        self.rows = rows
+        if dropped:
+            self.dropped += dropped
+            self.last_dropped = dropped
+            self.last_trim = time.time()
+
+
+memory_limit = MemoryLimitReport()
+
+
+def enforce_memory_limit(df: pd.DataFrame, limit_mb: float) -> pd.DataFrame:
+    if not limit_mb or df is None or df.empty:
+        return df
+
+    usage = df.memory_usage(deep=True).sum()
+    limit = limit_mb * 1024**2
+    if usage <= limit:
+        memory_limit.record(limit_mb, usage, len(df))
+        return df
+
+    # the scoring windows look back from the present, so the oldest transactions go first
+    if 'TIMESTAMP' in df.columns and not df['TIMESTAMP'].is_monotonic_increasing:
+        df = df.sort_values(by='TIMESTAMP', kind='stable', na_position='first')
+
+    keep = int(len(df) * limit / usage)
+    trimmed = df.iloc[len(df) - keep:].reset_index(drop=True)
+
+    for column in trimmed.columns:
+        if isinstance(trimmed[column].dtype, pd.CategoricalDtype):
+            trimmed[column] = trimmed[column].cat.remove_unused_categories()
+
+    memory_limit.record(limit_mb, trimmed.memory_usage(deep=True).sum(), len(trimmed), dropped=len(df) - keep)
+    logging.warning(f"[History Compaction] History uses {usage / 1024**2:.2f} MB, above the {limit_mb} MB limit; "
+                    f"dropped the {len(df) - keep} oldest of {len(df)} transactions")
+    return trimmed
+
+
+def column_memory(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "dtype": df.dtypes.astype(str),
+        "mb": df.memory_usage(deep=True, index=False) / 1024**2,
+    })
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    after = after.reindex(before.index)
+
+    report = pd.DataFrame({
+        "dtype_before": before["dtype"],
+        "mb_before": before["mb"],
+        "dtype_after": after["dtype"].fillna("dropped"),
+        "mb_after": after["mb"].fillna(0.0),
+    })
+    report.loc["TOTAL"] = ["", report["mb_before"].sum(), "", report["mb_after"].sum()]
+    return report.round(2)
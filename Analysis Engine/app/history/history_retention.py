@@ -0,0 +1,82 @@
+import threading
+import time
+import logging
+import pandas as pd
+
+
+class HistoryRetention:
+    """Evicts raw transactions older than the retention horizon from the history store on a schedule."""
+
+    def __init__(self, store, retention_days: float = 0, interval_seconds: float = 3600):
+        self.store = store
+        self.retention_days = retention_days
+        self.interval_seconds = interval_seconds
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.evicted = 0
+        self.last_run = None
+        self.last_cutoff = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    def stats(self) -> dict:
+        return {
+            "retention_days": self.retention_days,
+            "rows": len(self.store),
+            "evicted": self.evicted,
+            "last_run": self.last_run,
+            "last_cutoff": self.last_cutoff,
+        }
+
+    def run_once(self) -> int:
+        cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=self.retention_days)
+
+        started = time.perf_counter()
+        evicted = self.store.evict_before(cutoff)
+
+        self.evicted += evicted
+        self.last_run = time.time()
+        self.last_cutoff = cutoff.isoformat()
+        logging.info(f"[History Retention] Evicted {evicted} transactions before {self.last_cutoff}, {len(self.store)} kept ({time.perf_counter() - started:.2f}s)")
+        return evicted
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"[History Retention] Eviction failed, keeping the current history: {e}")
+            self._stopped.wait(self.interval_seconds)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if not self.enabled:
+            logging.info("[History Retention] Disabled, every loaded transaction is kept in memory")
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="history-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @classmethod
+    def from_settings(cls, store, settings: dict):
+        try:
+            retention_days = float(settings.get('history_retention_days') or 0)
+            interval_seconds = float(settings.get('history_eviction_interval_seconds') or 3600)
+        except (TypeError, ValueError):
+            logging.error(f"[History Retention] Invalid retention settings {settings.get('history_retention_days')!r} / "
+                          f"{settings.get('history_eviction_interval_seconds')!r}, retention disabled")
+            retention_days, interval_seconds = 0, 3600
+        return cls(store, retention_days, interval_seconds)
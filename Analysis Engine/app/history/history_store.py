@@ -0,0 +1,338 @@
+import bisect
+import threading
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype, is_bool_dtype
+from app.history.account_index import AccountIndex
+from app.history.group_statistics import GroupStatistics
+from app.history.group_percentiles import GroupPercentiles
+from app.history.beneficiary_index import BeneficiaryIndex, to_datetime64
+from app.history.value_counts import ValueCounts
+
+
+class HistorySnapshot:
+    """Read-only view of the history as it was when the snapshot was taken."""
+
+    def __init__(self, store, account_index, beneficiary_index, columns, dtypes, chunks, chunk_frames, account_rows, beneficiary_rows, appended,
+                 group_statistics, group_percentiles, value_counts):
+        self.store = store
+        self.account_index = account_index
+        self.beneficiary_index = beneficiary_index
+        # frozen with the row count, later appends do not move the peer statistics under a request being scored
+        self.group_statistics = group_statistics
+        self.group_percentiles = group_percentiles
+        self.value_counts = value_counts
+        # a swap or eviction may change the store's columns, the chunks of this snapshot were written with these
+        self.columns = columns
+        self.dtypes = dtypes
+        self._chunks = chunks
+        self._chunk_frames = chunk_frames
+        self._account_rows = account_rows
+        self._beneficiary_rows = beneficiary_rows
+        self.appended = appended
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.account_index.df
+
+    def __len__(self):
+        return len(self.account_index.df) + self.appended
+
+    def account_history(self, account_no) -> pd.DataFrame:
+        base = self.account_index.get(account_no)
+
+        positions = self._account_rows.get(account_no)
+        if not positions:
+            return base
+
+        positions = positions[:bisect.bisect_left(positions, self.appended)]
+        if not positions:
+            return base
+
+        delta = self.store._materialize(self._chunks, positions, self.columns, self.dtypes)
+        history = pd.concat([base, delta], ignore_index=True)
+
+        # live transactions can arrive out of order, the window features need them sorted
+        if 'TIMESTAMP' in history.columns and not history['TIMESTAMP'].is_monotonic_increasing:
+            history = history.sort_values(by='TIMESTAMP', kind='stable').reset_index(drop=True)
+
+        return history
+
+    def inbound_amount(self, account_no, start_time, end_time) -> float:
+        start, end = to_datetime64([start_time, end_time])
+        amount = self.beneficiary_index.amount_between(account_no, start, end)
+
+        positions = self._beneficiary_rows.get(account_no)
+        if not positions:
+            return amount
+
+        chunk_size = self.store.chunk_size
+        for position in positions[:bisect.bisect_left(positions, self.appended)]:
+            chunk = self._chunks[position // chunk_size]
+            timestamp = pd.Timestamp(chunk['TIMESTAMP'][position % chunk_size])
+            value = pd.to_numeric(chunk['AMOUNTINBIRR'][position % chunk_size], errors='coerce')
+
+            if pd.notna(timestamp) and pd.notna(value) and start_time < timestamp <= end_time:
+                amount += float(value)
+
+        return amount
+
+    def inbound_amounts(self, account_no, start_times, end_times) -> np.ndarray:
+        start_times, end_times = to_datetime64(start_times), to_datetime64(end_times)
+        amounts = self.beneficiary_index.amounts_between(account_no, start_times, end_times)
+
+        positions = self._beneficiary_rows.get(account_no)
+        if not positions:
+            return amounts
+
+        positions = positions[:bisect.bisect_left(positions, self.appended)]
+        if not positions:
+            return amounts
+
+        chunk_size = self.store.chunk_size
+        timestamps = to_datetime64([self._chunks[position // chunk_size]['TIMESTAMP'][position % chunk_size] for position in positions])
+        values = pd.to_numeric(pd.Series([self._chunks[position // chunk_size]['AMOUNTINBIRR'][position % chunk_size] for position in positions]), errors='coerce').to_numpy(dtype=float)
+
+        # appended rows are searched the way the beneficiary index is, sorted with a running sum, never as a rows x windows matrix
+        timed = ~np.isnat(timestamps)
+        order = np.argsort(timestamps[timed], kind="stable")
+        timestamps = timestamps[timed][order]
+        prefix = np.concatenate(([0.0], np.cumsum(np.nan_to_num(values[timed][order]))))
+
+        low = np.searchsorted(timestamps, start_times, side="right")
+        high = np.maximum(np.searchsorted(timestamps, end_times, side="right"), low)
+        return amounts + prefix[high] - prefix[low]
+
+    def frames(self):
+        frames = [self.df]
+        frames.extend(self._chunk_frames)
+
+        sealed_rows = len(self._chunk_frames) * self.store.chunk_size
+        if self.appended > sealed_rows:
+            chunk = self._chunks[len(self._chunk_frames)]
+            frames.append(self.store._chunk_frame(chunk, self.appended - sealed_rows, self.columns, self.dtypes))
+
+        return frames
+
+
+class HistoryStore:
+    """Transaction history that accepts live appends into chunked columnar buffers."""
+
+    def __init__(self, df: pd.DataFrame, chunk_size: int = 1024, account_index: AccountIndex = None,
+                 beneficiary_index: BeneficiaryIndex = None, aggregates: dict = None):
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+
+        # indexes and aggregates published by another process are attached as they are instead of being rebuilt
+        self.account_index = account_index if account_index is not None else AccountIndex(df)
+        self.columns = list(self.account_index.df.columns)
+        self.dtypes = self.account_index.df.dtypes.to_dict()
+        self.beneficiary_index = beneficiary_index if beneficiary_index is not None else BeneficiaryIndex(self.account_index.df)
+
+        source = self.account_index.df if aggregates is None else None
+        self.group_statistics = GroupStatistics(source)
+        self.group_percentiles = GroupPercentiles(source)
+        self.value_counts = ValueCounts(source)
+        if aggregates is not None:
+            self._load_aggregates(aggregates)
+
+        self._chunks = []
+        self._chunk_frames = []
+        self._account_rows = {}
+        self._beneficiary_rows = {}
+        self._transaction_ids = {}
+        self._appended = 0
+        self._evict_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.account_index.df) + self._appended
+
+    def _new_chunk(self):
+        return {column: np.empty(self.chunk_size, dtype=object) for column in self.columns}
+
+    @staticmethod
+    def _restore_dtypes(df, dtypes):
+        for column, dtype in dtypes.items():
+            # strings and categoricals stay as objects, appended values may not be known categories
+            if is_object_dtype(dtype) or is_string_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype) or is_bool_dtype(dtype):
+                continue
+            try:
+                df[column] = df[column].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+        return df
+
+    def _chunk_frame(self, chunk, rows, columns, dtypes):
+        return self._restore_dtypes(pd.DataFrame({column: chunk[column][:rows] for column in columns}), dtypes)
+
+    def _materialize(self, chunks, positions, columns, dtypes):
+        chunk_size = self.chunk_size
+        data = {
+            column: [chunks[position // chunk_size][column][position % chunk_size] for position in positions]
+            for column in columns
+        }
+        return self._restore_dtypes(pd.DataFrame(data, columns=columns), dtypes)
+
+    def append(self, record) -> bool:
+        with self._lock:
+            return self._append(record)
+
+    def extend(self, df: pd.DataFrame) -> int:
+        records = df.to_dict('records')
+        with self._lock:
+            return sum(self._append(record) for record in records)
+
+    def _append(self, record) -> bool:
+        transaction_id = record.get('TRANSACTIONID')
+
+        if transaction_id is not None:
+            if transaction_id in self._transaction_ids:
+                return False
+            self._transaction_ids[transaction_id] = record.get('TIMESTAMP')
+
+        self._apply(record)
+        return True
+
+    def _apply(self, record):
+        self.group_statistics.update(record)
+        self.group_percentiles.update(record)
+        self.value_counts.update(record)
+        self._store_row(record)
+
+    def _store_row(self, record):
+        position = self._appended
+        slot = position % self.chunk_size
+        if slot == 0:
+            self._chunks.append(self._new_chunk())
+        chunk = self._chunks[-1]
+
+        for column in self.columns:
+            chunk[column][slot] = record.get(column)
+
+        self._account_rows.setdefault(record.get('ACCOUNTNO'), []).append(position)
+        self._beneficiary_rows.setdefault(record.get('BENACCOUNTNO'), []).append(position)
+
+        # publishing the new row count last keeps readers from seeing a half written row
+        self._appended = position + 1
+
+        if slot == self.chunk_size - 1:
+            self._chunk_frames.append(self._chunk_frame(chunk, self.chunk_size, self.columns, self.dtypes))
+
+    def _retained_frame(self, snapshot, cutoff=None):
+        frames = [frame if cutoff is None else frame[frame['TIMESTAMP'] >= cutoff] for frame in snapshot.frames() if not frame.empty]
+        if not frames:
+            return self.account_index.df.iloc[0:0]
+
+        df = pd.concat(frames, ignore_index=True)
+        for column, dtype in snapshot.dtypes.items():
+            # appended rows were kept as objects, the categories are rebuilt over the retained values
+            if isinstance(dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('category')
+        return df
+
+    def evict_before(self, cutoff) -> int:
+        if 'TIMESTAMP' not in self.columns:
+            return 0
+
+        cutoff = pd.Timestamp(cutoff)
+        with self._evict_lock:
+            # the indexes are rebuilt outside the lock, appends keep flowing in the meantime
+            snapshot = self.snapshot()
+            retained = self._retained_frame(snapshot, cutoff)
+            account_index = AccountIndex(retained)
+            beneficiary_index = BeneficiaryIndex(account_index.df)
+            evicted = len(snapshot) - len(account_index.df)
+
+            with self._lock:
+                carried = self._rows_from(snapshot.appended)
+                # only the raw rows go, the peer, percentile and identity aggregates keep counting evicted transactions
+                self._reset(account_index, beneficiary_index)
+                self.value_counts.compact()
+
+                # rows that arrived during the rebuild are not in the retained frame, the aggregates already count them
+                for record in carried:
+                    self._store_row(record)
+
+                self._transaction_ids = {
+                    transaction_id: timestamp for transaction_id, timestamp in self._transaction_ids.items()
+                    if timestamp is not None and not pd.isna(timestamp) and timestamp >= cutoff
+                }
+
+        return evicted
+
+    def _rows_from(self, position):
+        chunk_size = self.chunk_size
+        return [
+            {column: self._chunks[row // chunk_size][column][row % chunk_size] for column in self.columns}
+            for row in range(position, self._appended)
+        ]
+
+    def _reset(self, account_index, beneficiary_index):
+        self.account_index = account_index
+        # a reindexed frame may have been compacted since, appended rows follow its columns and dtypes
+        self.columns = list(account_index.df.columns)
+        self.dtypes = account_index.df.dtypes.to_dict()
+        self.beneficiary_index = beneficiary_index
+        self._chunks = []
+        self._chunk_frames = []
+        self._account_rows = {}
+        self._beneficiary_rows = {}
+        self._appended = 0
+
+    def _aggregates(self) -> dict:
+        return {
+            "group_statistics": self.group_statistics.state(),
+            "group_percentiles": self.group_percentiles.state(),
+            "value_counts": self.value_counts.state(),
+        }
+
+    def _load_aggregates(self, aggregates: dict):
+        self.group_statistics.load_state(aggregates["group_statistics"])
+        self.group_percentiles.load_state(aggregates["group_percentiles"])
+        self.value_counts.load_state(aggregates["value_counts"])
+
+    def capture(self):
+        # the snapshot and the aggregates are taken together, so they describe exactly the same rows
+        with self._lock:
+            return self._snapshot(), self._aggregates()
+
+    def frame(self, snapshot: HistorySnapshot = None) -> pd.DataFrame:
+        return self._retained_frame(snapshot or self.snapshot())
+
+    def swap(self, account_index: AccountIndex, beneficiary_index: BeneficiaryIndex, aggregates: dict, carry_from: int = 0, carry_after=None, carry=None) -> int:
+        with self._lock:
+            # an explicit list of rows replaces the ones this store would carry over
+            carried = self._rows_from(carry_from) if carry is None else list(carry)
+            if carry_after is not None:
+                carry_after = pd.Timestamp(carry_after)
+                carried = [record for record in carried if not pd.isna(record.get('TIMESTAMP')) and record.get('TIMESTAMP') > carry_after]
+
+            self._reset(account_index, beneficiary_index)
+            self._load_aggregates(aggregates)
+
+            # carried rows are not part of the new base, they are counted again on top of its aggregates
+            for record in carried:
+                self._apply(record)
+
+        return len(carried)
+
+    def snapshot(self) -> HistorySnapshot:
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> HistorySnapshot:
+        return HistorySnapshot(
+            store=self,
+            account_index=self.account_index,
+            beneficiary_index=self.beneficiary_index,
+            columns=self.columns,
+            dtypes=self.dtypes,
+            chunks=list(self._chunks),
+            chunk_frames=list(self._chunk_frames),
+            account_rows=self._account_rows,
+            beneficiary_rows=self._beneficiary_rows,
+            appended=self._appended,
+            group_statistics=self.group_statistics.frozen(),
+            group_percentiles=self.group_percentiles.frozen(),
+            value_counts=self.value_counts.frozen(),
+        )
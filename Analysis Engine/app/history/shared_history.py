@@ -0,0 +1,407 @@
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+import logging
+import numpy as np
+import pandas as pd
+from app.history.account_index import AccountIndex
+from app.history.beneficiary_index import BeneficiaryIndex
+from app.history.columnar_snapshot import ColumnarSnapshot
+from app.history.history_store import HistoryStore
+
+
+def _plain(value):
+    # numpy scalars become the python values json writes
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _save_offsets(path, offsets: dict):
+    np.save(f"{path}.npy", np.array(list(offsets.values()), dtype=np.int64).reshape(-1, 2))
+    return [_plain(key) for key in offsets]
+
+
+def _load_offsets(path, keys) -> dict:
+    bounds = np.load(f"{path}.npy")
+    return {key: (int(start), int(end)) for key, (start, end) in zip(keys, bounds.tolist())}
+
+
+def _encode(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NaT:
+        return {"$timestamp": None}
+    if isinstance(value, pd.Timestamp):
+        return {"$timestamp": value.isoformat()}
+    return str(value)
+
+
+def _decode(value: dict):
+    if value.keys() == {"$timestamp"}:
+        return pd.Timestamp(value["$timestamp"]) if value["$timestamp"] is not None else pd.NaT
+    return value
+
+
+class SharedHistory:
+    """History published once to memory mapped files that every worker process attaches to read-only."""
+
+    POINTER_FILE = "CURRENT"
+    LOCK_FILE = "leader.lock"
+    STATE_FILE = "state.json"
+    JOURNAL_DIRECTORY = "journal"
+
+    def __init__(self, path: str, publish_interval_seconds: float = 300, poll_seconds: float = 5, chunk_size: int = 1024, can_lead: bool = True):
+        self.path = path
+        self.publish_interval_seconds = publish_interval_seconds
+        self.poll_seconds = poll_seconds
+        self.chunk_size = chunk_size
+        self.can_lead = can_lead
+        os.makedirs(os.path.join(path, self.JOURNAL_DIRECTORY), exist_ok=True)
+
+        self.store = None
+        self.generation = None
+        self.watermark = None
+        self.on_promoted = None
+        self._watermark_source = None
+        self._published_rows = None
+        self._published_at = 0.0
+        self._publish_seconds = None
+
+        # every server process journals the rows it scores, the others read them on each poll
+        self._journal_name = f"{os.getpid()}.jsonl"
+        self._journal = None
+        self._journal_offsets = {}
+        self._record_lock = threading.RLock()
+
+        self._leader_lock = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_lock is not None
+
+    def stats(self) -> dict:
+        return {
+            "role": "leader" if self.is_leader else "follower",
+            "generation": self.generation,
+            "watermark": self.watermark,
+            "rows": len(self.store) if self.store is not None else 0,
+            "last_publish_seconds": self._publish_seconds,
+            "journals": len(self._journal_offsets),
+        }
+
+    def try_lead(self) -> bool:
+        if self.is_leader:
+            return True
+
+        # the lock belongs to the open file, it is released by the kernel when the leader process exits
+        lock_file = open(os.path.join(self.path, self.LOCK_FILE), "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+
+        self._leader_lock = lock_file
+        return True
+
+    def _read_pointer(self):
+        try:
+            with open(os.path.join(self.path, self.POINTER_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_pointer(self, pointer: dict):
+        temporary_path = os.path.join(self.path, f"{self.POINTER_FILE}.tmp")
+        with open(temporary_path, "w") as f:
+            json.dump(pointer, f)
+        os.replace(temporary_path, os.path.join(self.path, self.POINTER_FILE))
+
+    @staticmethod
+    def _is_alive(pid) -> bool:
+        try:
+            os.kill(int(pid), 0)
+        except (ProcessLookupError, TypeError, ValueError):
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _live_pointer(self):
+        # a pointer left behind by a leader that is gone may describe a history that is days old
+        pointer = self._read_pointer()
+        if pointer is None or not self._is_alive(pointer.get("pid")):
+            return None
+        return pointer
+
+    def _remove_old_generations(self, current: int):
+        # workers still mapping the previous generation keep their pages after the files are unlinked
+        for name in os.listdir(self.path):
+            if name.startswith("generation-") and not name.endswith(".tmp"):
+                try:
+                    generation = int(name.split("-", 1)[1])
+                except ValueError:
+                    continue
+                if generation < current - 1:
+                    shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def _journal_path(self, name):
+        return os.path.join(self.path, self.JOURNAL_DIRECTORY, name)
+
+    def record(self, record) -> bool:
+        # the row joins the local history and the journal together, a publish never sees one without the other
+        with self._record_lock:
+            if not self.store.append(record):
+                return False
+
+            if self._journal is None:
+                self._journal = open(self._journal_path(self._journal_name), "ab")
+                self._journal_offsets[self._journal_name] = self._journal.tell()
+            line = (json.dumps(record, default=_encode) + "\n").encode()
+            self._journal.write(line)
+            self._journal.flush()
+            self._journal_offsets[self._journal_name] += len(line)
+        return True
+
+    def _read_journals(self, offsets: dict, own: bool = False):
+        records = []
+        offsets = dict(offsets)
+        for name in sorted(os.listdir(os.path.join(self.path, self.JOURNAL_DIRECTORY))):
+            if not name.endswith(".jsonl") or (name == self._journal_name and not own):
+                continue
+            try:
+                with open(self._journal_path(name), "rb") as f:
+                    f.seek(offsets.get(name, 0))
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+
+            # a line still being written is left for the next read
+            complete = data[:data.rfind(b"\n") + 1]
+            records.extend(json.loads(line, object_hook=_decode) for line in complete.splitlines())
+            offsets[name] = offsets.get(name, 0) + len(complete)
+        return records, offsets
+
+    def _catch_up(self) -> int:
+        # rows the other server processes scored since the last poll
+        with self._record_lock:
+            records, self._journal_offsets = self._read_journals(self._journal_offsets)
+            return sum(self.store.append(record) for record in records)
+
+    def _remove_finished_journals(self, offsets: dict):
+        for name, offset in offsets.items():
+            path = self._journal_path(name)
+            if name == self._journal_name or self._is_alive(name.split(".", 1)[0]):
+                continue
+            try:
+                if os.path.getsize(path) == offset:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def publish(self, store: HistoryStore, watermark=None) -> dict:
+        started = time.perf_counter()
+        with self._record_lock:
+            snapshot, aggregates = store.capture()
+            journals = dict(self._journal_offsets)
+        if snapshot.appended:
+            account_index = AccountIndex(store.frame(snapshot))
+            beneficiary_index = BeneficiaryIndex(account_index.df)
+        else:
+            account_index, beneficiary_index = snapshot.account_index, snapshot.beneficiary_index
+
+        previous = self._read_pointer()
+        generation = (previous or {}).get("generation", 0) + 1
+        name = f"generation-{generation:06d}"
+        temporary_path = os.path.join(self.path, f"{name}.tmp")
+        shutil.rmtree(temporary_path, ignore_errors=True)
+        os.makedirs(temporary_path)
+
+        # every generation is a full rewrite of the history, its cost grows with the retained rows
+        ColumnarSnapshot(os.path.join(temporary_path, "frame")).save(account_index.df, watermark)
+        np.save(os.path.join(temporary_path, "beneficiary_timestamps.npy"), beneficiary_index.timestamps)
+        np.save(os.path.join(temporary_path, "beneficiary_amounts.npy"), beneficiary_index.amounts)
+        self._save_state(temporary_path, account_index, beneficiary_index, aggregates)
+        os.replace(temporary_path, os.path.join(self.path, name))
+
+        pointer = {"generation": generation, "name": name, "watermark": watermark, "latest": ColumnarSnapshot.watermark_of(account_index.df),
+                   "rows": len(account_index.df), "pid": os.getpid(), "published_at": time.time(), "journals": journals}
+        self._write_pointer(pointer)
+        self._remove_old_generations(generation)
+        self._remove_finished_journals(journals)
+        del account_index, beneficiary_index
+
+        # the leader moves onto the mapped files as well, rows appended while publishing are carried over
+        carried = store.swap(*self._load(name), carry_from=snapshot.appended)
+        self.generation, self.watermark = generation, watermark
+        self._published_rows, self._published_at = len(store), time.time()
+        self._publish_seconds = round(time.perf_counter() - started, 3)
+
+        logging.info(f"[Shared History] Published generation {generation} with {pointer['rows']} transactions up to {watermark}, "
+                     f"{carried} carried over ({time.perf_counter() - started:.2f}s)")
+        return pointer
+
+    def _save_state(self, path, account_index, beneficiary_index, aggregates):
+        # offsets and sorted amounts go to .npy files, the keys and counts to json, nothing is unpickled on attach
+        percentiles = aggregates["group_percentiles"]
+        values = [np.sort(np.concatenate((np.asarray(values, dtype=float), np.asarray(pending, dtype=float))))
+                  for values, pending, _ in percentiles.values()]
+        lengths = np.array([len(group) for group in values], dtype=np.int64)
+        ends = np.cumsum(lengths)
+        np.save(os.path.join(path, "percentile_values.npy"), np.concatenate(values) if values else np.array([], dtype=float))
+        np.save(os.path.join(path, "percentile_bounds.npy"), np.column_stack((ends - lengths, ends)))
+
+        state = {
+            "account_offsets": _save_offsets(os.path.join(path, "account_offsets"), account_index.offsets),
+            "beneficiary_offsets": _save_offsets(os.path.join(path, "beneficiary_offsets"), beneficiary_index.offsets),
+            "group_statistics": [[dimension, _plain(value), count, mean, m2] for (dimension, value), (count, mean, m2) in aggregates["group_statistics"].items()],
+            "group_percentiles": [[dimension, _plain(value), missing] for (dimension, value), (_, _, missing) in percentiles.items()],
+            "value_counts": {column: [[_plain(value), count] for value, count in counts.items()] for column, counts in aggregates["value_counts"].items()},
+        }
+        with open(os.path.join(path, self.STATE_FILE), "w") as f:
+            json.dump(state, f)
+
+    def _load_state(self, path):
+        with open(os.path.join(path, self.STATE_FILE)) as f:
+            state = json.load(f)
+
+        values = np.load(os.path.join(path, "percentile_values.npy"), mmap_mode="r")
+        bounds = np.load(os.path.join(path, "percentile_bounds.npy")).tolist()
+        aggregates = {
+            "group_statistics": {(dimension, value): (count, mean, m2) for dimension, value, count, mean, m2 in state["group_statistics"]},
+            "group_percentiles": {(dimension, value): (values[start:end], [], missing)
+                                  for (dimension, value, missing), (start, end) in zip(state["group_percentiles"], bounds)},
+            "value_counts": {column: dict((value, count) for value, count in counts) for column, counts in state["value_counts"].items()},
+        }
+        account_offsets = _load_offsets(os.path.join(path, "account_offsets"), state["account_offsets"])
+        beneficiary_offsets = _load_offsets(os.path.join(path, "beneficiary_offsets"), state["beneficiary_offsets"])
+        return account_offsets, beneficiary_offsets, aggregates
+
+    def _load(self, name):
+        generation_path = os.path.join(self.path, name)
+        df, _ = ColumnarSnapshot(os.path.join(generation_path, "frame")).load()
+        account_offsets, beneficiary_offsets, aggregates = self._load_state(generation_path)
+
+        account_index = AccountIndex(df, offsets=account_offsets)
+        beneficiary_index = BeneficiaryIndex.from_arrays(
+            np.load(os.path.join(generation_path, "beneficiary_timestamps.npy"), mmap_mode="r"),
+            np.load(os.path.join(generation_path, "beneficiary_amounts.npy"), mmap_mode="r"),
+            beneficiary_offsets,
+        )
+        return account_index, beneficiary_index, aggregates
+
+    def _attach(self, pointer) -> HistoryStore:
+        account_index, beneficiary_index, aggregates = self._load(pointer["name"])
+        self.generation, self.watermark = pointer["generation"], pointer["watermark"]
+        logging.info(f"[Shared History] Attached generation {self.generation} with {pointer['rows']} transactions published by process {pointer['pid']}")
+        store = HistoryStore(None, chunk_size=self.chunk_size, account_index=account_index, beneficiary_index=beneficiary_index, aggregates=aggregates)
+        if self.can_lead:
+            records, self._journal_offsets = self._read_journals(pointer.get("journals", {}))
+            for record in records:
+                store.append(record)
+        return store
+
+    def open(self, load_history=None) -> HistoryStore:
+        if self.can_lead and self.try_lead():
+            logging.info(f"[Shared History] Process {os.getpid()} leads, loading and publishing the history")
+            df = load_history()
+            watermark = ColumnarSnapshot.watermark_of(df)
+            self.store = HistoryStore(df, chunk_size=self.chunk_size)
+            del df
+            self.publish(self.store, watermark)
+            return self.store
+
+        waited = 0.0
+        pointer = self._live_pointer()
+        while pointer is None:
+            if self.can_lead and self.try_lead():
+                # the leader went away before it published, this process takes over
+                return self.open(load_history)
+            if waited % 30 == 0:
+                logging.info(f"[Shared History] Process {os.getpid()} waiting for the leader to publish the history")
+            time.sleep(1)
+            waited += 1
+            pointer = self._live_pointer()
+
+        self.store = self._attach(pointer)
+        return self.store
+
+    def _follow(self):
+        pointer = self._read_pointer()
+        if pointer is None or pointer.get("generation") == self.generation:
+            return
+
+        account_index, beneficiary_index, aggregates = self._load(pointer["name"])
+        if self.can_lead:
+            # the journaled rows past the offsets the generation was published at are all it lacks, this worker's own included
+            with self._record_lock:
+                records, offsets = self._read_journals(pointer.get("journals", {}), own=True)
+                carried = self.store.swap(account_index, beneficiary_index, aggregates, carry=records)
+                self._journal_offsets = {**offsets, **({self._journal_name: self._journal.tell()} if self._journal is not None else {})}
+        else:
+            # a scoring process never leads and the leader appends every row it scored up to the newest one published
+            carried = self.store.swap(account_index, beneficiary_index, aggregates, carry_after=pointer.get("latest", pointer["watermark"]))
+        self.generation, self.watermark = pointer["generation"], pointer["watermark"]
+        logging.info(f"[Shared History] Switched to generation {self.generation}, {carried} local transactions carried over")
+
+    def _lead(self):
+        if time.time() - self._published_at < self.publish_interval_seconds or len(self.store) == self._published_rows:
+            return
+
+        watermark = self._watermark_source() if self._watermark_source is not None else self.watermark
+        self.publish(self.store, watermark)
+
+    def _run(self):
+        while not self._stopped.wait(self.poll_seconds):
+            try:
+                if self.can_lead:
+                    self._catch_up()
+                if self.is_leader:
+                    self._lead()
+                elif self.can_lead and self.try_lead():
+                    logging.info(f"[Shared History] Leader gone, process {os.getpid()} takes over publishing")
+                    self._published_rows, self._published_at = len(self.store), time.time()
+                    if self.on_promoted is not None:
+                        self.on_promoted()
+                else:
+                    self._follow()
+            except Exception as e:
+                logging.error(f"[Shared History] {'Publishing' if self.is_leader else 'Switching'} generation failed: {e}")
+
+    def start(self, watermark_source=None):
+        if self._thread is not None:
+            return
+
+        self._watermark_source = watermark_source
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="shared-history", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._leader_lock is not None:
+            self._leader_lock.close()
+            self._leader_lock = None
+
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    @classmethod
+    def from_settings(cls, settings: dict):
+        try:
+            publish_interval_seconds = float(settings.get('history_publish_interval_seconds') or 300)
+            poll_seconds = float(settings.get('history_attach_poll_seconds') or 5)
+        except (TypeError, ValueError):
+            logging.error("[Shared History] Invalid publish or poll interval, using 300s and 5s")
+            publish_interval_seconds, poll_seconds = 300, 5
+        return cls(settings.get('history_shared_path') or 'history_shared', publish_interval_seconds, poll_seconds)
@@ -0,0 +1,80 @@
+import bisect
+import threading
+import pandas as pd
+
+
+class ValueCounts:
+    """Occurrence count of every value of the identity columns, kept current as transactions are appended."""
+
+    COLUMNS = ("PASSPORTNO", "IDCARDNO", "FULL_NAME")
+
+    def __init__(self, df: pd.DataFrame = None, columns=COLUMNS):
+        self.columns = tuple(columns)
+        self.counts = {column: {} for column in self.columns}
+        # the counts are never modified in place, appended values are logged with their update number instead
+        self._positions = {column: {} for column in self.columns}
+        self._updates = 0
+        self._limit = None
+        self._lock = threading.Lock()
+
+        if df is not None:
+            self.build(df)
+
+    def build(self, df: pd.DataFrame):
+        counts = {}
+        for column in self.columns:
+            if column in df.columns:
+                counts[column] = df[column].value_counts(dropna=True, sort=False).to_dict()
+            else:
+                counts[column] = {}
+        self.counts = counts
+        self._positions = {column: {} for column in self.columns}
+        self._updates = 0
+
+    def update(self, record):
+        with self._lock:
+            position = self._updates
+            for column in self.columns:
+                value = record.get(column)
+                if value is None or pd.isna(value):
+                    continue
+                self._positions[column].setdefault(value, []).append(position)
+            # publishing the update number last keeps frozen views from counting a half logged record
+            self._updates = position + 1
+
+    def frozen(self) -> "ValueCounts":
+        # a view that keeps counting only the updates made before it was taken, nothing is copied
+        with self._lock:
+            view = ValueCounts(columns=self.columns)
+            view.counts, view._positions, view._updates, view._limit = self.counts, self._positions, self._updates, self._updates
+        return view
+
+    def compact(self):
+        # folds the logged updates into new counts, frozen views keep the objects they were taken over
+        with self._lock:
+            self.counts = self._merged()
+            self._positions = {column: {} for column in self.columns}
+
+    def _merged(self) -> dict:
+        state = {column: dict(counts) for column, counts in self.counts.items()}
+        for column, positions in self._positions.items():
+            counts = state.setdefault(column, {})
+            for value, logged in positions.items():
+                counts[value] = counts.get(value, 0) + len(logged)
+        return state
+
+    def state(self) -> dict:
+        with self._lock:
+            return self._merged()
+
+    def load_state(self, state: dict):
+        self.counts = {column: dict(state.get(column, {})) for column in self.columns}
+        self._positions = {column: {} for column in self.columns}
+
+    def count(self, column, value) -> int:
+        if value is None or pd.isna(value):
+            return 0
+
+        logged = self._positions.get(column, {}).get(value, ())
+        added = len(logged) if self._limit is None else bisect.bisect_left(logged, self._limit)
+        return int(self.counts.get(column, {}).get(value, 0)) + added
@@ -0,0 +1,20 @@
+from sqlalchemy.orm import Session
+from app.database.database import get_engine
+from app.repository.transaction_risk_profile_repository import new_transaction_risk_profiles
+
+engine = get_engine()
+
+
+def insert_risk_profiles_bulk(transaction_risk_profiles, customer_risk_profiles):
+    # both kinds of profiles of a batch are committed together, a failure leaves none of them behind
+    with Session(engine) as session:
+        fresh = new_transaction_risk_profiles(session, transaction_risk_profiles)
+        if len(customer_risk_profiles) == len(transaction_risk_profiles):
+            # the customer profile of a transaction already written was written with it
+            kept = {id(risk_profile) for risk_profile in fresh}
+            customer_risk_profiles = [customer for transaction, customer in zip(transaction_risk_profiles, customer_risk_profiles) if id(transaction) in kept]
+
+        session.bulk_save_objects(fresh)
+        session.bulk_save_objects(customer_risk_profiles)
+        session.commit()
+    return len(fresh)
@@ -7,6 +7,17 @@ import pandas as pd
 
 engine = get_engine()
 
+_change_listeners = []
+
+
+def register_change_listener(listener):
+    _change_listeners.append(listener)
+
+
+def _notify_change(table_name):
+    for listener in _change_listeners:
+        listener(table_name)
+
 def get_all_sanction_list_entries(pandas_df=False):
     with Session(engine) as session:
         entries = session.query(SanctionListEntry.FirstName, 
@@ -32,11 +43,13 @@ def insert_sanction_list_entry(entry):
     with Session(engine) as session:
         session.add(entry)
         session.commit()   
+    _notify_change("sanction_list")
 
 def insert_watch_list_entry(entry):
     with Session(engine) as session:
         session.add(entry)
         session.commit()
+    _notify_change("watch_list")
 
 def delete_sanction_list_entry(entry_id):
     with Session(engine) as session:
@@ -44,6 +57,7 @@ def delete_sanction_list_entry(entry_id):
         if entry:
             session.delete(entry)
             session.commit()
+    _notify_change("sanction_list")
 
 
 def delete_watch_list_entry(entry_id):
@@ -52,6 +66,7 @@ def delete_watch_list_entry(entry_id):
         if entry:
             session.delete(entry)
             session.commit()   
+    _notify_change("watch_list")
 
 
 def update_sanction_list_entry(entry):
@@ -61,6 +76,7 @@ def update_sanction_list_entry(entry):
             for key, value in entry.__dict__.items():
                 setattr(existing_entry, key, value)
             session.commit()
+    _notify_change("sanction_list")
 
 
 def update_watch_list_entry(entry):
@@ -70,6 +86,7 @@ def update_watch_list_entry(entry):
             for key, value in entry.__dict__.items():
                 setattr(existing_entry, key, value)
             session.commit()
+    _notify_change("watch_list")
 
 
 
@@ -88,6 +105,7 @@ def insert_country(country):
     with Session(engine) as session:
         session.add(country)
         session.commit()
+    _notify_change("countries")
 
 def delete_country(country_id):
     with Session(engine) as session:
@@ -95,6 +113,7 @@ def delete_country(country_id):
         if country:
             session.delete(country)
             session.commit()
+    _notify_change("countries")
 
 def update_country(country):
     with Session(engine) as session:
@@ -103,6 +122,7 @@ def update_country(country):
             for key, value in country.__dict__.items():
                 setattr(existing_country, key, value)
             session.commit()
+    _notify_change("countries")
 
 def get_country_by_name(name):
     with Session(engine) as session:
@@ -1,9 +1,10 @@
 from app.model.transaction import Transaction
 from sqlalchemy.orm import Session
-from sqlalchemy import Table, MetaData, select, Column
+from sqlalchemy import Table, MetaData, select, Column, func, or_, and_
 from sqlalchemy.exc import NoSuchTableError
 from app.database.database import get_central_db_engine
 import pandas as pd
+import threading
 from app.configuration.connections_configuration import get_database_connection_settings
 from app.configuration.schema_configuration import get_schema_configuration_settings
 
@@ -20,18 +21,33 @@ selected_columns = [
 reverse_selected_columns = [schema.get(column_name, column_name) for column_name in selected_columns]
 
 
-try:
-    table = Table(table_name, METADATA, autoload_with=engine)
-    cols_to_select = [table.c[col] for col in reverse_selected_columns if col in table.c]
-    print(f"[Transaction Repository] Table '{table_name}' metadata loaded successfully.")
-    
-except NoSuchTableError:
-    print(f"[Transaction Repository] Error: Table '{table_name}' does not exist in the database.")
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_table():
+    # reflected on first use rather than at import, so the service can come up before the central database answers
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                try:
+                    _table = Table(table_name, METADATA, autoload_with=engine)
+                    print(f"[Transaction Repository] Table '{table_name}' metadata loaded successfully.")
+                except NoSuchTableError:
+                    print(f"[Transaction Repository] Error: Table '{table_name}' does not exist in the database.")
+                    raise
+    return _table
+
+
+def get_columns_to_select():
+    table = get_table()
+    return [table.c[col] for col in reverse_selected_columns if col in table.c]
 
 def get_all_transactions(pandas_df=False):
     with Session(engine) as session:
         #transactions = session.query(Transaction).all()
-        stmt = select(*cols_to_select)
+        stmt = select(*get_columns_to_select())
         result = session.execute(stmt)
         columns = result.keys()
         transactions = result.all()
@@ -41,8 +57,57 @@ def get_all_transactions(pandas_df=False):
     return (transactions, columns)
 
 
+def _newer_than(stmt, watermark):
+    if watermark is None:
+        return stmt
+    table = get_table()
+    watermark = pd.Timestamp(watermark)
+    date_column = table.c[schema.get('TRANSACTIONDATE', 'TRANSACTIONDATE')]
+    date = watermark.strftime("%Y-%m-%d")
+
+    time_name = schema.get('TRANSACTIONTIME', 'TRANSACTIONTIME')
+    if time_name not in table.c:
+        return stmt.where(date_column >= date)
+
+    # the rows of the watermark day up to the watermark itself are already loaded, only later ones are fetched
+    time_column = table.c[time_name]
+    return stmt.where(or_(date_column > date, and_(date_column == date, time_column > watermark.strftime("%H:%M:%S"))))
+
+
+def count_transactions(watermark=None):
+    stmt = _newer_than(select(func.count()).select_from(get_table()), watermark)
+
+    with engine.connect() as connection:
+        return connection.execute(stmt).scalar()
+
+
+def stream_transactions(chunk_size=50000, watermark=None, with_transaction_id=False, extra_columns=(), order_by_time=False):
+    table = get_table()
+    columns = get_columns_to_select()
+    transaction_id = schema.get('TRANSACTIONID', 'TRANSACTIONID')
+    requested = [transaction_id] if with_transaction_id else []
+    requested += [schema.get(column, column) for column in extra_columns]
+    for column in requested:
+        if column in table.c and column not in [selected.name for selected in columns]:
+            columns.append(table.c[column])
+
+    # server side cursor: only one chunk of rows is held on the client at a time
+    stmt = _newer_than(select(*columns), watermark)
+    if order_by_time:
+        # the transaction id breaks ties so a replay sees the rows in the same order every time
+        order = [table.c[schema.get(column, column)] for column in ('TRANSACTIONDATE', 'TRANSACTIONTIME', 'TRANSACTIONID') if schema.get(column, column) in table.c]
+        stmt = stmt.order_by(*order)
+
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        columns = list(result.keys())
+        for rows in result.partitions():
+            yield pd.DataFrame(rows, columns=columns)
+
+
 def get_transaction_by_column(column_name, value, all=True, pandas_df=False):
     with Session(engine) as session:
+        table = get_table()
         search_column: Column = table.columns[schema.get(column_name, column_name)]
         stmt = select(table).where( search_column == value)
         
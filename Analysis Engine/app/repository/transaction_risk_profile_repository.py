@@ -1,5 +1,6 @@
 from app.model.transaction_risk_profile import TransactionRiskProfile
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from app.database.database import get_engine
 import pandas as pd
 
@@ -42,10 +43,27 @@ def delete_transaction_risk_profile(risk_profile_id):
             session.delete(risk_profile)
             session.commit()
 
+def new_transaction_risk_profiles(session, risk_profiles, chunk_size=10000):
+    # one profile per transaction id, a replayed batch or backfill chunk leaves the profiles already written alone
+    transaction_ids = list({risk_profile.transaction_id for risk_profile in risk_profiles})
+    existing = set()
+    for start in range(0, len(transaction_ids), chunk_size):
+        stmt = select(TransactionRiskProfile.transaction_id).where(TransactionRiskProfile.transaction_id.in_(transaction_ids[start:start + chunk_size]))
+        existing.update(session.execute(stmt).scalars())
+
+    fresh = []
+    for risk_profile in risk_profiles:
+        if risk_profile.transaction_id not in existing:
+            existing.add(risk_profile.transaction_id)
+            fresh.append(risk_profile)
+    return fresh
+
 def insert_transaction_risk_profiles_bulk(risk_profiles):
     with Session(engine) as session:
-        session.bulk_save_objects(risk_profiles)
+        fresh = new_transaction_risk_profiles(session, risk_profiles)
+        session.bulk_save_objects(fresh)
         session.commit()
+    return len(fresh)
 
 def get_transaction_risk_profiles_by_customer(customer_id):
     with Session(engine) as session:
@@ -0,0 +1,65 @@
+import threading
+import time
+import logging
+from app.configuration.analysis_configuration import (CUSTOMER, TRANSACTION, get_customer_analysis_settings,
+                                                      get_transaction_analysis_settings, register_change_listener)
+
+
+class AnalysisSettingsCache:
+    """Analysis toggles and thresholds held in memory, read from the configuration store at most once per TTL."""
+
+    DEFAULT_FUZZY_THRESHOLD = 0.85
+
+    def __init__(self, ttl_seconds: float = 30):
+        self.ttl_seconds = ttl_seconds
+        self._loaders = {TRANSACTION: get_transaction_analysis_settings, CUSTOMER: get_customer_analysis_settings}
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self.loads = 0
+        self.invalidations = 0
+
+    def stats(self) -> dict:
+        return {"ttl_seconds": self.ttl_seconds, "loads": self.loads, "invalidations": self.invalidations}
+
+    def _get(self, section) -> dict:
+        entry = self._entries.get(section)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+            return entry[0]
+
+        generation = self._generation
+        settings = self._loaders[section]()
+        with self._lock:
+            # an update that landed while the store was read leaves this copy stale, it is returned but not kept
+            if generation == self._generation:
+                self._entries[section] = (settings, time.monotonic())
+            self.loads += 1
+        return settings
+
+    def transaction(self) -> dict:
+        return self._get(TRANSACTION)
+
+    def customer(self) -> dict:
+        return self._get(CUSTOMER)
+
+    def fuzzy_threshold(self) -> float:
+        try:
+            return float(self.customer().get('Fuzzy Name Match Threshold') or self.DEFAULT_FUZZY_THRESHOLD)
+        except (TypeError, ValueError):
+            return self.DEFAULT_FUZZY_THRESHOLD
+
+    def invalidate(self, section=None):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if section is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(section, None)
+        logging.info(f"[Analysis Settings] {section or 'All'} analysis settings changed, reloading on the next request")
+
+
+# worker processes have no listener for updates made in the server, the TTL bounds how long they keep old toggles
+analysis_settings = AnalysisSettingsCache()
+register_change_listener(analysis_settings.invalidate)
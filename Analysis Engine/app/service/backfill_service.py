@@ -0,0 +1,186 @@
+import json
+import os
+import time
+import logging
+import numpy as np
+import pandas as pd
+from app.analysis.batch_risk_analysis import BatchRiskAnalysis
+from app.configuration.schema_configuration import get_schema_configuration_settings
+from app.history.account_index import AccountIndex
+from app.history.beneficiary_index import BeneficiaryIndex
+from app.history.history_store import HistoryStore
+from app.mapper.transaction_risk_profile_mapper import report_to_transaction_risk_profile
+from app.repository.transaction_repository import stream_transactions, count_transactions
+from app.repository.transaction_risk_profile_repository import insert_transaction_risk_profiles_bulk
+from app.service.data_processing_service import preprocessing, compact_processed_data
+
+
+class HistoryBackfill:
+    """Scores the stored transactions in TIMESTAMP order, each one against the history that preceded it."""
+
+    PROFILE_COLUMNS = ("TRANSACTIONID", "ACCOWNERNAME")
+
+    def __init__(self, checkpoint_path: str = "backfill_checkpoint.json", chunk_size: int = 50000, reindex_rows: int = 500000):
+        self.checkpoint_path = checkpoint_path
+        self.chunk_size = chunk_size
+        self.reindex_rows = reindex_rows
+
+        self.store = None
+        self.processed = 0
+        self.scored = 0
+        self.already_written = 0
+        self.last_key = None
+        self.started = None
+
+    def stats(self) -> dict:
+        return {
+            "processed": self.processed,
+            "scored": self.scored,
+            "already_written": self.already_written,
+            "last_key": self.last_key,
+            "rows_in_history": len(self.store) if self.store is not None else 0,
+        }
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_checkpoint(self):
+        # written only after the profiles of the chunk are committed, a crash repeats at most one chunk
+        temporary_path = f"{self.checkpoint_path}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({"processed": self.processed, "scored": self.scored, "last_key": self.last_key, "updated_at": time.time()}, f)
+        os.replace(temporary_path, self.checkpoint_path)
+
+    @staticmethod
+    def _key(transaction):
+        return [f"{transaction['TRANSACTIONDATE']} {transaction['TRANSACTIONTIME']}", str(transaction.get('TRANSACTIONID'))]
+
+    def _chunks(self):
+        schema = get_schema_configuration_settings()
+        reversed_schema = {v: k for k, v in schema.items()}
+
+        for chunk in stream_transactions(self.chunk_size, extra_columns=self.PROFILE_COLUMNS, order_by_time=True):
+            chunk.columns = [reversed_schema.get(name, name) for name in chunk.columns]
+            yield chunk
+
+    def _remember(self, transactions: pd.DataFrame):
+        # the profile columns are only needed to write the profiles, the history does not keep them
+        transactions = transactions.drop(columns=[column for column in self.PROFILE_COLUMNS if column in transactions.columns])
+
+        # TIMESTAMP-ordered appends keep every account slice sorted, the store never has to re-sort on read
+        self.store.extend(transactions)
+
+        if self.store.snapshot().appended >= self.reindex_rows:
+            self._reindex()
+
+    def _reindex(self):
+        # appended rows are kept as Python objects, they are folded into the columnar indexes now and then
+        started = time.perf_counter()
+        snapshot, aggregates = self.store.capture()
+        # the backfill scores every transaction against the full history, the memory limit would drop the rows it still needs
+        df = compact_processed_data(self.store.frame(snapshot), enforce_limit=False)
+        account_index = AccountIndex(df)
+        self.store.swap(account_index, BeneficiaryIndex(account_index.df), aggregates, carry_from=snapshot.appended)
+        logging.info(f"[History Backfill] Reindexed {len(self.store)} transactions in {time.perf_counter() - started:.2f}s")
+
+    def _profiles(self, transactions: pd.DataFrame, reports):
+        return [
+            report_to_transaction_risk_profile(report, transaction_id=str(transaction['TRANSACTIONID']),
+                                               t_from=str(transaction['ACCOUNTNO']),
+                                               t_to=str(transaction['BENACCOUNTNO']),
+                                               tf_name=str(transaction.get('ACCOWNERNAME', transaction.get('FULL_NAME'))),
+                                               tt_name=str(transaction['BENFULLNAME']),
+                                               amount=float(np.nan_to_num(pd.to_numeric(transaction['AMOUNTINBIRR'], errors='coerce'))),
+                                               ttype=str(transaction['TRANSACTIONTYPE']),
+                                               timestamp=f"{transaction['TRANSACTIONDATE']} {transaction['TRANSACTIONTIME']}")
+            for transaction, report in zip(transactions.to_dict('records'), reports)
+        ]
+
+    def _ensure_store(self, chunk: pd.DataFrame):
+        if self.store is None:
+            # the history starts empty, with the columns and dtypes the preprocessed chunks will have
+            frame = preprocessing(chunk.iloc[:1].copy())
+            self.store = HistoryStore(frame.drop(columns=[column for column in self.PROFILE_COLUMNS if column in frame.columns]).iloc[0:0])
+
+    def _score(self, chunk: pd.DataFrame):
+        self._ensure_store(chunk)
+
+        # features are computed as of each transaction: the account windows and the group statistics see the earlier rows of the chunk
+        risk = BatchRiskAnalysis(chunk, self.store.snapshot())
+        reports = risk.generate_transaction_risk_reports()
+        # a chunk repeated after a crash between the insert and the checkpoint finds its profiles already written
+        written = insert_transaction_risk_profiles_bulk(self._profiles(chunk, reports))
+        self.already_written += len(chunk) - written
+        self._remember(risk.transactions)
+        self.scored += len(chunk)
+
+    def _skip(self, chunk: pd.DataFrame, checkpoint):
+        # rows already scored by an earlier run only rebuild the history they leave behind
+        skipped = min(len(chunk), checkpoint["processed"] - self.processed)
+        if self.processed + skipped == checkpoint["processed"] and self._key(chunk.iloc[skipped - 1]) != checkpoint["last_key"]:
+            logging.warning(f"[History Backfill] Row {checkpoint['processed']} is {self._key(chunk.iloc[skipped - 1])}, the checkpoint ended at "
+                            f"{checkpoint['last_key']}; the table changed since the interrupted run")
+
+        self._ensure_store(chunk)
+        self._remember(preprocessing(chunk.iloc[:skipped].copy()))
+        self.processed += skipped
+        self.last_key = self._key(chunk.iloc[skipped - 1])
+        return chunk.iloc[skipped:].reset_index(drop=True)
+
+    def run(self, restart: bool = False) -> dict:
+        checkpoint = None if restart else self.load_checkpoint()
+        if checkpoint is not None:
+            self.scored = checkpoint["scored"]
+            logging.info(f"[History Backfill] Resuming after {checkpoint['processed']} transactions, last at {checkpoint['last_key']}")
+
+        try:
+            total = count_transactions()
+        except Exception as e:
+            logging.error(f"[History Backfill] Could not count the transactions, progress is reported without a total: {e}")
+            total = None
+
+        self.started = time.perf_counter()
+        for chunk in self._chunks():
+            if chunk.empty:
+                continue
+
+            if checkpoint is not None and self.processed < checkpoint["processed"]:
+                chunk = self._skip(chunk, checkpoint)
+                if chunk.empty:
+                    continue
+
+            self._score(chunk)
+            self.processed += len(chunk)
+            self.last_key = self._key(chunk.iloc[-1])
+            self.save_checkpoint()
+
+            elapsed = time.perf_counter() - self.started
+            progress = f"{self.processed}/{total} ({self.processed / total:.0%})" if total else f"{self.processed}"
+            logging.info(f"[History Backfill] Scored {progress} transactions in {elapsed:.1f}s")
+
+        logging.info(f"[History Backfill] Finished, {self.scored} transactions scored")
+        return self.stats()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score the stored transaction history in TIMESTAMP order and write transaction risk profiles")
+    parser.add_argument("--checkpoint", default="backfill_checkpoint.json")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--reindex-rows", type=int, default=500000)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and score from the first transaction")
+    args = parser.parse_args()
+
+    from app.service.reference_data_service import reference_data
+
+    # the customer analysis reads the cached reference data, it is loaded once up front
+    reference_data.start()
+    try:
+        HistoryBackfill(args.checkpoint, args.chunk_size, args.reindex_rows).run(restart=args.restart)
+    finally:
+        reference_data.stop()
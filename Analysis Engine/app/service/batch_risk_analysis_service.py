@@ -0,0 +1,49 @@
+from app.analysis.batch_risk_analysis import BatchRiskAnalysis
+from app.repository.risk_profile_repository import insert_risk_profiles_bulk
+from app.mapper.transaction_risk_profile_mapper import report_to_transaction_risk_profile
+from app.mapper.customer_risk_profile_mapper import report_to_customer_risk_profile
+import logging
+
+
+def score_risk_batch(transactions, history):
+    if transactions.empty:
+        return [], [], [], []
+
+    risk = BatchRiskAnalysis(transactions, history)
+
+    transaction_reports = risk.generate_transaction_risk_reports()
+    customer_reports = risk.generate_customer_risk_reports()
+
+    account_ages = risk.transactions['ACCOUNT_AGE_DAYS'].to_numpy()[risk.positions.argsort()]
+
+    transaction_profiles, customer_profiles = [], []
+    for (_, transaction), transaction_report, customer_report, account_age in zip(transactions.iterrows(), transaction_reports, customer_reports, account_ages):
+        transaction_profiles.append(report_to_transaction_risk_profile(transaction_report, transaction_id = str(transaction['TRANSACTIONID']),
+                                                                        t_from = str(transaction['ACCOUNTNO']),
+                                                                        t_to = str(transaction['BENACCOUNTNO']),
+                                                                        tf_name = str(transaction['ACCOWNERNAME']),
+                                                                        tt_name = str(transaction['BENFULLNAME']),
+                                                                        amount = float(transaction['AMOUNTINBIRR']),
+                                                                        ttype = str(transaction['TRANSACTIONTYPE']),
+                                                                        timestamp = transaction['TRANSACTIONDATE'] + " " + transaction['TRANSACTIONTIME']
+                                                                        ))
+
+        customer_profiles.append(report_to_customer_risk_profile(customer_report,
+                                                                 account_age= int(account_age),
+                                                                 occupation= str(transaction['OCCUPATION']),
+                                                                 region= str(transaction['HOUSENO']),
+                                                                 account_no = str(transaction['ACCOUNTNO']),
+                                                                 full_name=transaction['ACCOWNERNAME'] ))
+
+    return transaction_reports, customer_reports, transaction_profiles, customer_profiles
+
+
+def calculate_risk_batch(transactions, history):
+    transaction_reports, customer_reports, transaction_profiles, customer_profiles = score_risk_batch(transactions, history)
+
+    if transaction_reports:
+        # the profiles of a request are written in one bulk insert instead of one queue entry each
+        written = insert_risk_profiles_bulk(transaction_profiles, customer_profiles)
+        logging.info(f"[Batch Risk Analysis] Scored {len(transaction_reports)} transactions, wrote {written} new risk profiles")
+
+    return transaction_reports, customer_reports
@@ -2,11 +2,13 @@ from app.configuration.analysis_configuration import get_customer_analysis_setti
 from app.configuration.connections_configuration import get_database_connection_settings, get_broker_connection_settings, get_engine_database_connection_settings, get_sanctions_connection_countries_settings
 from app.configuration.schema_configuration import get_schema_configuration_settings
 from app.configuration.websocket_configuration import get_websocket_settings
+from app.configuration.history_configuration import get_history_settings
 
 from app.configuration.analysis_configuration import set_customer_analysis_settings, set_transaction_analysis_settings
 from app.configuration.connections_configuration import set_database_connection_settings, set_broker_connection_settings, set_engine_database_connection_settings, set_sanctionlist_watchlist_countries_settings
 from app.configuration.schema_configuration import set_schema_configuration_settings
 from app.configuration.websocket_configuration import set_websocket_settings
+from app.configuration.history_configuration import set_history_settings
 
 def get_all_configurations():
     confs = {
@@ -21,7 +23,8 @@ def get_all_configurations():
             "Other Settings": get_sanctions_connection_countries_settings()
         },
         "Central/Core Database Data Schema Mapping": get_schema_configuration_settings(),
-        "Webhook Configurations": get_websocket_settings()
+        "Webhook Configurations": get_websocket_settings(),
+        "History Settings": get_history_settings()
     }
 
     return confs
@@ -60,5 +63,8 @@ def update_configuration(new_config):
         
     if "Webhook_Configurations" in new_config:
         set_websocket_settings(new_config["Webhook_Configurations"])
+
+    if "History_Settings" in new_config:
+        set_history_settings(new_config["History_Settings"])
         
     return (new_config)
@@ -1,20 +1,21 @@
 from app.analysis.customer_risk_analysis import CustomerRiskAnalysis
 #from app.service.data_processing_service import get_processed_data
 from app.repository.transaction_repository import get_transaction_by_column
-from app.repository.customer_risk_profile_repository import insert_customer_risk_profile
+from app.service.risk_profile_writer_service import risk_profile_writer
 from app.mapper.customer_risk_profile_mapper import report_to_customer_risk_profile
-from app.service.data_processing_service import preprocessing
+from app.analysis.analysis_context import AnalysisContext
 import pprint
 
 #transactions = get_processed_data()
 
-def calculate_customer_risk_single_transaction(transaction, transactions):
-    risk = CustomerRiskAnalysis(transactions, transaction)
-    transaction = preprocessing(transaction.to_frame(name="0").T).iloc[0]
+def calculate_customer_risk_single_transaction(transaction, history, context: AnalysisContext = None):
+    context = context if context is not None else AnalysisContext(transaction, history)
+    transaction = context.transaction
+    risk = CustomerRiskAnalysis(history.df, transaction, history, context=context)
     
     report = risk.generate_customer_risk_report()
 
-    insert_customer_risk_profile(report_to_customer_risk_profile(report,
+    risk_profile_writer.submit_customer_profile(report_to_customer_risk_profile(report,
                                                                  account_age= int(transaction['ACCOUNT_AGE_DAYS']), 
                                                                  occupation= str(transaction['OCCUPATION']), 
                                                                  region= str(transaction['HOUSENO']),
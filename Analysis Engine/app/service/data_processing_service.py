@@ -1,7 +1,13 @@
 from app.configuration.schema_configuration import get_schema_configuration_settings
-from app.repository.transaction_repository import get_all_transactions
+from app.repository.transaction_repository import stream_transactions, count_transactions, selected_columns
+from app.configuration.history_configuration import get_history_settings
+from app.history.columnar_snapshot import ColumnarSnapshot
+from app.history.history_compaction import DERIVED_COLUMNS, compact_history, concat_compacted, enforce_memory_limit, column_memory, memory_report
+from app.dto.transaction_record import TransactionRecord, NO_LEADING_DIGIT
+import numpy as np
 import pandas as pd
 import logging
+import time
 
 logging.basicConfig(level=logging.INFO)
 
@@ -23,7 +29,8 @@ def preprocessing(df):
             df.reset_index(drop=True, inplace=True)
 
         if 'AMOUNTINBIRR' in df.columns:
-            df['BRENTFORDIGIT'] = df['AMOUNTINBIRR'].astype(str).str[0].astype(int, errors='ignore')
+            leading = df['AMOUNTINBIRR'].astype(str).str[:1]
+            df['BRENTFORDIGIT'] = np.where(leading.str.isdigit(), leading, str(NO_LEADING_DIGIT)).astype(np.int64)
 
         now = pd.Timestamp.now(tz="UTC")
 	
@@ -37,29 +44,153 @@ def preprocessing(df):
 
         return df
 
-def get_processed_data():
+def normalize_transaction(transaction) -> TransactionRecord:
+    if isinstance(transaction, TransactionRecord):
+        return transaction
+    if isinstance(transaction, pd.Series):
+        return TransactionRecord.from_values(transaction.to_dict())
+    if isinstance(transaction, dict):
+        return TransactionRecord.from_values(transaction)
+    return transaction.to_record()
+
+def load_processed_chunks(chunks, total=None, settings=None):
+    settings = settings or get_history_settings()
+    compaction_enabled = str(settings['history_compaction_enabled']).lower() == 'true'
+    category_columns = [column.strip() for column in str(settings['history_category_columns']).split(',') if column.strip()]
 
     schema = get_schema_configuration_settings()
     reversed_schema = {v: k for k, v in schema.items()}
 
-    transactions = get_all_transactions(pandas_df=True)
-    transactions.columns = [reversed_schema.get(name, name) for name in transactions.columns]
-    
-    transactions = preprocessing(transactions)
-
-    usage = transactions.memory_usage(deep=True)
-    usage_mb = usage / 1024**2
-    """
-    logging.info("-------------------MEMORY USAGE OF ALL TRANSACTION DF BY COLUMN--------------------------")
-    logging.info(usage_mb.sort_values(ascending=False).head(5))
-    logging.info(f"SUM OF SELECTED COLUMNS: {float(usage_mb.sort_values(ascending=False)[selected_columns].sum())}")
-    """
-    logging.info(f"-------------------TOTAL MEMORY USAGE OF ALL TRANSACTION {transactions.shape}---------------------------------")
-    logging.info(f"Total size: {usage.sum() / 1024**2:.2f} MB")
+    frames = []
+    raw_memory = None
+    loaded = 0
+    started = time.perf_counter()
+
+    for chunk in chunks:
+        chunk.columns = [reversed_schema.get(name, name) for name in chunk.columns]
+        chunk = preprocessing(chunk)
+        if chunk.empty:
+            continue
+
+        memory = column_memory(chunk)
+        raw_memory = memory if raw_memory is None else raw_memory.assign(mb=raw_memory['mb'].add(memory['mb'], fill_value=0))
+
+        if compaction_enabled:
+            chunk = compact_history(chunk, category_columns=category_columns)
+        frames.append(chunk)
+
+        loaded += len(chunk)
+        progress = f"{loaded}/{total} ({loaded / total:.0%})" if total else f"{loaded}"
+        logging.info(f"[Data Processing] Loaded {progress} transactions in {time.perf_counter() - started:.1f}s")
+
+    transactions = concat_compacted(frames)
+    frames.clear()
+
+    return transactions, raw_memory
+
+
+def get_processed_data():
+    settings = get_history_settings()
+    chunk_size = int(settings['history_load_chunk_size'] or 50000)
+
+    try:
+        total = count_transactions()
+    except Exception as e:
+        logging.error(f"[Data Processing] Could not count the transactions, progress is reported without a total: {e}")
+        total = None
+
+    transactions, raw_memory = load_processed_chunks(stream_transactions(chunk_size), total, settings)
+
+    if raw_memory is not None:
+        logging.info(f"-------------------MEMORY USAGE OF ALL TRANSACTION DF BY COLUMN {transactions.shape}--------------------------")
+        logging.info("\n" + memory_report(raw_memory, column_memory(transactions)).to_string())
+        logging.info("-----------------------------------------------------------------------------------------")
+
+    return transactions
+
+
+def get_processed_data_after(watermark, with_transaction_id=False):
+    settings = get_history_settings()
+    chunk_size = int(settings['history_load_chunk_size'] or 50000)
+
+    chunks = stream_transactions(chunk_size, watermark=watermark, with_transaction_id=with_transaction_id)
+    transactions, _ = load_processed_chunks(chunks, settings=settings)
+    if transactions.empty or watermark is None:
+        return transactions
+
+    return transactions[transactions['TIMESTAMP'] > pd.Timestamp(watermark)].reset_index(drop=True)
+
+
+def refresh_account_age(df):
+    # ACCOUNT_AGE_DAYS is relative to the load time, a snapshot written days ago has to be brought up to date
+    if 'OPENEDDATE' in df.columns:
+        df['ACCOUNT_AGE_DAYS'] = (pd.Timestamp.now(tz="UTC") - df['OPENEDDATE']).dt.days
+    return df
+
+
+def compact_processed_data(transactions, settings=None, enforce_limit: bool = True):
+    settings = settings or get_history_settings()
+    if transactions is None or transactions.empty or str(settings['history_compaction_enabled']).lower() != 'true':
+        return transactions
+
+    before = column_memory(transactions)
+
+    category_columns = [column.strip() for column in str(settings['history_category_columns']).split(',') if column.strip()]
+    transactions = compact_history(transactions, category_columns=category_columns)
+
+    if not enforce_limit:
+        return transactions
+
+    try:
+        memory_limit_mb = float(settings['history_memory_limit_mb'] or 0)
+    except (TypeError, ValueError):
+        logging.error(f"[Data Processing] Invalid history_memory_limit_mb {settings['history_memory_limit_mb']!r}, no memory limit applied")
+        memory_limit_mb = 0
+    transactions = enforce_memory_limit(transactions, memory_limit_mb)
+
+    logging.info(f"-------------------MEMORY USAGE OF THE COMPACTED TRANSACTION HISTORY {transactions.shape}-------------------")
+    logging.info("\n" + memory_report(before, column_memory(transactions)).to_string())
     logging.info("-----------------------------------------------------------------------------------------")
 
     return transactions
 
 
+def load_history_data():
+    settings = get_history_settings()
+    if str(settings['history_snapshot_enabled']).lower() != 'true':
+        return compact_processed_data(get_processed_data(), settings)
+
+    # a compacted snapshot no longer carries the columns TIMESTAMP was built from
+    required_columns = selected_columns
+    if str(settings['history_compaction_enabled']).lower() == 'true':
+        required_columns = [column for column in selected_columns if column not in DERIVED_COLUMNS]
+
+    snapshot = ColumnarSnapshot(settings['history_snapshot_path'])
+    try:
+        transactions, watermark = snapshot.load(columns=required_columns)
+    except Exception as e:
+        logging.error(f"[Data Processing] Could not read the history snapshot, falling back to a full load: {e}")
+        transactions, watermark = None, None
+
+    if transactions is None or watermark is None:
+        transactions = get_processed_data()
+    else:
+        transactions = refresh_account_age(transactions)
+        delta = get_processed_data_after(watermark)
+        logging.info(f"[Data Processing] {len(delta)} transactions newer than the snapshot watermark {watermark}")
+        if delta.empty:
+            return compact_processed_data(transactions, settings)
+        transactions = pd.concat([transactions, delta], ignore_index=True)
+
+    transactions = compact_processed_data(transactions, settings)
+
+    try:
+        snapshot.save(transactions)
+    except Exception as e:
+        logging.error(f"[Data Processing] Could not write the history snapshot: {e}")
+
+    return transactions
+
+
 if __name__ == "__main__":
     transactions = get_processed_data()
\ No newline at end of file
@@ -0,0 +1,129 @@
+import threading
+import time
+import logging
+import pandas as pd
+from app.history.columnar_snapshot import ColumnarSnapshot
+from app.service.data_processing_service import get_processed_data_after
+
+
+class HistoryRefresher:
+    """Merges transactions written to the central table outside the HTTP path into the live history."""
+
+    def __init__(self, store, interval_seconds: float = 60, batch_size: int = 1000, watermark=None, overlap_seconds: float = 300):
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.overlap_seconds = overlap_seconds
+        self.watermark = None
+        # the loaded frame ends where the database did at startup, live appends do not move the watermark
+        self.set_watermark(watermark if watermark is not None else ColumnarSnapshot.watermark_of(store.account_index.df))
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.merged = 0
+        self.duplicates = 0
+        self.last_refresh = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_seconds > 0
+
+    def stats(self) -> dict:
+        return {
+            "watermark": self.watermark,
+            "overlap_seconds": self.overlap_seconds,
+            "merged": self.merged,
+            "duplicates": self.duplicates,
+            "last_refresh": self.last_refresh,
+        }
+
+    def set_watermark(self, watermark):
+        # the watermark only ever comes from rows read from the central table, never from the in-memory frame
+        self.watermark = watermark
+        # ids of the rows fetched within the overlap window, filled from the database on the next run
+        self._seen = None
+
+    def run_once(self) -> int:
+        started = time.perf_counter()
+
+        # rows committed late or sharing the watermark second sort before it, the query reaches back over an overlap
+        # window and the rows already fetched there are recognised by their TRANSACTIONID
+        since = None if self.watermark is None else pd.Timestamp(self.watermark) - pd.Timedelta(seconds=self.overlap_seconds)
+        delta = get_processed_data_after(since, with_transaction_id=True)
+        timestamps = delta['TIMESTAMP'] if not delta.empty else pd.Series([], dtype='datetime64[ns, UTC]')
+
+        if self._seen is None:
+            self._seen = {}
+            if self.watermark is not None and not delta.empty:
+                # the loaded history holds the rows up to the watermark, the frame does not keep their ids
+                loaded = timestamps <= pd.Timestamp(self.watermark)
+                self._seen = dict(zip(delta.loc[loaded, 'TRANSACTIONID'], timestamps[loaded]))
+                delta, timestamps = delta[~loaded], timestamps[~loaded]
+
+        fetched = len(delta)
+        if fetched:
+            new = ~delta['TRANSACTIONID'].isin(self._seen.keys())
+            delta, timestamps = delta[new].reset_index(drop=True), timestamps[new].reset_index(drop=True)
+
+        merged = 0
+        # small slices keep the store lock short, scoring requests take their snapshots in between
+        for start in range(0, len(delta), self.batch_size):
+            merged += self.store.extend(delta.iloc[start:start + self.batch_size])
+
+        # rows already appended through the HTTP path carry the same TRANSACTIONID and are skipped by the store
+        self.merged += merged
+        self.duplicates += len(delta) - merged
+
+        self._seen.update(zip(delta['TRANSACTIONID'], timestamps) if len(delta) else ())
+        latest = ColumnarSnapshot.watermark_of(delta)
+        if latest is not None and (self.watermark is None or pd.Timestamp(latest) > pd.Timestamp(self.watermark)):
+            self.watermark = latest
+        if self.watermark is not None:
+            horizon = pd.Timestamp(self.watermark) - pd.Timedelta(seconds=self.overlap_seconds)
+            self._seen = {transaction_id: timestamp for transaction_id, timestamp in self._seen.items() if timestamp >= horizon}
+        self.last_refresh = time.time()
+
+        if len(delta):
+            logging.info(f"[History Refresh] Merged {merged} of {len(delta)} new transactions ({fetched} read since {since}), "
+                         f"watermark {self.watermark} ({time.perf_counter() - started:.2f}s)")
+        return merged
+
+    def _run(self):
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"[History Refresh] Refresh failed, retrying from {self.watermark}: {e}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if not self.enabled:
+            logging.info("[History Refresh] Disabled, the history only grows through the scoring endpoints")
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="history-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @classmethod
+    def from_settings(cls, store, settings: dict):
+        try:
+            interval_seconds = float(settings.get('history_refresh_interval_seconds') or 0)
+        except (TypeError, ValueError):
+            logging.error(f"[History Refresh] Invalid history_refresh_interval_seconds {settings.get('history_refresh_interval_seconds')!r}, refresh disabled")
+            interval_seconds = 0
+        try:
+            overlap_seconds = float(settings.get('history_refresh_overlap_seconds') or 0)
+        except (TypeError, ValueError):
+            logging.error(f"[History Refresh] Invalid history_refresh_overlap_seconds {settings.get('history_refresh_overlap_seconds')!r}, no overlap")
+            overlap_seconds = 0
+        return cls(store, interval_seconds, overlap_seconds=overlap_seconds)
@@ -0,0 +1,119 @@
+import threading
+import time
+import logging
+from dataclasses import dataclass
+import pandas as pd
+from app.analysis.screening_index import ScreeningIndex
+from app.configuration.connections_configuration import get_sanctions_connection_countries_settings, DEFAULT_REFERENCE_DATA_TTL_SECONDS
+from app.repository.swc_repository import get_all_countries, get_all_sanction_list_entries, get_all_watch_list_entries, register_change_listener
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    sanctionlist: pd.DataFrame
+    watchlist: pd.DataFrame
+    countries: pd.DataFrame
+    screening: ScreeningIndex
+    version: int
+    loaded_at: float
+
+
+class ReferenceDataUnavailable(RuntimeError):
+    """Raised when a request needs the reference data before the first load has finished."""
+
+
+class ReferenceDataCache:
+    """Sanction list, watch list and high risk countries held in memory and refreshed in the background."""
+
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._data = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._stale = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def load(self) -> ReferenceData:
+        sanctionlist = get_all_sanction_list_entries(pandas_df=True)
+        watchlist = get_all_watch_list_entries(pandas_df=True)
+        countries = get_all_countries(pandas_df=True)
+        screening = ScreeningIndex.from_lists(sanctionlist, watchlist)
+
+        with self._lock:
+            self._version += 1
+            data = ReferenceData(sanctionlist, watchlist, countries, screening, self._version, time.time())
+            self._data = data
+
+        logging.info(f"[Reference Data] Loaded {len(sanctionlist)} sanction, {len(watchlist)} watch list and {len(countries)} country entries (version {data.version})")
+        return data
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    def stats(self) -> dict:
+        data = self._data
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "version": data.version if data is not None else None,
+            "loaded_at": data.loaded_at if data is not None else None,
+            "age_seconds": round(time.time() - data.loaded_at, 1) if data is not None else None,
+        }
+
+    def get(self) -> ReferenceData:
+        # requests never query the database: a cold cache is an error, an expired one is served until the reload lands
+        data = self._data
+        if data is None:
+            raise ReferenceDataUnavailable("Sanction, watch list and country data are not loaded yet")
+        return data
+
+    def invalidate(self, table_name=None):
+        logging.info(f"[Reference Data] {table_name or 'Reference data'} changed, scheduling a reload")
+        self._stale.set()
+
+    def _refresh_loop(self):
+        while not self._stopped.is_set():
+            self._stale.wait(timeout=self.ttl_seconds)
+            if self._stopped.is_set():
+                break
+
+            self._stale.clear()
+            try:
+                self.load()
+            except Exception as e:
+                # keep serving the last good copy until the database is reachable again
+                logging.error(f"[Reference Data] Reload failed, keeping version {self._version}: {e}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        if self._data is None:
+            self.load()
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="reference-data-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._stale.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+    @classmethod
+    def from_settings(cls, settings: dict):
+        try:
+            ttl_seconds = float(settings.get('reference_data_ttl_seconds') or DEFAULT_REFERENCE_DATA_TTL_SECONDS)
+        except (TypeError, ValueError):
+            logging.error(f"[Reference Data] Invalid reference_data_ttl_seconds {settings.get('reference_data_ttl_seconds')!r}, "
+                          f"reloading every {DEFAULT_REFERENCE_DATA_TTL_SECONDS}s")
+            ttl_seconds = float(DEFAULT_REFERENCE_DATA_TTL_SECONDS)
+        return cls(ttl_seconds)
+
+
+reference_data = ReferenceDataCache.from_settings(get_sanctions_connection_countries_settings())
+register_change_listener(reference_data.invalidate)
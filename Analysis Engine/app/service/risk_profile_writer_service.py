@@ -0,0 +1,155 @@
+import queue
+import threading
+import time
+import logging
+from app.repository.transaction_risk_profile_repository import insert_transaction_risk_profiles_bulk
+from app.repository.customer_risk_profile_repository import insert_customer_risk_profiles_bulk
+
+
+class RiskProfileWriter:
+    """Write-behind persistence: risk profiles are queued by the request and bulk inserted by a background worker."""
+
+    TRANSACTION = "transaction"
+    CUSTOMER = "customer"
+
+    def __init__(self, max_queue_size: int = 10000, batch_size: int = 500, flush_interval_seconds: float = 1.0, max_retries: int = 3):
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_retries = max_retries
+        self.inserters = {
+            self.TRANSACTION: insert_transaction_risk_profiles_bulk,
+            self.CUSTOMER: insert_customer_risk_profiles_bulk,
+        }
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._flush_now = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        # synchronous writes and the worker both count, the counters only move under the lock
+        self._lock = threading.Lock()
+
+        self.written = 0
+        self.failed = 0
+        self.blocked = 0
+        self.last_flush = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_capacity": self._queue.maxsize,
+            "written": self.written,
+            "failed": self.failed,
+            "blocked_submissions": self.blocked,
+            "last_flush": self.last_flush,
+        }
+
+    def submit(self, kind, profile):
+        if self._thread is None:
+            # nobody is draining the queue, fall back to a synchronous write
+            self._insert(kind, [profile])
+            return
+
+        try:
+            self._queue.put_nowait((kind, profile))
+        except queue.Full:
+            # backpressure: the caller waits for the worker instead of growing the queue without bound
+            with self._lock:
+                self.blocked += 1
+            logging.warning(f"[Risk Profile Writer] Queue full ({self._queue.maxsize}), waiting for the writer to catch up")
+            self._flush_now.set()
+            self._queue.put((kind, profile))
+
+    def submit_transaction_profile(self, profile):
+        self.submit(self.TRANSACTION, profile)
+
+    def submit_customer_profile(self, profile):
+        self.submit(self.CUSTOMER, profile)
+
+    def flush(self):
+        if self._thread is None:
+            return
+        self._flush_now.set()
+        self._queue.join()
+
+    def _drain(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval_seconds)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if self._flush_now.is_set() or self._stopped.is_set():
+                remaining = 0
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _insert(self, kind, profiles):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.inserters[kind](profiles)
+                with self._lock:
+                    self.written += len(profiles)
+                return True
+            except Exception as e:
+                logging.error(f"[Risk Profile Writer] Bulk insert of {len(profiles)} {kind} profiles failed (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries:
+                    time.sleep(min(2 ** attempt, 10))
+
+        with self._lock:
+            self.failed += len(profiles)
+        return False
+
+    def _write(self, batch):
+        grouped = {}
+        for kind, profile in batch:
+            grouped.setdefault(kind, []).append(profile)
+
+        try:
+            for kind, profiles in grouped.items():
+                self._insert(kind, profiles)
+            self.last_flush = time.time()
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self):
+        while True:
+            batch = self._drain()
+            if batch:
+                self._write(batch)
+            elif self._stopped.is_set():
+                break
+
+            if self._queue.empty():
+                self._flush_now.clear()
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="risk-profile-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+
+        # everything already queued is written before the worker exits
+        logging.info(f"[Risk Profile Writer] Stopping, flushing {self.queue_depth} queued profiles")
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+
+risk_profile_writer = RiskProfileWriter()
@@ -0,0 +1,320 @@
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+import zlib
+import logging
+from concurrent.futures import Future
+from app.analysis.analysis_context import AnalysisContext
+from app.history.shared_history import SharedHistory
+from app.service.transaction_risk_analysis_service import calculate_transaction_risk_single_transaction
+from app.service.customer_risk_analysis_service import calculate_customer_risk_single_transaction
+
+TRANSACTION = "transaction"
+CUSTOMER = "customer"
+ALL = "all"
+# a transaction scored in the server process while its worker attaches, the worker only adds it to its history
+APPEND = "append"
+
+EXPIRED = "expired"
+
+
+def score_transaction(kind, record, snapshot) -> dict:
+    reports = {}
+    # both halves share the account slice and peer statistics instead of computing them twice
+    context = AnalysisContext(record, snapshot)
+    if kind in (TRANSACTION, ALL):
+        reports["transaction_risk_report"] = calculate_transaction_risk_single_transaction(record, snapshot, context)
+    if kind in (CUSTOMER, ALL):
+        reports["customer_risk_report"] = calculate_customer_risk_single_transaction(record, snapshot, context)
+    return reports
+
+
+def _is_expired(task_id, deadline, cancels, cancelled) -> bool:
+    while True:
+        try:
+            cancelled.add(cancels.get_nowait())
+        except queue.Empty:
+            break
+    if task_id in cancelled:
+        cancelled.discard(task_id)
+        return True
+    return time.time() > deadline
+
+
+def _worker_main(index, path, poll_seconds, chunk_size, tasks, cancels, results):
+    # the server process handles the shutdown, it stops the workers through their task queues
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from app.service.reference_data_service import reference_data
+    from app.service.risk_profile_writer_service import risk_profile_writer
+
+    try:
+        shared_history = SharedHistory(path, poll_seconds=poll_seconds, chunk_size=chunk_size, can_lead=False)
+        history = shared_history.open()
+        shared_history.start()
+        reference_data.start()
+        risk_profile_writer.start()
+    except Exception as e:
+        logging.error(f"[Scoring Executor] Worker {index} could not start: {e}")
+        results.put((None, index, None, f"{type(e).__name__}: {e}"))
+        return
+
+    results.put((None, index, "ready", None))
+    cancelled = set()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        task_id, kind, record, deadline = task
+        if kind == APPEND:
+            history.append(record)
+            continue
+
+        try:
+            # a request the server gave up on is not recorded by the server either, appending it would split the two histories
+            if _is_expired(task_id, deadline, cancels, cancelled):
+                results.put((task_id, index, None, EXPIRED))
+                continue
+
+            reports = score_transaction(kind, record, history.snapshot())
+            if _is_expired(task_id, deadline, cancels, cancelled):
+                results.put((task_id, index, None, EXPIRED))
+                continue
+
+            # every transaction of an account is scored by this worker, so its own rows keep the account slice current
+            history.append(record)
+            results.put((task_id, index, reports, None))
+        except Exception as e:
+            results.put((task_id, index, None, f"{type(e).__name__}: {e}"))
+
+    risk_profile_writer.stop()
+    reference_data.stop()
+    shared_history.stop()
+
+
+class ScoringExecutor:
+    """Scores single transactions in worker processes attached to the shared history, each account always on the same worker."""
+
+    def __init__(self, path: str, workers: int, poll_seconds: float = 5, chunk_size: int = 1024, timeout_seconds: float = 30,
+                 retry_seconds: float = 30, grace_seconds: float = 2):
+        self.path = path
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.chunk_size = chunk_size
+        self.timeout_seconds = timeout_seconds
+        self.retry_seconds = retry_seconds
+        self.grace_seconds = grace_seconds
+
+        # spawned rather than forked, the server process already runs threads holding locks
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = [None] * workers
+        self._restart_at = [0.0] * workers
+        self._tasks = [None] * workers
+        self._cancels = [None] * workers
+        self._results = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.ready = set()
+        self.submitted = [0] * workers
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self.fallbacks = 0
+        self.late = 0
+        self.restarts = 0
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "ready_workers": len(self.ready),
+            "alive_workers": sum(1 for process in self._processes if process is not None and process.is_alive()),
+            "in_flight": len(self._pending),
+            "submitted": list(self.submitted),
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired": self.expired,
+            "scored_in_server": self.fallbacks,
+            "late_results": self.late,
+            "restarts": self.restarts,
+        }
+
+    def route(self, account_no) -> int:
+        # crc32 rather than hash(), which is salted per process and would move accounts between restarts
+        return zlib.crc32(str(account_no).encode()) % self.workers
+
+    def _start_worker(self, index):
+        self._tasks[index] = self._context.Queue()
+        self._cancels[index] = self._context.Queue()
+        process = self._context.Process(target=_worker_main, name=f"scoring-worker-{index}", daemon=True,
+                                        args=(index, self.path, self.poll_seconds, self.chunk_size, self._tasks[index], self._cancels[index], self._results))
+        process.start()
+        self._processes[index] = process
+
+    def submit(self, kind, record):
+        index = self.route(record['ACCOUNTNO'])
+        future = Future()
+        with self._lock:
+            task_id = self._next_id
+            self._next_id += 1
+            self._pending[task_id] = (index, future)
+            self.submitted[index] += 1
+            # one queue per worker keeps the transactions of an account in arrival order
+            self._tasks[index].put((task_id, kind, record, time.time() + self.timeout_seconds))
+        return task_id, future
+
+    def cancel(self, task_id) -> bool:
+        with self._lock:
+            index, future = self._pending.pop(task_id, (None, None))
+            if future is None:
+                return False
+            self._cancels[index].put(task_id)
+            return True
+
+    def score(self, kind, record, fallback) -> dict:
+        index = self.route(record['ACCOUNTNO'])
+        if index not in self.ready:
+            # a worker still attaching would turn a slow start into timeouts, the server scores meanwhile and
+            # queues the transaction so the worker's account slice holds it once it is attached
+            with self._lock:
+                if self._tasks[index] is not None:
+                    self._tasks[index].put((None, APPEND, record, None))
+                self.fallbacks += 1
+            return fallback()
+
+        task_id, future = self.submit(kind, record)
+        try:
+            # the worker drops the task at its deadline, the grace leaves room for a result already on its way
+            return future.result(timeout=self.timeout_seconds + self.grace_seconds)
+        except TimeoutError:
+            # a task the worker already dropped was counted when its result came back
+            if self.cancel(task_id):
+                with self._lock:
+                    self.expired += 1
+            raise
+
+    def _resolve(self, task_id, index, reports, error):
+        if task_id is None:
+            if error is None:
+                self.ready.add(index)
+                logging.info(f"[Scoring Executor] Worker {index} attached to the shared history")
+            return
+
+        # request threads count too, every counter moves under the lock so /metrics adds up
+        with self._lock:
+            _, future = self._pending.pop(task_id, (None, None))
+            if future is None:
+                if error is None:
+                    self.late += 1
+            elif error is None:
+                self.completed += 1
+            elif error == EXPIRED:
+                self.expired += 1
+            else:
+                self.failed += 1
+
+        if future is None:
+            if error is None:
+                # the worker recorded a transaction whose request already failed, the server history lacks it until the next generation
+                logging.warning(f"[Scoring Executor] Worker {index} finished task {task_id} after its request timed out")
+            return
+
+        if error is None:
+            future.set_result(reports)
+        elif error == EXPIRED:
+            future.set_exception(TimeoutError(f"Scoring worker {index} dropped the transaction at its {self.timeout_seconds}s deadline"))
+        else:
+            future.set_exception(RuntimeError(error))
+
+    def _replace_dead_workers(self):
+        for index, process in enumerate(self._processes):
+            if process is None or process.is_alive() or self._stopped.is_set() or time.time() < self._restart_at[index]:
+                continue
+
+            with self._lock:
+                lost = [task_id for task_id, (worker, _) in self._pending.items() if worker == index]
+                futures = [self._pending.pop(task_id)[1] for task_id in lost]
+                # a worker that died before attaching would fail the same way again, its replacement waits before the next try
+                self._restart_at[index] = time.time() + (0 if index in self.ready else self.retry_seconds)
+                # the replacement rebuilds the account slices from the latest generation, rows newer than it are lost
+                self.ready.discard(index)
+                self.restarts += 1
+                self.failed += len(futures)
+                self._start_worker(index)
+
+            logging.error(f"[Scoring Executor] Worker {index} exited with code {process.exitcode}, "
+                          f"{len(futures)} transactions failed, restarted it")
+            for future in futures:
+                future.set_exception(RuntimeError(f"Scoring worker {index} exited with code {process.exitcode}"))
+
+    def _collect(self):
+        checked = time.time()
+        while not self._stopped.is_set():
+            try:
+                self._resolve(*self._results.get(timeout=1))
+            except queue.Empty:
+                pass
+            except Exception as e:
+                logging.error(f"[Scoring Executor] Collecting a result failed: {e}")
+
+            if time.time() - checked >= 1:
+                checked = time.time()
+                self._replace_dead_workers()
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._results = self._context.Queue()
+        for index in range(self.workers):
+            self._start_worker(index)
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._collect, name="scoring-executor", daemon=True)
+        self._thread.start()
+        logging.info(f"[Scoring Executor] Started {self.workers} scoring workers")
+
+    def stop(self, timeout: float = 10):
+        self._stopped.set()
+
+        for task_queue in self._tasks:
+            if task_queue is not None:
+                task_queue.put(None)
+
+        deadline = time.time() + timeout
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.time()))
+            if process.is_alive():
+                process.terminate()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        with self._lock:
+            futures = [future for _, future in self._pending.values()]
+            self._pending.clear()
+        for future in futures:
+            future.set_exception(RuntimeError("Scoring executor stopped"))
+
+    @classmethod
+    def from_settings(cls, settings: dict):
+        try:
+            workers = int(settings.get('history_scoring_workers') or 0)
+            timeout_seconds = float(settings.get('history_scoring_timeout_seconds') or 30)
+            poll_seconds = float(settings.get('history_attach_poll_seconds') or 5)
+        except (TypeError, ValueError):
+            logging.error("[Scoring Executor] Invalid worker count, timeout or poll interval, scoring in the server process")
+            return None
+
+        if workers <= 0:
+            return None
+        return cls(settings.get('history_shared_path') or 'history_shared', workers, poll_seconds, timeout_seconds=timeout_seconds)
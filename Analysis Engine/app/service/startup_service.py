@@ -0,0 +1,69 @@
+import threading
+import time
+import logging
+
+
+class BackgroundStartup:
+    """Runs the service initializer off the event loop and tracks whether the service is ready to score."""
+
+    def __init__(self, initializer, retry_seconds: float = 30):
+        self.initializer = initializer
+        self.retry_seconds = retry_seconds
+
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.state = "starting"
+        self.attempts = 0
+        self.error = None
+        self.started_at = None
+        self.ready_at = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "attempts": self.attempts,
+            "error": self.error,
+            "started_at": self.started_at,
+            "ready_at": self.ready_at,
+            "startup_seconds": round(self.ready_at - self.started_at, 2) if self.ready_at is not None else None,
+        }
+
+    def wait(self, timeout=None) -> bool:
+        return self._ready.wait(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.attempts += 1
+            try:
+                self.initializer()
+            except Exception as e:
+                # the database may not be up yet when the container starts, the probe reports the failure meanwhile
+                self.state, self.error = "failed", str(e)
+                logging.error(f"[Startup] Initialization attempt {self.attempts} failed, retrying in {self.retry_seconds}s: {e}")
+                self._stopped.wait(self.retry_seconds)
+                continue
+
+            self.state, self.error = "ready", None
+            self.ready_at = time.time()
+            self._ready.set()
+            logging.info(f"[Startup] Service ready after {self.ready_at - self.started_at:.2f}s")
+            return
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self.started_at = time.time()
+        self._stopped.clear()
+        # daemon thread: a shutdown during a long history load does not wait for it to finish
+        self._thread = threading.Thread(target=self._run, name="startup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
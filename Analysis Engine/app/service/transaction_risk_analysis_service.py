@@ -1,24 +1,27 @@
 from app.analysis.transaction_risk_analysis import TransactionRiskAnalysis
 #from app.service.data_processing_service import get_processed_data
 from app.repository.transaction_repository import get_transaction_by_column
-from app.repository.transaction_risk_profile_repository import insert_transaction_risk_profile
+from app.service.risk_profile_writer_service import risk_profile_writer
 from app.mapper.transaction_risk_profile_mapper import report_to_transaction_risk_profile
+from app.analysis.analysis_context import AnalysisContext
 
 #transactions = get_processed_data()
 
-def calculate_transaction_risk_single_transaction(transaction, transactions):
-    risk = TransactionRiskAnalysis(transactions, transaction)
+def calculate_transaction_risk_single_transaction(transaction, history, context: AnalysisContext = None):
+    context = context if context is not None else AnalysisContext(transaction, history)
+    transaction = context.transaction
+    risk = TransactionRiskAnalysis(history.df, transaction, history, context=context)
     
     report = risk.generate_transaction_risk_report()
     
-    transaction_id = transaction['TRANSACTIONID'],
+    transaction_id = str(transaction['TRANSACTIONID'])
     t_from=str(transaction['ACCOUNTNO'])
     t_to = str(transaction['BENACCOUNTNO'])
     tf_name = str(transaction['ACCOWNERNAME'])
     tt_name = str(transaction['BENFULLNAME'])
     amount = float(transaction['AMOUNTINBIRR'])
     ttype = str(transaction['TRANSACTIONTYPE'])
-    timestamp = transaction['TRANSACTIONDATE'] + " " + transaction['TRANSACTIONTIME']    
+    timestamp = transaction.received_timestamp
     
     
     profile = report_to_transaction_risk_profile(report, transaction_id = transaction_id,
@@ -30,7 +33,7 @@ def calculate_transaction_risk_single_transaction(transaction, transactions):
                                                                         ttype = ttype,
                                                                         timestamp = timestamp
                                                                         )
-    insert_transaction_risk_profile(profile)
+    risk_profile_writer.submit_transaction_profile(profile)
 
     return(report)
 
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, List
+
+
+@dataclass
+class BrokerMessage:
+    topic: str
+    partition: int
+    offset: int
+    value: Any
+
+
+class BrokerClient(ABC):
+    """Minimal consumer interface the streaming mode needs: poll a micro-batch, commit it once it is persisted."""
+
+    @abstractmethod
+    def poll(self, max_records: int, timeout_seconds: float) -> List[BrokerMessage]:
+        ...
+
+    @abstractmethod
+    def commit(self, messages: List[BrokerMessage]):
+        ...
+
+    @abstractmethod
+    def rewind(self, messages: List[BrokerMessage]):
+        ...
+
+    def close(self):
+        pass
+
+
+class KafkaBrokerClient(BrokerClient):
+    """Consumer group member backed by kafka-python; partitions are shared out between the instances of a group."""
+
+    def __init__(self, bootstrap_server, topic, group_id, auto_offset_reset="earliest"):
+        try:
+            from kafka import KafkaConsumer
+        except ImportError as e:
+            raise ImportError("The streaming consumer needs the kafka extra of analysis-engine (kafka-python)") from e
+
+        self.topic = topic
+        self.consumer = KafkaConsumer(
+            topic,
+            bootstrap_servers=[server.strip() for server in str(bootstrap_server).split(",") if server.strip()],
+            group_id=group_id,
+            auto_offset_reset=auto_offset_reset or "earliest",
+            enable_auto_commit=False,
+        )
+
+    @classmethod
+    def from_settings(cls, settings: dict):
+        return cls(settings.get('bootstrap_server'), settings.get('topic'), settings.get('group_id'), settings.get('auto_offset_reset'))
+
+    def poll(self, max_records: int, timeout_seconds: float) -> List[BrokerMessage]:
+        records = self.consumer.poll(timeout_ms=int(timeout_seconds * 1000), max_records=max_records)
+
+        messages = []
+        for partition, partition_records in records.items():
+            for record in partition_records:
+                messages.append(BrokerMessage(partition.topic, partition.partition, record.offset, record.value))
+        return messages
+
+    def commit(self, messages: List[BrokerMessage]):
+        # every polled record is processed before the next poll, so the consumed positions are the ones to commit
+        if messages:
+            self.consumer.commit()
+
+    def rewind(self, messages: List[BrokerMessage]):
+        from kafka import TopicPartition
+
+        earliest = {}
+        for message in messages:
+            key = (message.topic, message.partition)
+            earliest[key] = min(earliest.get(key, message.offset), message.offset)
+
+        for (topic, partition), offset in earliest.items():
+            self.consumer.seek(TopicPartition(topic, partition), offset)
+
+    def close(self):
+        self.consumer.close()
+
+
+class InMemoryBrokerClient(BrokerClient):
+    """In-process stand-in for a single partition topic."""
+
+    def __init__(self, values=(), topic="transactions"):
+        self.topic = topic
+        self._lock = threading.Lock()
+        self._messages = deque()
+        self._next_offset = 0
+        self.committed_offset = -1
+        self.extend(values)
+
+    def put(self, value):
+        with self._lock:
+            self._messages.append(BrokerMessage(self.topic, 0, self._next_offset, value))
+            self._next_offset += 1
+
+    def extend(self, values):
+        for value in values:
+            self.put(value)
+
+    def poll(self, max_records: int, timeout_seconds: float) -> List[BrokerMessage]:
+        with self._lock:
+            count = min(max_records, len(self._messages))
+            return [self._messages.popleft() for _ in range(count)]
+
+    def commit(self, messages: List[BrokerMessage]):
+        if messages:
+            self.committed_offset = max(self.committed_offset, max(message.offset for message in messages))
+
+    def rewind(self, messages: List[BrokerMessage]):
+        with self._lock:
+            self._messages.extendleft(reversed(messages))
+
+
+class FileBrokerClient(BrokerClient):
+    """File-backed stand-in: one JSON message per line, the committed offset is kept in a sidecar file."""
+
+    def __init__(self, path, offsets_path=None, topic="transactions"):
+        self.path = path
+        self.offsets_path = offsets_path or f"{path}.offset"
+        self.topic = topic
+        self.committed_offset = self._read_committed_offset()
+        self._position = self.committed_offset + 1
+
+    def _read_committed_offset(self):
+        if not os.path.exists(self.offsets_path):
+            return -1
+        with open(self.offsets_path) as f:
+            content = f.read().strip()
+        return int(content) if content else -1
+
+    def poll(self, max_records: int, timeout_seconds: float) -> List[BrokerMessage]:
+        if not os.path.exists(self.path):
+            return []
+
+        messages = []
+        with open(self.path) as f:
+            for offset, line in enumerate(f):
+                if offset < self._position or not line.strip():
+                    continue
+                messages.append(BrokerMessage(self.topic, 0, offset, line))
+                if len(messages) >= max_records:
+                    break
+
+        if messages:
+            self._position = messages[-1].offset + 1
+        return messages
+
+    def commit(self, messages: List[BrokerMessage]):
+        if not messages:
+            return
+
+        self.committed_offset = max(self.committed_offset, max(message.offset for message in messages))
+        temporary_path = f"{self.offsets_path}.tmp"
+        with open(temporary_path, "w") as f:
+            f.write(str(self.committed_offset))
+        os.replace(temporary_path, self.offsets_path)
+
+    def rewind(self, messages: List[BrokerMessage]):
+        if messages:
+            self._position = min(message.offset for message in messages)
+
+
+def decode_message_value(value) -> dict:
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    return json.loads(value)
@@ -0,0 +1,149 @@
+import threading
+import time
+import logging
+import pandas as pd
+from pydantic import TypeAdapter, ValidationError
+from app.dto.transaction_data import TransactionDataDTO
+from app.streaming.broker_client import BrokerClient, KafkaBrokerClient, decode_message_value
+from app.service.batch_risk_analysis_service import score_risk_batch
+from app.service.data_processing_service import preprocessing
+from app.repository.risk_profile_repository import insert_risk_profiles_bulk
+
+transaction_adapter = TypeAdapter(TransactionDataDTO)
+
+
+class StreamConsumer:
+    """Pulls transactions from a broker in micro-batches, scores them and commits offsets once the profiles are stored."""
+
+    def __init__(self, client: BrokerClient, history, batch_size: int = 500, poll_timeout_seconds: float = 1.0,
+                 insert_profiles=insert_risk_profiles_bulk, dead_letter=None):
+        self.client = client
+        self.history = history
+        self.batch_size = batch_size
+        self.poll_timeout_seconds = poll_timeout_seconds
+        self.insert_profiles = insert_profiles
+        self.dead_letter = dead_letter
+        self._stopped = threading.Event()
+        # highest offset per partition whose profiles are stored, a redelivered batch does not write them twice
+        self._written = {}
+
+        self.consumed = 0
+        self.skipped = 0
+        self.replayed = 0
+        self.batches = 0
+
+    def stats(self) -> dict:
+        return {"consumed": self.consumed, "skipped": self.skipped, "replayed": self.replayed, "batches": self.batches}
+
+    def _reject(self, message, reason):
+        # a message that cannot be scored would block the partition forever, it is set aside and the batch moves past it
+        self.skipped += 1
+        logging.error(f"[Stream Consumer] Skipping message {message.topic}[{message.partition}]@{message.offset}: {reason}")
+        if self.dead_letter is not None:
+            self.dead_letter(message, reason)
+
+    def _decode(self, messages):
+        decoded = []
+        for message in messages:
+            try:
+                decoded.append((message, transaction_adapter.validate_python(decode_message_value(message.value))))
+            except ValidationError as e:
+                self._reject(message, f"not a transaction, {e.error_count()} invalid fields: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+            except (ValueError, TypeError) as e:
+                self._reject(message, f"unreadable: {e}")
+        return decoded
+
+    def _is_written(self, message) -> bool:
+        return message.offset <= self._written.get((message.topic, message.partition), -1)
+
+    def _mark_written(self, messages):
+        for message in messages:
+            key = (message.topic, message.partition)
+            self._written[key] = max(self._written.get(key, -1), message.offset)
+
+    def process(self, messages) -> int:
+        decoded = self._decode(messages)
+        replayed = [transaction for message, transaction in decoded if self._is_written(message)]
+        fresh = [(message, transaction) for message, transaction in decoded if not self._is_written(message)]
+
+        if replayed:
+            # scored and stored before the batch failed, only the history may still be missing them
+            self.history.extend(preprocessing(TransactionDataDTO.generate_transactions_dataframe(replayed)))
+            self.replayed += len(replayed)
+
+        if fresh:
+            transactions = TransactionDataDTO.generate_transactions_dataframe([transaction for _, transaction in fresh])
+            _, _, transaction_profiles, customer_profiles = score_risk_batch(transactions, self.history.snapshot())
+            self.insert_profiles(transaction_profiles, customer_profiles)
+            self._mark_written([message for message, _ in fresh])
+
+            # the history dedupes on TRANSACTIONID, extending again after a failed commit adds nothing
+            self.history.extend(preprocessing(transactions))
+
+        # offsets move only after the profiles are stored and the history holds the transactions
+        self.client.commit(messages)
+
+        self.consumed += len(fresh)
+        self.batches += 1
+        return len(fresh)
+
+    def run_once(self) -> int:
+        messages = self.client.poll(self.batch_size, self.poll_timeout_seconds)
+        if not messages:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            processed = self.process(messages)
+        except Exception:
+            # nothing was committed, hand the batch back so it is delivered again
+            self.client.rewind(messages)
+            raise
+
+        logging.info(f"[Stream Consumer] Scored {processed} transactions in {time.perf_counter() - started:.3f}s (batch {self.batches}, {self.consumed} total)")
+        return processed
+
+    def run(self):
+        logging.info(f"[Stream Consumer] Started, micro-batches of up to {self.batch_size} transactions")
+        try:
+            while not self._stopped.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logging.error(f"[Stream Consumer] Batch failed, offsets not committed: {e}")
+                    self._stopped.wait(self.poll_timeout_seconds)
+        finally:
+            self.client.close()
+            logging.info(f"[Stream Consumer] Stopped after {self.consumed} transactions")
+
+    def stop(self):
+        self._stopped.set()
+
+
+if __name__ == "__main__":
+    import signal
+    from app.configuration.connections_configuration import get_broker_connection_settings
+    from app.service.data_processing_service import load_history_data
+    from app.service.reference_data_service import reference_data
+    from app.history.history_store import HistoryStore
+    from app.history.history_retention import HistoryRetention
+    from app.configuration.history_configuration import get_history_settings
+    from app.service.history_refresh_service import HistoryRefresher
+
+    history = HistoryStore(load_history_data())
+    history_retention = HistoryRetention.from_settings(history, get_history_settings())
+    history_refresher = HistoryRefresher.from_settings(history, get_history_settings())
+    reference_data.start()
+    history_retention.start()
+    history_refresher.start()
+
+    consumer = StreamConsumer(KafkaBrokerClient.from_settings(get_broker_connection_settings()), history)
+    signal.signal(signal.SIGTERM, lambda signum, frame: consumer.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: consumer.stop())
+
+    try:
+        consumer.run()
+    finally:
+        history_refresher.stop()
+        history_retention.stop()
+        reference_data.stop()
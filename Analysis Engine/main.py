@@ -1,24 +1,155 @@
 from fastapi import FastAPI
-from app.service.transaction_risk_analysis_service import calculate_transaction_risk_single_transaction
-from app.service.customer_risk_analysis_service import calculate_customer_risk_single_transaction
+from app.service.batch_risk_analysis_service import calculate_risk_batch
+from app.service.scoring_executor import ScoringExecutor, score_transaction, TRANSACTION, CUSTOMER, ALL
+from app.analysis.transaction_risk_analysis import TransactionRiskAnalysis
+from app.analysis.customer_risk_analysis import CustomerRiskAnalysis
+from app.service.analysis_settings_service import analysis_settings
 from app.service.configuration_service import get_all_configurations, update_configuration
 from app.dto.transaction_data import TransactionDataDTO as TransactionData
 from app.dto.configuration_data import SettingsRootDTO
-from app.service.data_processing_service import get_processed_data
-from fastapi import HTTPException
+from app.service.data_processing_service import load_history_data, preprocessing
+from app.history.history_store import HistoryStore
+from app.history.history_retention import HistoryRetention
+from app.history.history_compaction import memory_limit
+from app.history.shared_history import SharedHistory
+from app.configuration.history_configuration import get_history_settings
+from app.service.reference_data_service import reference_data
+from app.service.risk_profile_writer_service import risk_profile_writer
+from app.service.history_refresh_service import HistoryRefresher
+from app.service.startup_service import BackgroundStartup
+from app.database.db_init import create_tables
+from fastapi import HTTPException, Depends
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from typing import List
 import time
+import logging
 import pandas as pd
 
+history_settings = get_history_settings()
+shared_history = SharedHistory.from_settings(history_settings) if str(history_settings['history_shared_enabled']).lower() == 'true' else None
+
+history = None
+history_retention = None
+history_refresher = None
+scoring_executor = None
+
+
+def start_history_maintenance():
+    # with a shared history only the publishing worker refreshes and evicts, the others follow its generations
+    if shared_history is not None and shared_history.watermark is not None:
+        history_refresher.set_watermark(shared_history.watermark)
+    history_retention.start()
+    history_refresher.start()
+
+
+def start_scoring_executor():
+    global scoring_executor
+
+    executor = ScoringExecutor.from_settings(history_settings)
+    if executor is None:
+        return
+
+    if shared_history is None or not shared_history.is_leader:
+        # the workers attach to generations this process publishes and that hold every transaction it scored
+        logging.error("[Scoring Executor] Scoring workers need the shared history and a single server process, scoring in the server process")
+        return
+
+    executor.start()
+    scoring_executor = executor
+
+
+def initialize():
+    global history, history_retention, history_refresher
+
+    create_tables()
+    reference_data.start()
+    risk_profile_writer.start()
+
+    if history is None:
+        store = shared_history.open(load_history_data) if shared_history is not None else HistoryStore(load_history_data())
+        history_retention = HistoryRetention.from_settings(store, history_settings)
+        history_refresher = HistoryRefresher.from_settings(store, history_settings)
+        history = store
+
+    if shared_history is None or shared_history.is_leader:
+        start_history_maintenance()
+
+    if shared_history is not None:
+        shared_history.on_promoted = start_history_maintenance
+        shared_history.start(watermark_source=lambda: history_refresher.watermark)
+
+    if scoring_executor is None:
+        start_scoring_executor()
+
+
+startup = BackgroundStartup(initialize)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the server accepts connections right away, the history is loaded in the background
+    startup.start()
+    yield
+
+    startup.stop()
+    if scoring_executor is not None:
+        scoring_executor.stop()
+    if shared_history is not None:
+        shared_history.stop()
+    if history_refresher is not None:
+        history_refresher.stop()
+    if history_retention is not None:
+        history_retention.stop()
+    risk_profile_writer.stop()
+    reference_data.stop()
+
+
 app = FastAPI(
     title="AML Transaction Fusion Analysis Service",
-    description="Endpoint for receiving raw transaction data for monitoring."
+    description="Endpoint for receiving raw transaction data for monitoring.",
+    lifespan=lifespan
 )
 
-transactions = get_processed_data()
+
+def require_history() -> HistoryStore:
+    if not startup.ready:
+        raise HTTPException(status_code=503, detail=f"Transaction history is not loaded yet ({startup.state})", headers={"Retry-After": "30"})
+    return history
+
+
+def record_transaction(history, record):
+    # with a shared history the row is journaled as well, the other server processes read it on their next poll
+    if shared_history is not None:
+        shared_history.record(record)
+    else:
+        history.append(record)
+
+
+def score(kind, record, history):
+    # the analyses hold the GIL, worker processes score in parallel where threads would take turns
+    if scoring_executor is not None:
+        return scoring_executor.score(kind, record, fallback=lambda: score_transaction(kind, record, history.snapshot()))
+    return score_transaction(kind, record, history.snapshot())
+
+
+@app.get("/health/live")
+def liveness():
+    return {"status": "alive", "timestamp": time.time()}
+
+
+@app.get("/health/ready")
+def readiness():
+    content = {
+        "status": "ready" if startup.ready else "not ready",
+        "startup": startup.stats(),
+        "history_rows": len(history) if history is not None else 0,
+    }
+    return JSONResponse(status_code=200 if startup.ready else 503, content=content)
 
 
 @app.post("/risk/transaction")
-def ingest_transaction_and_generate_transaction_risk_report(transaction: TransactionData):
+def ingest_transaction_and_generate_transaction_risk_report(transaction: TransactionData, history: HistoryStore = Depends(require_history)):
    
     try:
         # Example of processing: print a subset of the data using the new uppercase attributes
@@ -28,7 +159,9 @@ def ingest_transaction_and_generate_transaction_risk_report(transaction: Transac
         print(f"Amount: {transaction.AMOUNTINBIRR} {transaction.CURRENCYTYPE}")
         print(f"Full Name: {transaction.ACCOWNERNAME}")
         
-        transaction_risk_report = calculate_transaction_risk_single_transaction(transaction.generate_transaction_series(transaction), transactions)
+        record = transaction.to_record()
+        transaction_risk_report = score(TRANSACTION, record, history)["transaction_risk_report"]
+        record_transaction(history, record)
         
        
         return {
@@ -46,7 +179,7 @@ def ingest_transaction_and_generate_transaction_risk_report(transaction: Transac
 
 
 @app.post("/risk/customer")
-def ingest_transaction_and_generate_customer_risk_report(transaction: TransactionData):
+def ingest_transaction_and_generate_customer_risk_report(transaction: TransactionData, history: HistoryStore = Depends(require_history)):
    
     try:
         # Example of processing: print a subset of the data using the new uppercase attributes
@@ -56,7 +189,9 @@ def ingest_transaction_and_generate_customer_risk_report(transaction: Transactio
         print(f"Amount: {transaction.AMOUNTINBIRR} {transaction.CURRENCYTYPE}")
         print(f"Full Name: {transaction.ACCOWNERNAME}")
         
-        customer_risk_report = calculate_customer_risk_single_transaction(transaction.generate_transaction_series(transaction), transactions)
+        record = transaction.to_record()
+        customer_risk_report = score(CUSTOMER, record, history)["customer_risk_report"]
+        record_transaction(history, record)
         
 
         return {
@@ -73,7 +208,7 @@ def ingest_transaction_and_generate_customer_risk_report(transaction: Transactio
 
 
 @app.post("/risk/all")
-def ingest_transaction_and_generate_transaction_and_customer_risk_report(transaction: TransactionData):
+def ingest_transaction_and_generate_transaction_and_customer_risk_report(transaction: TransactionData, history: HistoryStore = Depends(require_history)):
    
     try:
         # Example of processing: print a subset of the data using the new uppercase attributes
@@ -83,9 +218,10 @@ def ingest_transaction_and_generate_transaction_and_customer_risk_report(transac
         print(f"Amount: {transaction.AMOUNTINBIRR} {transaction.CURRENCYTYPE}")
         print(f"Full Name: {transaction.ACCOWNERNAME}")
         
-        transaction_series = transaction.generate_transaction_series(transaction)
-        transaction_risk_report = calculate_transaction_risk_single_transaction(transaction_series, transactions)
-        customer_risk_report = calculate_customer_risk_single_transaction(transaction_series, transactions)
+        record = transaction.to_record()
+        reports = score(ALL, record, history)
+        transaction_risk_report, customer_risk_report = reports["transaction_risk_report"], reports["customer_risk_report"]
+        record_transaction(history, record)
         
 
         return {
@@ -102,6 +238,54 @@ def ingest_transaction_and_generate_transaction_and_customer_risk_report(transac
         raise HTTPException(status_code=500, detail=f"Internal Server Error during ingestion: {e}")
 
 
+@app.post("/risk/batch")
+def ingest_transactions_and_generate_risk_reports(transactions: List[TransactionData], history: HistoryStore = Depends(require_history)):
+
+    try:
+        transactions_df = TransactionData.generate_transactions_dataframe(transactions)
+        transaction_risk_reports, customer_risk_reports = calculate_risk_batch(transactions_df, history.snapshot())
+        if not transactions_df.empty:
+            history.extend(preprocessing(transactions_df))
+
+        return {
+            "status": "success",
+            "message": "Transaction data received and Transaction and Customer related risk is assessed",
+            "count": len(transactions),
+            "timestamp": time.time(),
+            "risk_reports": [
+                {
+                    "transaction_id": transaction.TRANSACTIONID,
+                    "transaction_risk_report": transaction_risk_report,
+                    "customer_risk_report": customer_risk_report,
+                }
+                for transaction, transaction_risk_report, customer_risk_report in zip(transactions, transaction_risk_reports, customer_risk_reports)
+            ],
+        }
+
+    except Exception as e:
+        # Handle unexpected server errors
+        raise HTTPException(status_code=500, detail=f"Internal Server Error during ingestion: {e}")
+
+
+@app.get("/metrics")
+def get_metrics():
+    return {
+        "risk_profile_writer": risk_profile_writer.stats(),
+        "startup": startup.stats(),
+        "history_retention": history_retention.stats() if history_retention is not None else None,
+        "history_memory_limit": memory_limit.stats(),
+        "history_refresh": history_refresher.stats() if history_refresher is not None else None,
+        "shared_history": shared_history.stats() if shared_history is not None else None,
+        "scoring_executor": scoring_executor.stats() if scoring_executor is not None else None,
+        "reference_data": reference_data.stats(),
+        "analysis_settings": analysis_settings.stats(),
+        "analysis_features": {
+            "transaction": TransactionRiskAnalysis.FEATURES.describe(analysis_settings.transaction()),
+            "customer": CustomerRiskAnalysis.FEATURES.describe(analysis_settings.customer()),
+        },
+    }
+
+
 @app.get("/configuration")
 def get_all_configuration_for_the_analysis_engine():
     return get_all_configurations()
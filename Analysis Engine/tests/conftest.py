@@ -0,0 +1,32 @@
+import os
+import tempfile
+from tests.factories import TRANSACTION_COLUMNS, TABLE_NAME
+
+
+def pytest_sessionstart(session):
+    # every setting is read from kv_store.db in the working directory, the tests get their own pointing at sqlite files
+    workdir = tempfile.mkdtemp(prefix="analysis-engine-tests-")
+    os.chdir(workdir)
+
+    import app.configuration.analysis_configuration as ac
+    import app.configuration.connections_configuration as cc
+    import app.configuration.history_configuration as hc
+    import app.configuration.schema_configuration as sc
+
+    cc.set_database_connection_settings({"table_name": TABLE_NAME, "database_connection_string": f"sqlite:///{workdir}/central.db"})
+    cc.set_engine_database_connection_settings({"engine_connection_string": f"sqlite:///{workdir}/engine.db"})
+    cc.set_sanctionlist_watchlist_countries_settings({"sanctions_table_name": "sanction_list", "watchlist_table_name": "watch_list",
+                                                      "high_risk_countries_table_name": "countries"})
+    sc.set_schema_configuration_settings({column: column for column in TRANSACTION_COLUMNS})
+    hc.set_history_settings(hc.DEFAULT_HISTORY_SETTINGS)
+    ac.set_transaction_analysis_settings({key.replace(" ", "_"): "True" for key in ac.get_transaction_analysis_settings()})
+    ac.set_customer_analysis_settings({**{key.replace(" ", "_"): "True" for key in ac.get_customer_analysis_settings()},
+                                       "Fuzzy_Name_Match_Threshold": "0.85", "Peer_Group_Analysis_Threshold": "0.75",
+                                       "Anomaly_Detection_Sensitivity": "3", "Time_Gap_Threshold_Seconds": "900"})
+
+    from app.database.db_init import create_tables
+    create_tables()
+
+    # the service loads the reference data at startup, the scoring path never queries it
+    from app.service.reference_data_service import reference_data
+    reference_data.load()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+TABLE_NAME = "transactions"
+
+TRANSACTION_COLUMNS = [
+    "TRANSACTIONID", "REPORTNO", "REPORTDATE", "BRANCHID", "BRANCHNAME", "TRANSACTIONDATE", "TRANSACTIONTIME", "TRANSACTIONTYPE",
+    "CONDUCTINGMANNER", "CURRENCYTYPE", "AMOUNTINBIRR", "AMOUNTINCURRENCY", "FULL_NAME", "OTHERNAME", "SEX", "BIRTHDATE", "IDCARDNO",
+    "PASSPORTNO", "PASSPORTISSUEDBY", "RESIDENCECOUNTRY", "ORIGINCOUNTRY", "OCCUPATION", "COUNTRY", "REGION", "CITY", "SUBCITY",
+    "WOREDA", "HOUSENO", "POSTALCODE", "BUSINESSMOBILENO", "BUSSINESSTELNO", "BUSINESSFAXNO", "RESIDENCETELNO", "EMAILADDRESS",
+    "ACCOUNTNO", "ACCHOLDERBRANCH", "ACCOWNERNAME", "ACCOUNTTYPE", "OPENEDDATE", "BALANCEHELD", "BALANCEHELDDATE", "CLOSEDDATE",
+    "BENFULLNAME", "BENACCOUNTNO", "BENBRANCHID", "BENBRANCHNAME", "BENOWNERENTITY", "BENCOUNTRY", "BENREGION", "BENCITY", "BENZONE",
+    "BENWOREDA", "BENHOUSENO", "BENTELNO", "BENISENTITY",
+]
+
+NAMES = ["ABEBE KEBEDE", "ALMAZ TESFAYE", "JOHN DOE", "SARA HAILE", "DAWIT BEKELE"]
+
+
+def make_transactions(n: int = 500, accounts: int = 20, seed: int = 0, start: str = "2024-01-01", days: int = 20, prefix: str = "T") -> list:
+    """Transactions shaped like the /risk payload, with every TransactionDataDTO field set."""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days * 24 * 3600, n)), unit="s")
+    account_numbers = rng.integers(0, accounts, n)
+
+    transactions = []
+    for i, (timestamp, account) in enumerate(zip(timestamps, account_numbers)):
+        name = NAMES[account % len(NAMES)]
+        transactions.append({column: None for column in TRANSACTION_COLUMNS} | {
+            "TRANSACTIONID": f"{prefix}{i:06d}",
+            "BRANCHID": f"B{account % 3}",
+            "BRANCHNAME": f"BRANCH {account % 3}",
+            "TRANSACTIONDATE": timestamp.strftime("%Y-%m-%d"),
+            "TRANSACTIONTIME": timestamp.strftime("%H:%M:%S"),
+            "TRANSACTIONTYPE": str(rng.choice(["DEPOSIT", "TRANSFER", "WITHDRAWAL"])),
+            "CONDUCTINGMANNER": "CASH",
+            "AMOUNTINBIRR": float(rng.choice([100.0, 250.5, 1000.0, 33.3, 5000.0, 12345.67, 90000.0])),
+            "FULL_NAME": name,
+            "SEX": "M",
+            "BIRTHDATE": "1990-01-01",
+            "IDCARDNO": f"ID{account}",
+            "PASSPORTNO": f"P{account}" if account % 2 else None,
+            "OCCUPATION": f"OCCUPATION {account % 4}",
+            "COUNTRY": "ETHIOPIA",
+            "REGION": f"REGION {account % 2}",
+            "CITY": "ADDIS ABABA",
+            "HOUSENO": str(account),
+            "ACCOUNTNO": str(1000 + account),
+            "ACCHOLDERBRANCH": f"BRANCH {account % 3}",
+            "ACCOWNERNAME": name,
+            "ACCOUNTTYPE": "SAVINGS",
+            "OPENEDDATE": ["2020-01-01", "2021-05-05", "2023-12-01"][account % 3],
+            "BALANCEHELD": 1000.0,
+            "BALANCEHELDDATE": "2024-01-01",
+            "BENFULLNAME": NAMES[(account + 1) % len(NAMES)],
+            "BENACCOUNTNO": str(1000 + int(rng.integers(0, accounts))),
+            "BENCOUNTRY": "ETHIOPIA",
+            "BENREGION": str(rng.choice(["REGION 0", "REGION 1"])),
+            "BENCITY": "ADDIS ABABA",
+            "BENISENTITY": "N",
+        })
+    return transactions
+
+
+def history_frame(transactions: list) -> pd.DataFrame:
+    """The history columns the repository selects, preprocessed the way the service loads them."""
+    from app.repository.transaction_repository import selected_columns
+    from app.service.data_processing_service import preprocessing
+
+    return preprocessing(pd.DataFrame(transactions)[selected_columns].copy())
+
+
+def write_central_table(transactions: list):
+    """Replaces the central transaction table with the given transactions, every column stored as text."""
+    from app.database.database import get_central_db_engine
+
+    frame = pd.DataFrame(transactions, columns=TRANSACTION_COLUMNS)
+    frame.to_sql(TABLE_NAME, get_central_db_engine(), if_exists="replace", index=False)
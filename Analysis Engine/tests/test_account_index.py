@@ -0,0 +1,26 @@
+import pandas as pd
+from app.history.account_index import AccountIndex
+from tests.factories import make_transactions, history_frame
+
+
+def test_each_account_slice_is_the_filtered_history_in_time_order():
+    history = history_frame(make_transactions(500, seed=16, prefix="H"))
+    index = AccountIndex(history.sample(frac=1, random_state=0))
+
+    assert len(index) == history['ACCOUNTNO'].nunique()
+    for account_no in history['ACCOUNTNO'].unique():
+        expected = history[history['ACCOUNTNO'] == account_no].sort_values('TIMESTAMP', kind='stable')
+        account = index.get(account_no)
+
+        assert account_no in index
+        assert account['TIMESTAMP'].is_monotonic_increasing
+        pd.testing.assert_frame_equal(account.reset_index(drop=True)[['TIMESTAMP', 'AMOUNTINBIRR', 'BENACCOUNTNO']],
+                                      expected.reset_index(drop=True)[['TIMESTAMP', 'AMOUNTINBIRR', 'BENACCOUNTNO']])
+
+
+def test_an_unknown_account_has_an_empty_slice():
+    index = AccountIndex(history_frame(make_transactions(50, seed=16, prefix="H")))
+
+    assert "NO SUCH ACCOUNT" not in index
+    assert index.get("NO SUCH ACCOUNT").empty
+    assert list(index.get("NO SUCH ACCOUNT").columns) == list(index.df.columns)
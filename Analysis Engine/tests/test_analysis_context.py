@@ -0,0 +1,36 @@
+import pandas as pd
+from app.analysis.analysis_context import AnalysisContext
+from app.dto.transaction_data import TransactionDataDTO
+from app.history.history_store import HistoryStore
+from app.service.scoring_executor import score_transaction, TRANSACTION, CUSTOMER, ALL
+from tests.factories import make_transactions, history_frame
+
+
+def test_both_halves_of_a_request_share_one_account_slice(monkeypatch):
+    store = HistoryStore(history_frame(make_transactions(300, seed=27, prefix="H")))
+    record = TransactionDataDTO(**make_transactions(1, seed=28, start="2024-01-21", prefix="S")[0]).to_record()
+    snapshot = store.snapshot()
+
+    slices = []
+    account_history = snapshot.account_history
+    monkeypatch.setattr(snapshot, "account_history", lambda account_no: slices.append(account_no) or account_history(account_no))
+
+    reports = score_transaction(ALL, record, snapshot)
+
+    assert slices == [record['ACCOUNTNO']]
+    # sharing the context does not change what either half reports
+    assert reports["transaction_risk_report"] == score_transaction(TRANSACTION, record, store.snapshot())["transaction_risk_report"]
+    assert reports["customer_risk_report"] == score_transaction(CUSTOMER, record, store.snapshot())["customer_risk_report"]
+
+
+def test_the_context_caches_the_group_statistics_it_read():
+    store = HistoryStore(history_frame(make_transactions(300, seed=27, prefix="H")))
+    context = AnalysisContext(TransactionDataDTO(**make_transactions(1, seed=28, prefix="S")[0]).to_record(), store.snapshot())
+
+    population = context.amount_statistics()
+    branch = context.amount_statistics("BRANCHNAME")
+    context.group_statistics = None
+
+    assert context.amount_statistics() is population and context.amount_statistics("BRANCHNAME") is branch
+    amounts = pd.to_numeric(store.frame()['AMOUNTINBIRR'])
+    assert population[0] == amounts.count()
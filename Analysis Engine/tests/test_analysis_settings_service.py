@@ -0,0 +1,43 @@
+import pytest
+from app.configuration.analysis_configuration import get_customer_analysis_settings
+from app.service.analysis_settings_service import AnalysisSettingsCache
+from app.service.configuration_service import update_configuration
+
+
+def customer_update(**changes):
+    settings = {key.replace(" ", "_"): value for key, value in get_customer_analysis_settings().items()}
+    return {"Data_Analysis_Configurations": {"Customer_Related_Analysis": settings | changes}}
+
+
+@pytest.fixture
+def cache():
+    from app.configuration.analysis_configuration import register_change_listener
+    cache = AnalysisSettingsCache(ttl_seconds=3600)
+    register_change_listener(cache.invalidate)
+    return cache
+
+
+def test_settings_are_read_once_per_ttl(cache):
+    for _ in range(5):
+        cache.customer()
+        cache.fuzzy_threshold()
+    assert cache.loads == 1
+
+
+def test_a_configuration_update_is_seen_on_the_next_request(cache):
+    before = cache.fuzzy_threshold()
+    try:
+        update_configuration(customer_update(Fuzzy_Name_Match_Threshold="0.6"))
+        assert cache.fuzzy_threshold() == 0.6
+        assert cache.loads == 2
+    finally:
+        update_configuration(customer_update(Fuzzy_Name_Match_Threshold=str(before)))
+
+
+def test_an_invalid_threshold_falls_back_to_the_default(cache):
+    before = cache.fuzzy_threshold()
+    try:
+        update_configuration(customer_update(Fuzzy_Name_Match_Threshold="high"))
+        assert cache.fuzzy_threshold() == AnalysisSettingsCache.DEFAULT_FUZZY_THRESHOLD
+    finally:
+        update_configuration(customer_update(Fuzzy_Name_Match_Threshold=str(before)))
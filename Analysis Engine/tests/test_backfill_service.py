@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+import app.service.backfill_service as backfill_service
+import app.service.data_processing_service as data_processing_service
+from app.configuration.history_configuration import DEFAULT_HISTORY_SETTINGS
+from app.database.database import get_engine
+from app.model.transaction_risk_profile import TransactionRiskProfile
+from app.repository.transaction_risk_profile_repository import insert_transaction_risk_profiles_bulk
+from app.service.backfill_service import HistoryBackfill
+from tests.factories import make_transactions, write_central_table
+
+
+def stored_profiles():
+    with Session(get_engine()) as session:
+        return [tuple(row) for row in session.execute(select(TransactionRiskProfile.transaction_id, TransactionRiskProfile.overall_risk_score))]
+
+
+@pytest.fixture
+def transactions():
+    with Session(get_engine()) as session:
+        session.execute(delete(TransactionRiskProfile))
+        session.commit()
+
+    transactions = make_transactions(200, accounts=10, seed=10, start="2024-02-01", days=5, prefix="F")
+    write_central_table(transactions)
+    return transactions
+
+
+def test_an_interrupted_backfill_resumes_from_its_checkpoint(tmp_path, transactions, monkeypatch):
+    inserts = []
+
+    def insert_then_crash(risk_profiles):
+        # the third chunk is written but the process dies before its checkpoint
+        inserts.append(len(risk_profiles))
+        written = insert_transaction_risk_profiles_bulk(risk_profiles)
+        if len(inserts) == 3:
+            raise RuntimeError("killed")
+        return written
+
+    monkeypatch.setattr(backfill_service, "insert_transaction_risk_profiles_bulk", insert_then_crash)
+    checkpoint = str(tmp_path / "checkpoint.json")
+    with pytest.raises(RuntimeError):
+        HistoryBackfill(checkpoint, chunk_size=50, reindex_rows=60).run()
+
+    assert HistoryBackfill(checkpoint).load_checkpoint()["processed"] == 100
+    monkeypatch.setattr(backfill_service, "insert_transaction_risk_profiles_bulk", insert_transaction_risk_profiles_bulk)
+
+    resumed = HistoryBackfill(checkpoint, chunk_size=50, reindex_rows=60)
+    stats = resumed.run()
+
+    assert stats["processed"] == stats["scored"] == len(transactions)
+    assert stats["already_written"] == 50
+    assert stats["rows_in_history"] == len(transactions)
+
+    profiles = stored_profiles()
+    assert sorted(transaction_id for transaction_id, _ in profiles) == sorted(transaction["TRANSACTIONID"] for transaction in transactions)
+
+    # the resumed run rebuilt the history it skipped, it scores the rest exactly as an uninterrupted run does
+    with Session(get_engine()) as session:
+        session.execute(delete(TransactionRiskProfile))
+        session.commit()
+    HistoryBackfill(str(tmp_path / "fresh.json"), chunk_size=50, reindex_rows=60).run()
+    assert sorted(stored_profiles()) == sorted(profiles)
+
+
+def test_the_backfill_history_is_not_trimmed_by_the_memory_limit(tmp_path, transactions, monkeypatch):
+    monkeypatch.setattr(data_processing_service, "get_history_settings", lambda: DEFAULT_HISTORY_SETTINGS | {"history_memory_limit_mb": "0.01"})
+
+    stats = HistoryBackfill(str(tmp_path / "checkpoint.json"), chunk_size=50, reindex_rows=60).run()
+
+    assert stats["rows_in_history"] == len(transactions)
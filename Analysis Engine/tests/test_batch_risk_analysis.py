@@ -0,0 +1,85 @@
+import math
+import re
+import pandas as pd
+import pytest
+from app.analysis.analysis_context import AnalysisContext
+from app.analysis.batch_risk_analysis import BatchRiskAnalysis
+from app.analysis.customer_risk_analysis import CustomerRiskAnalysis
+from app.analysis.transaction_risk_analysis import TransactionRiskAnalysis
+from app.configuration.analysis_configuration import get_customer_analysis_settings, set_customer_analysis_settings
+from app.dto.transaction_data import TransactionDataDTO
+from app.history.history_store import HistoryStore
+from tests.factories import make_transactions, history_frame
+
+def assert_same(batch, single, path="report"):
+    if isinstance(single, dict):
+        assert batch.keys() == single.keys(), path
+        if "reason_codes" in single:
+            # the messages quote the computed values, the last digits may differ between the two computations
+            assert re.findall(r"(RC?_[A-Z_]+):", batch["reason_codes"]) == re.findall(r"(RC?_[A-Z_]+):", single["reason_codes"]), path
+            batch, single = ({key: value for key, value in report.items() if key != "reason_codes"} for report in (batch, single))
+        for key in single:
+            assert_same(batch[key], single[key], f"{path}.{key}")
+    elif isinstance(single, (list, tuple)):
+        assert len(batch) == len(single), path
+        for index, (b, s) in enumerate(zip(batch, single)):
+            assert_same(b, s, f"{path}[{index}]")
+    elif isinstance(single, float) and not isinstance(single, bool):
+        assert (math.isinf(single) and batch == single) or batch == pytest.approx(single, rel=1e-9, abs=1e-9), path
+    else:
+        assert batch == single, path
+
+
+def score_single(record, snapshot):
+    context = AnalysisContext(record, snapshot)
+    transaction = TransactionRiskAnalysis(snapshot.df, context.transaction, snapshot, context).generate_transaction_risk_report()
+    customer = CustomerRiskAnalysis(snapshot.df, context.transaction, snapshot, context).generate_customer_risk_report()
+    return transaction, customer
+
+
+@pytest.fixture
+def history():
+    return HistoryStore(history_frame(make_transactions(400, accounts=8, seed=6, prefix="H")))
+
+
+@pytest.fixture
+def batch():
+    # a few accounts, so most of the batch has earlier transactions of its account in the batch itself
+    return make_transactions(40, accounts=8, seed=7, start="2024-01-21", days=2, prefix="B")
+
+
+def test_batch_and_single_scoring_agree_on_a_single_transaction(history, batch):
+    snapshot = history.snapshot()
+    risk = BatchRiskAnalysis(pd.DataFrame(batch[:1]), snapshot)
+
+    transaction, customer = score_single(TransactionDataDTO(**batch[0]).to_record(), snapshot)
+
+    assert_same(risk.generate_transaction_risk_reports()[0], transaction)
+    assert_same(risk.generate_customer_risk_reports()[0], customer)
+
+
+def test_batch_scores_every_transaction_as_if_the_earlier_ones_were_appended(history, batch):
+    risk = BatchRiskAnalysis(pd.DataFrame(batch), history.snapshot())
+    transaction_reports = risk.generate_transaction_risk_reports()
+    customer_reports = risk.generate_customer_risk_reports()
+
+    for values, batch_transaction, batch_customer in zip(batch, transaction_reports, customer_reports):
+        record = TransactionDataDTO(**values).to_record()
+        transaction, customer = score_single(record, history.snapshot())
+        history.append(record)
+
+        assert_same(batch_transaction, transaction, values['TRANSACTIONID'])
+        assert_same(batch_customer, customer, values['TRANSACTIONID'])
+
+
+def test_disabled_features_carry_the_registry_defaults(history, batch):
+    settings = get_customer_analysis_settings()
+    set_customer_analysis_settings({key.replace(" ", "_"): value for key, value in settings.items()} | {"Time_Gap_Analysis": "False"})
+    try:
+        reports = BatchRiskAnalysis(pd.DataFrame(batch), history.snapshot()).generate_customer_risk_reports()
+    finally:
+        set_customer_analysis_settings({key.replace(" ", "_"): value for key, value in settings.items()})
+
+    default = CustomerRiskAnalysis.FEATURES.features["time_series_gap"].default_value()
+    assert all(report["time_series_gap"] == default for report in reports)
+    assert any(report["kyc_completeness_ratio"] != 1.0 for report in reports)
@@ -0,0 +1,39 @@
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+import app.service.batch_risk_analysis_service as batch_risk_analysis_service
+from app.database.database import get_engine
+from app.dto.transaction_data import TransactionDataDTO
+from app.history.history_store import HistoryStore
+from app.model.customer_risk_profile import CustomerRiskProfile
+from app.model.transaction_risk_profile import TransactionRiskProfile
+from app.service.batch_risk_analysis_service import calculate_risk_batch
+from tests.factories import make_transactions, history_frame
+
+
+def count(model):
+    with Session(get_engine()) as session:
+        return session.execute(select(func.count()).select_from(model)).scalar()
+
+
+def test_a_batch_is_written_in_one_bulk_insert(monkeypatch):
+    with Session(get_engine()) as session:
+        session.execute(delete(TransactionRiskProfile))
+        session.execute(delete(CustomerRiskProfile))
+        session.commit()
+
+    inserts = []
+    insert = batch_risk_analysis_service.insert_risk_profiles_bulk
+    monkeypatch.setattr(batch_risk_analysis_service, "insert_risk_profiles_bulk",
+                        lambda transaction_profiles, customer_profiles: inserts.append(len(transaction_profiles)) or insert(transaction_profiles, customer_profiles))
+
+    store = HistoryStore(history_frame(make_transactions(200, seed=14, prefix="H")))
+    transactions = TransactionDataDTO.generate_transactions_dataframe(
+        [TransactionDataDTO(**transaction) for transaction in make_transactions(30, seed=15, start="2024-01-21", days=1, prefix="B")])
+
+    calculate_risk_batch(transactions, store.snapshot())
+    calculate_risk_batch(transactions, store.snapshot())
+
+    assert inserts == [30, 30]
+    # the replayed request finds its profiles already written
+    assert count(TransactionRiskProfile) == 30
+    assert count(CustomerRiskProfile) == 30
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from app.history.beneficiary_index import BeneficiaryIndex, to_datetime64
+from app.history.history_store import HistoryStore
+from app.service.data_processing_service import preprocessing
+from tests.factories import make_transactions, history_frame
+
+
+def inflow(df, beneficiary, start_time, end_time):
+    rows = df[(df['BENACCOUNTNO'] == beneficiary) & (df['TIMESTAMP'] > start_time) & (df['TIMESTAMP'] <= end_time)]
+    return float(pd.to_numeric(rows['AMOUNTINBIRR'], errors='coerce').sum())
+
+
+def windows(df):
+    end_times = df['TIMESTAMP'].iloc[::40].tolist()
+    return [end_time - pd.Timedelta(hours=24) for end_time in end_times], end_times
+
+
+def test_inflows_match_a_filter_over_the_history():
+    history = history_frame(make_transactions(500, seed=18, prefix="H"))
+    history.loc[::25, 'AMOUNTINBIRR'] = np.nan
+    index = BeneficiaryIndex(history)
+    start_times, end_times = windows(history)
+    # the index searches datetime64 arrays, the snapshot converts the window bounds before calling it
+    starts, ends = to_datetime64(start_times), to_datetime64(end_times)
+
+    for beneficiary in history['BENACCOUNTNO'].unique():
+        expected = [inflow(history, beneficiary, start, end) for start, end in zip(start_times, end_times)]
+        assert np.allclose(index.amounts_between(beneficiary, starts, ends), expected)
+        assert np.isclose(index.amount_between(beneficiary, starts[3], ends[3]), expected[3])
+
+    assert index.amount_between("NO SUCH ACCOUNT", starts[0], ends[0]) == 0.0
+
+
+def test_snapshot_inflows_include_appended_transfers():
+    history = history_frame(make_transactions(300, seed=18, prefix="H"))
+    live = preprocessing(pd.DataFrame(make_transactions(80, seed=19, start="2024-01-18", days=5, prefix="L")))
+    store = HistoryStore(history, chunk_size=16)
+    store.extend(live)
+    snapshot = store.snapshot()
+
+    everything = pd.concat([history, live[history.columns]], ignore_index=True)
+    start_times, end_times = windows(everything.sort_values('TIMESTAMP'))
+    for beneficiary in everything['BENACCOUNTNO'].unique():
+        expected = [inflow(everything, beneficiary, start, end) for start, end in zip(start_times, end_times)]
+        assert np.allclose(snapshot.inbound_amounts(beneficiary, start_times, end_times), expected)
+        assert np.isclose(snapshot.inbound_amount(beneficiary, start_times[-1], end_times[-1]), expected[-1])
@@ -0,0 +1,22 @@
+import pandas as pd
+import app.service.data_processing_service as data_processing_service
+from app.configuration.history_configuration import DEFAULT_HISTORY_SETTINGS
+from tests.factories import make_transactions, write_central_table
+
+
+def load(monkeypatch, chunk_size):
+    monkeypatch.setattr(data_processing_service, "get_history_settings", lambda: DEFAULT_HISTORY_SETTINGS | {"history_load_chunk_size": str(chunk_size)})
+    return data_processing_service.get_processed_data()
+
+
+def test_a_chunked_load_equals_a_single_chunk_load(monkeypatch):
+    transactions = make_transactions(500, seed=25, prefix="C")
+    transactions[17]["AMOUNTINBIRR"] = None
+    write_central_table(transactions)
+
+    whole = load(monkeypatch, 100000)
+    chunked = load(monkeypatch, 37)
+
+    assert len(chunked) == len(whole) == 500
+    # a column is only made categorical when every chunk repeats its values, the dtypes may differ but not the values
+    pd.testing.assert_frame_equal(chunked.astype(object), whole.astype(object))
@@ -0,0 +1,43 @@
+import pandas as pd
+import app.service.data_processing_service as data_processing_service
+from app.configuration.history_configuration import DEFAULT_HISTORY_SETTINGS
+from app.history.columnar_snapshot import ColumnarSnapshot
+from app.history.history_compaction import compact_history
+from tests.factories import make_transactions, history_frame, write_central_table
+
+
+def test_a_saved_snapshot_loads_back_the_same_frame(tmp_path):
+    history = compact_history(history_frame(make_transactions(300, seed=23, prefix="H")))
+    history.loc[::20, 'BENFULLNAME'] = None
+    snapshot = ColumnarSnapshot(str(tmp_path / "snapshot"))
+
+    meta = snapshot.save(history)
+    loaded, watermark = snapshot.load()
+
+    assert watermark == meta["watermark"] == ColumnarSnapshot.watermark_of(history)
+    # the loaded columns sit on memory mapped files, a copy compares them as plain arrays
+    pd.testing.assert_frame_equal(loaded.copy(), history)
+    # a snapshot missing a requested column is ignored
+    assert snapshot.load(columns=list(history.columns) + ["NOT A COLUMN"]) == (None, None)
+
+
+def test_the_history_is_the_snapshot_plus_the_rows_after_its_watermark(tmp_path, monkeypatch):
+    settings = DEFAULT_HISTORY_SETTINGS | {"history_snapshot_path": str(tmp_path / "snapshot")}
+    monkeypatch.setattr(data_processing_service, "get_history_settings", lambda: settings)
+    transactions = make_transactions(300, seed=24, prefix="C")
+
+    write_central_table(transactions[:200])
+    first = data_processing_service.load_history_data()
+    assert len(first) == 200
+
+    write_central_table(transactions)
+    fetched = []
+    get_after = data_processing_service.get_processed_data_after
+    monkeypatch.setattr(data_processing_service, "get_processed_data_after", lambda watermark: fetched.append(len(get_after(watermark))) or get_after(watermark))
+    second = data_processing_service.load_history_data()
+
+    assert fetched == [100]
+    full = data_processing_service.compact_processed_data(data_processing_service.get_processed_data(), settings)
+    columns = [column for column in full.columns if column != 'ACCOUNT_AGE_DAYS']
+    pd.testing.assert_frame_equal(second[columns].astype(object), full[columns].astype(object))
+    assert ColumnarSnapshot(settings["history_snapshot_path"]).read_meta()["rows"] == 300
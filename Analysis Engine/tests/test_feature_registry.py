@@ -0,0 +1,92 @@
+import pytest
+from app.analysis.feature_registry import FeatureRegistry
+
+
+class Analysis:
+    def __init__(self):
+        self.calls = []
+
+    def _history(self):
+        self.calls.append("history")
+
+    def _windows(self):
+        self.calls.append("windows")
+
+    def window_sum(self):
+        return 10.0
+
+    def branch_z_score(self):
+        return 1.5
+
+
+@pytest.fixture
+def registry():
+    return (
+        FeatureRegistry("Test Analysis")
+        .input("history", "_history")
+        .input("windows", "_windows", requires=("history",))
+        .feature("WindowSum", "window_sum", "Amount Analysis", ("windows",), cost=2, default=0.0)
+        .feature("ZScoreBranch", "branch_z_score", "Branch Analysis", cost=1, default={"score": 0})
+    )
+
+
+def test_inputs_are_prepared_in_dependency_order_for_enabled_features_only(registry):
+    analysis = Analysis()
+    assert registry.run(analysis, {"Amount Analysis": "True", "Branch Analysis": "True"}) == {"WindowSum": 10.0, "ZScoreBranch": 1.5}
+    assert analysis.calls == ["history", "windows"]
+
+    analysis = Analysis()
+    assert registry.run(analysis, {"Amount Analysis": "off"}) == {"WindowSum": 0.0, "ZScoreBranch": 1.5}
+    assert analysis.calls == []
+
+
+@pytest.mark.parametrize("value, enabled", [(None, True), ("", True), ("True", True), ("False", False), (" no ", False), ("0", False)])
+def test_only_an_explicit_false_disables_a_toggle(value, enabled):
+    assert FeatureRegistry.is_enabled({"Toggle": value}, "Toggle") is enabled
+
+
+def test_complete_fills_disabled_and_missing_features_with_fresh_defaults(registry):
+    report = registry.complete({"WindowSum": 3.0, "ZScoreBranch": 2.0}, {"Branch Analysis": "False"})
+    assert report == {"WindowSum": 3.0, "ZScoreBranch": {"score": 0}}
+
+    report["ZScoreBranch"]["score"] = 100
+    assert registry.complete({})["ZScoreBranch"] == {"score": 0}
+
+
+def test_features_must_read_declared_inputs_without_cycles():
+    with pytest.raises(ValueError):
+        FeatureRegistry("Test Analysis").feature("Orphan", "orphan", inputs=("missing",))
+
+    registry = FeatureRegistry("Test Analysis").input("a", "_a", requires=("b",)).input("b", "_b", requires=("a",)).feature("Loop", "loop", inputs=("a",))
+    with pytest.raises(ValueError):
+        registry.plan()
+
+
+def test_steps_run_in_topological_order_with_cost_as_tie_breaker():
+    registry = (
+        FeatureRegistry("Test Analysis")
+        .input("slice", "_slice", requires=("history",), cost=2)
+        .input("history", "_history")
+        .feature("Scan", "scan", inputs=("slice",), cost=2)
+        .feature("Lookup", "lookup", cost=1)
+        .feature("Fuzzy", "fuzzy", cost=3)
+    )
+    assert registry.plan() == [("input", "history"), ("feature", "Lookup"), ("input", "slice"), ("feature", "Scan"), ("feature", "Fuzzy")]
+
+
+def test_a_feature_gated_by_several_toggles_needs_all_of_them():
+    registry = FeatureRegistry("Test Analysis").feature("Peer", "peer", ("Peer Group Analysis", "Anomaly Detection"))
+    assert registry.enabled_keys({"Peer Group Analysis": "True", "Anomaly Detection": "True"}) == {"Peer"}
+    assert registry.enabled_keys({"Peer Group Analysis": "True", "Anomaly Detection": "False"}) == set()
+
+
+def test_every_analysis_switch_gates_a_feature():
+    from app.analysis.customer_risk_analysis import CustomerRiskAnalysis
+    from app.analysis.transaction_risk_analysis import TransactionRiskAnalysis
+    from app.configuration.analysis_configuration import get_customer_analysis_settings, get_transaction_analysis_settings
+
+    for registry, settings in ((CustomerRiskAnalysis.FEATURES, get_customer_analysis_settings()),
+                               (TransactionRiskAnalysis.FEATURES, get_transaction_analysis_settings())):
+        switches = {key for key in settings if "Threshold" not in key and "Sensitivity" not in key}
+        assert registry.toggles() == switches
+        assert all(feature.toggle is not None for feature in registry.features.values())
@@ -0,0 +1,38 @@
+import pytest
+from app.analysis.fuzzy_name_screening import FuzzyNameScreener, levenshtein_similarity
+from app.analysis.screening_index import ScreeningIndex
+from app.analysis.customer_risk_analysis import CustomerRiskAnalysis
+from app.service.analysis_settings_service import analysis_settings
+
+
+@pytest.fixture
+def screening():
+    return ScreeningIndex(sanction_names=["JOHN DOE", "ALMAZ TESFAYE"], watchlist_names=["SARA HAILE"])
+
+
+def test_a_similarity_equal_to_the_threshold_is_a_match():
+    screener = FuzzyNameScreener(["DOE JOHN"])
+
+    # one substitution in eight characters
+    assert levenshtein_similarity("DOE JOHX", "DOE JOHN") == 0.875
+    assert screener.match("DOE JOHX", 0.875) == ("DOE JOHN", 0.875)
+    assert screener.match("DOE JOHX", 0.876) is None
+
+
+def test_the_length_bound_does_not_skip_a_candidate_on_the_threshold():
+    screener = FuzzyNameScreener(["DOE JOHN"])
+    threshold = levenshtein_similarity("DOE JOHNS", "DOE JOHN")
+
+    assert screener.match("DOE JOHNS", threshold) == ("DOE JOHN", threshold)
+
+
+def test_the_configured_threshold_decides_the_fuzzy_hit(screening, monkeypatch):
+    analysis = CustomerRiskAnalysis.__new__(CustomerRiskAnalysis)
+
+    monkeypatch.setattr(analysis_settings, "fuzzy_threshold", lambda: 0.875)
+    analysis.fuzzy_threshold = analysis._fuzzy_threshold()
+    assert analysis._fuzzy_hit(False, screening.closest_sanction, "John Dox") == (True, 0.875)
+
+    monkeypatch.setattr(analysis_settings, "fuzzy_threshold", lambda: 0.9)
+    analysis.fuzzy_threshold = analysis._fuzzy_threshold()
+    assert analysis._fuzzy_hit(False, screening.closest_sanction, "John Dox") == (False, 0.0)
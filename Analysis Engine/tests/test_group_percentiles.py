@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from app.history.group_percentiles import GroupPercentiles
+from tests.factories import make_transactions, history_frame
+
+
+def brute_force(df, dimension, value, amount):
+    group = pd.to_numeric(df.loc[df[dimension] == value, "AMOUNTINBIRR"], errors="coerce")
+    return (group < amount).sum() / len(group) * 100
+
+
+def test_the_percentiles_match_a_scan_of_the_group_as_records_arrive():
+    transactions = make_transactions(400, seed=6, prefix="G")
+    history = history_frame(transactions[:300])
+    history.loc[::25, "AMOUNTINBIRR"] = np.nan
+    percentiles = GroupPercentiles(history, merge_threshold=16)
+
+    live = history_frame(transactions[300:])
+    for record in live.to_dict("records"):
+        percentiles.update(record)
+        history = pd.concat([history, pd.DataFrame([record])], ignore_index=True)
+
+    for dimension in GroupPercentiles.DIMENSIONS:
+        for value in history[dimension].unique():
+            for amount in [0.0, 33.3, 250.5, 1000.0, 5000.0, 1e6]:
+                assert np.isclose(percentiles.percentile(dimension, value, amount), brute_force(history, dimension, value, amount))
+
+            amounts = np.array([np.nan, 100.0, 12345.67])
+            below, total = percentiles.ranks(dimension, value, amounts)
+            assert total == (history[dimension] == value).sum()
+            assert list(percentiles.percentiles(dimension, value, amounts)) == [0.0] + [below[i] / total * 100 for i in (1, 2)]
+
+
+def test_an_unknown_group_has_no_percentile():
+    percentiles = GroupPercentiles(history_frame(make_transactions(50, seed=6, prefix="G")))
+
+    assert percentiles.percentile("BRANCHNAME", "NOWHERE", 100.0) is None
+    assert percentiles.percentiles("BRANCHNAME", None, [100.0]) is None
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+from app.history.group_statistics import GroupStatistics
+from tests.factories import make_transactions, history_frame
+
+
+def assert_matches_groupby(statistics, history):
+    amounts = pd.to_numeric(history['AMOUNTINBIRR'], errors='coerce')
+    count, mean, std = statistics.get(GroupStatistics.POPULATION)
+    assert (count, mean, std) == (amounts.count(), pytest.approx(amounts.mean()), pytest.approx(amounts.std()))
+
+    for dimension in GroupStatistics.DIMENSIONS:
+        grouped = amounts.groupby(history[dimension], observed=True).agg(["count", "mean", "std"])
+        for value, row in grouped.iterrows():
+            count, mean, std = statistics.get(dimension, value)
+            assert count == row["count"]
+            assert mean == pytest.approx(row["mean"])
+            assert std == pytest.approx(row["std"], nan_ok=True)
+
+
+def test_built_and_updated_statistics_match_a_groupby():
+    transactions = make_transactions(500, seed=17, prefix="H")
+    history = history_frame(transactions[:400])
+    history.loc[::30, 'AMOUNTINBIRR'] = float('nan')
+    statistics = GroupStatistics(history)
+    assert_matches_groupby(statistics, history)
+
+    live = history_frame(transactions[400:])
+    for record in live.to_dict('records'):
+        statistics.update(record)
+    assert_matches_groupby(statistics, pd.concat([history, live], ignore_index=True))
+
+
+def test_a_missing_group_value_has_no_statistics():
+    statistics = GroupStatistics(history_frame(make_transactions(50, seed=17, prefix="H")))
+
+    assert statistics.get("BRANCHNAME", "NOWHERE") is None
+    assert statistics.get("BRANCHNAME", float('nan')) is None
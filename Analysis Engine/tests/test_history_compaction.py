@@ -0,0 +1,30 @@
+from app.configuration.history_configuration import DEFAULT_HISTORY_SETTINGS
+from app.history.history_compaction import memory_limit
+from app.service.data_processing_service import compact_processed_data
+from tests.factories import make_transactions, history_frame
+
+LIMITED = DEFAULT_HISTORY_SETTINGS | {"history_memory_limit_mb": "0.05"}
+
+
+def test_the_memory_limit_reports_the_transactions_it_dropped():
+    history = history_frame(make_transactions(1000, seed=11, prefix="M"))
+    dropped = memory_limit.dropped
+
+    trimmed = compact_processed_data(history.copy(), LIMITED)
+
+    assert len(trimmed) < len(history)
+    assert memory_limit.dropped - dropped == len(history) - len(trimmed)
+    assert memory_limit.stats()["last_dropped"] == len(history) - len(trimmed)
+    assert memory_limit.stats()["rows"] == len(trimmed)
+    # the oldest transactions go first
+    assert trimmed["TIMESTAMP"].min() > history["TIMESTAMP"].min()
+
+
+def test_the_memory_limit_can_be_skipped():
+    history = history_frame(make_transactions(1000, seed=11, prefix="M"))
+    dropped = memory_limit.dropped
+
+    compacted = compact_processed_data(history.copy(), LIMITED, enforce_limit=False)
+
+    assert len(compacted) == len(history)
+    assert memory_limit.dropped == dropped
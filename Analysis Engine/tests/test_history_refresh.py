@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from app.history.account_index import AccountIndex
+from app.history.beneficiary_index import BeneficiaryIndex
+from app.history.history_store import HistoryStore
+from app.service.data_processing_service import preprocessing
+from app.service.history_refresh_service import HistoryRefresher
+from tests.factories import make_transactions, history_frame, write_central_table
+
+
+@pytest.fixture
+def transactions():
+    # a dense day, most rows share the watermark's date with an earlier or later time
+    transactions = make_transactions(300, seed=5, start="2024-01-01", days=1, prefix="C")
+    write_central_table(transactions)
+    return transactions
+
+
+def test_refresh_fetches_only_rows_after_the_watermark_time(transactions):
+    store = HistoryStore(history_frame(transactions[:200]))
+    refresher = HistoryRefresher(store)
+
+    assert refresher.run_once() == 100
+    assert refresher.duplicates == 0
+    assert len(store) == 300
+    assert refresher.run_once() == 0
+
+
+def test_refresh_merges_rows_committed_late_or_within_the_watermark_second(transactions):
+    write_central_table(transactions[:200])
+    store = HistoryStore(history_frame(transactions[:200]))
+    refresher = HistoryRefresher(store)
+    assert refresher.run_once() == 0
+    watermark = refresher.watermark
+
+    # committed after the last refresh, one in the watermark second and one a minute before it
+    last = transactions[199]
+    same_second = last | {"TRANSACTIONID": "LATE1"}
+    minute_before = pd.Timestamp(f"{last['TRANSACTIONDATE']} {last['TRANSACTIONTIME']}") - pd.Timedelta(minutes=1)
+    earlier = transactions[150] | {"TRANSACTIONID": "LATE2", "TRANSACTIONDATE": minute_before.strftime("%Y-%m-%d"),
+                                   "TRANSACTIONTIME": minute_before.strftime("%H:%M:%S")}
+    write_central_table(transactions[:200] + [same_second, earlier])
+
+    assert refresher.run_once() == 2
+    assert refresher.watermark == watermark
+    assert len(store) == 202
+    assert refresher.run_once() == 0
+
+
+def test_a_reindexed_frame_holding_scored_rows_does_not_move_the_watermark(transactions):
+    store = HistoryStore(history_frame(transactions[:100]))
+    refresher = HistoryRefresher(store)
+
+    # rows scored over HTTP before the refresher saw them, then folded into the base frame by a reindex
+    scored = preprocessing(pd.DataFrame(transactions[250:260]))
+    store.extend(scored)
+    snapshot, aggregates = store.capture()
+    account_index = AccountIndex(store.frame(snapshot))
+    store.swap(account_index, BeneficiaryIndex(account_index.df), aggregates, carry_from=snapshot.appended)
+
+    assert refresher.run_once() == 190
+    assert refresher.duplicates == 10
+    assert len(store) == 300
+    assert store.group_statistics.get("POPULATION")[0] == 300
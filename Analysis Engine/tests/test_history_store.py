@@ -0,0 +1,100 @@
+import pandas as pd
+import pytest
+from app.history.account_index import AccountIndex
+from app.history.beneficiary_index import BeneficiaryIndex
+from app.history.history_store import HistoryStore
+from app.service.data_processing_service import preprocessing
+from tests.factories import make_transactions, history_frame
+
+CUTOFF = pd.Timestamp("2024-01-11", tz="UTC")
+
+
+@pytest.fixture
+def base():
+    return history_frame(make_transactions(400, seed=3, prefix="H"))
+
+
+@pytest.fixture
+def live():
+    # live transactions keep their id, the history columns do not
+    return preprocessing(pd.DataFrame(make_transactions(60, seed=4, start="2024-01-09", days=4, prefix="L")))
+
+
+def by_account(df, account_no):
+    rows = df[df['ACCOUNTNO'] == account_no].sort_values(['TIMESTAMP', 'AMOUNTINBIRR'], kind='stable')
+    return list(zip(rows['TIMESTAMP'], rows['AMOUNTINBIRR'].astype(float)))
+
+
+def test_eviction_drops_raw_rows_and_keeps_the_aggregates(base, live):
+    store = HistoryStore(base, chunk_size=16)
+    assert store.extend(live) == len(live)
+    before = store.snapshot()
+    aggregates = store._aggregates()
+
+    evicted = store.evict_before(CUTOFF)
+
+    everything = pd.concat([base, live[base.columns]], ignore_index=True)
+    retained = everything[everything['TIMESTAMP'] >= CUTOFF]
+    assert evicted == len(everything) - len(retained)
+    assert len(store) == len(retained)
+
+    snapshot = store.snapshot()
+    for account_no in everything['ACCOUNTNO'].unique():
+        assert by_account(snapshot.account_history(account_no), account_no) == by_account(retained, account_no)
+        # a snapshot taken before the eviction still reads the rows it was taken over
+        assert by_account(before.account_history(account_no), account_no) == by_account(everything, account_no)
+
+    # evicted transactions keep counting in the peer, percentile and identity aggregates
+    assert store._aggregates()["group_statistics"] == aggregates["group_statistics"]
+    assert store._aggregates()["value_counts"] == aggregates["value_counts"]
+    for key, (values, pending, missing) in aggregates["group_percentiles"].items():
+        kept_values, kept_pending, kept_missing = store._aggregates()["group_percentiles"][key]
+        assert list(kept_values) == list(values) and kept_pending == pending and kept_missing == missing
+
+    count, mean, _ = store.group_statistics.get("POPULATION")
+    assert count == len(everything)
+    assert mean == pytest.approx(everything['AMOUNTINBIRR'].mean())
+    assert store.value_counts.count("FULL_NAME", "JOHN DOE") == (everything['FULL_NAME'] == "JOHN DOE").sum()
+
+    # evicted transaction ids may arrive again, retained ones are still duplicates
+    assert not store.append(live[live['TIMESTAMP'] >= CUTOFF].iloc[0].to_dict())
+    assert store.append(live[live['TIMESTAMP'] < CUTOFF].iloc[0].to_dict())
+
+
+def test_snapshot_keeps_its_columns_across_a_swap(base, live):
+    store = HistoryStore(base, chunk_size=16)
+    store.extend(live.iloc[:5])
+    before = store.snapshot()
+
+    narrow = base.drop(columns=['BENFULLNAME'])
+    account_index = AccountIndex(narrow)
+    store.swap(account_index, BeneficiaryIndex(account_index.df), store._aggregates())
+    store.extend(live.iloc[5:])
+
+    account_no = live.iloc[0]['ACCOUNTNO']
+    # the rows appended before the swap were written with every column and still read back with them
+    assert before.account_history(account_no)['BENFULLNAME'].notna().all()
+    assert 'BENFULLNAME' not in store.snapshot().account_history(account_no).columns
+    assert len(before.account_history(account_no)) == len(by_account(pd.concat([base, live.iloc[:5][base.columns]]), account_no))
+
+
+def test_snapshot_aggregates_do_not_move_with_later_appends(base, live):
+    store = HistoryStore(base, chunk_size=16)
+    store.extend(live.iloc[:10])
+    snapshot = store.snapshot()
+    population = snapshot.group_statistics.get("POPULATION")
+    deposit = snapshot.group_percentiles.percentile("TRANSACTIONTYPE", "DEPOSIT", 1000.0)
+    john = snapshot.value_counts.count("FULL_NAME", "JOHN DOE")
+
+    store.extend(live.iloc[10:])
+    store.value_counts.compact()
+    store.extend(live.iloc[:10].assign(TRANSACTIONID=lambda df: df['TRANSACTIONID'] + "R"))
+
+    assert snapshot.group_statistics.get("POPULATION") == population
+    assert snapshot.group_percentiles.percentile("TRANSACTIONTYPE", "DEPOSIT", 1000.0) == deposit
+    assert snapshot.value_counts.count("FULL_NAME", "JOHN DOE") == john
+
+    everything = pd.concat([base, live[base.columns], live.iloc[:10][base.columns]], ignore_index=True)
+    assert store.group_statistics.get("POPULATION")[0] == len(everything)
+    assert store.value_counts.count("FULL_NAME", "JOHN DOE") == (everything['FULL_NAME'] == "JOHN DOE").sum()
+    assert store.snapshot().value_counts.count("FULL_NAME", "JOHN DOE") == (everything['FULL_NAME'] == "JOHN DOE").sum()
@@ -0,0 +1,39 @@
+import pandas as pd
+from app.analysis.analysis_context import AnalysisContext
+from app.analysis.customer_risk_analysis import CustomerRiskAnalysis
+from app.dto.transaction_data import TransactionDataDTO
+from app.history.history_store import HistoryStore
+from app.service.data_processing_service import preprocessing
+from tests.factories import make_transactions, history_frame
+
+
+def kyc(record, snapshot):
+    context = AnalysisContext(record, snapshot)
+    return CustomerRiskAnalysis(snapshot.df, context.transaction, snapshot, context).kyc_integrity_uniqueness_check()
+
+
+def test_identity_matches_count_the_loaded_and_appended_history():
+    history = history_frame(make_transactions(300, seed=20, prefix="H"))
+    live = preprocessing(pd.DataFrame(make_transactions(40, seed=21, start="2024-01-21", prefix="L")))
+    store = HistoryStore(history)
+    store.extend(live)
+    everything = pd.concat([history, live[history.columns]], ignore_index=True)
+
+    for transaction in make_transactions(10, seed=22, start="2024-01-25", prefix="S"):
+        report = kyc(TransactionDataDTO(**transaction).to_record(), store.snapshot())
+
+        passport = transaction["PASSPORTNO"]
+        assert report == {
+            "passport_matches": int((everything["PASSPORTNO"] == passport).sum()) if passport else 0,
+            "idcard_matches": int((everything["IDCARDNO"] == transaction["IDCARDNO"]).sum()),
+            "fullname_matches": int((everything["FULL_NAME"] == transaction["FULL_NAME"]).sum()),
+        }
+
+
+def test_blank_identity_values_match_nothing():
+    store = HistoryStore(history_frame(make_transactions(100, seed=20, prefix="H")))
+    transaction = make_transactions(1, seed=22, prefix="S")[0] | {"PASSPORTNO": " ", "IDCARDNO": None}
+
+    report = kyc(TransactionDataDTO(**transaction).to_record(), store.snapshot())
+
+    assert report["passport_matches"] == 0 and report["idcard_matches"] == 0
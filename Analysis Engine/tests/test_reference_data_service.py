@@ -0,0 +1,81 @@
+import time
+import pandas as pd
+import pytest
+import app.service.reference_data_service as reference_data_service
+from app.service.reference_data_service import ReferenceDataCache, ReferenceDataUnavailable
+
+
+class Lists:
+    def __init__(self):
+        self.loads = 0
+        self.failing = False
+
+    def sanctions(self, pandas_df=True):
+        self.loads += 1
+        if self.failing:
+            raise RuntimeError("database unavailable")
+        return pd.DataFrame({"FirstName": ["JOHN"], "LastName": [f"DOE{self.loads}"]})
+
+    def watchlist(self, pandas_df=True):
+        return pd.DataFrame({"FirstName": [], "LastName": []})
+
+    def countries(self, pandas_df=True):
+        return pd.DataFrame({"name": ["NOWHERE"]})
+
+
+@pytest.fixture
+def lists(monkeypatch):
+    lists = Lists()
+    monkeypatch.setattr(reference_data_service, "get_all_sanction_list_entries", lists.sanctions)
+    monkeypatch.setattr(reference_data_service, "get_all_watch_list_entries", lists.watchlist)
+    monkeypatch.setattr(reference_data_service, "get_all_countries", lists.countries)
+    return lists
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_a_cold_cache_does_not_query_the_database(lists):
+    cache = ReferenceDataCache()
+
+    with pytest.raises(ReferenceDataUnavailable):
+        cache.get()
+    assert lists.loads == 0
+
+
+def test_reads_are_served_from_memory_until_invalidated(lists):
+    cache = ReferenceDataCache(ttl_seconds=3600)
+    cache.start()
+    try:
+        first = cache.get()
+        assert cache.get() is first and lists.loads == 1
+
+        cache.invalidate("sanction_list")
+        assert wait_for(lambda: cache.get().version == first.version + 1)
+        assert cache.get().screening.is_sanctioned("JOHN DOE2")
+    finally:
+        cache.stop()
+
+
+def test_the_ttl_reloads_and_a_failed_reload_keeps_the_last_copy(lists):
+    cache = ReferenceDataCache(ttl_seconds=0.05)
+    cache.start()
+    try:
+        assert wait_for(lambda: cache.get().version >= 2)
+
+        lists.failing = True
+        served = cache.get()
+        assert wait_for(lambda: lists.loads >= served.version + 2)
+        assert cache.get() is served
+    finally:
+        cache.stop()
+
+
+def test_the_ttl_is_read_from_the_configuration():
+    assert ReferenceDataCache.from_settings({"reference_data_ttl_seconds": "45"}).ttl_seconds == 45
+    assert ReferenceDataCache.from_settings({"reference_data_ttl_seconds": ""}).ttl_seconds == 300
+    assert ReferenceDataCache.from_settings({"reference_data_ttl_seconds": "soon"}).ttl_seconds == 300
@@ -0,0 +1,61 @@
+import queue
+import time
+import pytest
+from app.service.scoring_executor import ScoringExecutor, TRANSACTION, APPEND, EXPIRED, _is_expired
+
+RECORD = {"ACCOUNTNO": "1001", "TRANSACTIONID": "T1"}
+
+
+@pytest.fixture
+def executor():
+    # the queues the worker processes would read, without starting any
+    executor = ScoringExecutor("unused", workers=1, timeout_seconds=0.1, grace_seconds=0.05)
+    executor._tasks = [queue.Queue()]
+    executor._cancels = [queue.Queue()]
+    return executor
+
+
+def test_a_worker_still_attaching_is_bypassed_and_receives_the_transaction(executor):
+    assert executor.score(TRANSACTION, RECORD, fallback=lambda: {"scored": "server"}) == {"scored": "server"}
+
+    assert executor._tasks[0].get_nowait() == (None, APPEND, RECORD, None)
+    assert executor.fallbacks == 1
+    assert not executor._pending
+
+
+def test_a_timed_out_request_cancels_its_task(executor):
+    executor.ready.add(0)
+
+    with pytest.raises(TimeoutError):
+        executor.score(TRANSACTION, RECORD, fallback=lambda: pytest.fail("a ready worker scores the transaction"))
+
+    task_id, _, _, deadline = executor._tasks[0].get_nowait()
+    assert executor._cancels[0].get_nowait() == task_id
+    assert not executor._pending
+    assert executor.expired == 1
+
+    # the result of the cancelled task is ignored instead of resolving a later request
+    executor._resolve(task_id, 0, {"transaction_risk_report": {}}, None)
+    assert executor.late == 1
+
+
+def test_a_task_dropped_by_the_worker_fails_its_request_once(executor):
+    executor.ready.add(0)
+    task_id, future = executor.submit(TRANSACTION, RECORD)
+
+    executor._resolve(task_id, 0, None, EXPIRED)
+
+    with pytest.raises(TimeoutError):
+        future.result(timeout=0)
+    assert executor.expired == 1
+    assert executor.failed == 0
+
+
+def test_the_worker_drops_cancelled_and_expired_tasks():
+    cancels, cancelled = queue.Queue(), set()
+    cancels.put(7)
+
+    assert _is_expired(7, time.time() + 60, cancels, cancelled)
+    assert not _is_expired(8, time.time() + 60, cancels, cancelled)
+    assert _is_expired(9, time.time() - 1, cancels, cancelled)
+    assert not cancelled
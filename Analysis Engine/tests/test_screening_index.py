@@ -0,0 +1,30 @@
+import pandas as pd
+from app.analysis.screening_index import ScreeningIndex
+
+SANCTIONS = pd.DataFrame({"FirstName": ["John", "ALMAZ", "abebe", None], "LastName": ["Doe", "Tesfaye", "kebede", "NOBODY"]})
+WATCHLIST = pd.DataFrame({"FirstName": ["Sara"], "LastName": ["Haile"]})
+NAMES = ["JOHN DOE", "john doe", "ALMAZ TESFAYE", "ABEBE KEBEDE", "SARA HAILE", "DAWIT BEKELE", "JOHN", "", None]
+
+
+def old_loop(entries, name):
+    # the per-call scan the index replaced
+    full_names = (entries["FirstName"].astype(str) + " " + entries["LastName"].astype(str)).str.upper().values
+    return (name or "").upper() in full_names
+
+
+def test_the_index_agrees_with_the_old_scan():
+    screening = ScreeningIndex.from_lists(SANCTIONS, WATCHLIST, pep_list=["Dawit Bekele"])
+
+    for name in NAMES:
+        assert screening.is_sanctioned(name) == old_loop(SANCTIONS, name), name
+        assert screening.is_watchlisted(name) == old_loop(WATCHLIST, name), name
+
+    assert screening.is_pep("DAWIT BEKELE") and not screening.is_pep("JOHN DOE")
+
+
+def test_spacing_and_token_order_do_not_hide_a_listed_name():
+    screening = ScreeningIndex.from_lists(SANCTIONS, WATCHLIST)
+
+    assert screening.is_sanctioned("  doe   John ")
+    assert screening.is_watchlisted("HAILE SARA")
+    assert not screening.is_sanctioned("   ")
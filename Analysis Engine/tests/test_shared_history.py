@@ -0,0 +1,97 @@
+import os
+import pandas as pd
+import pytest
+from app.history.history_store import HistoryStore
+from app.history.shared_history import SharedHistory
+from app.service.data_processing_service import preprocessing
+from tests.factories import make_transactions, history_frame
+
+
+@pytest.fixture
+def base():
+    return history_frame(make_transactions(300, seed=8, prefix="H"))
+
+
+@pytest.fixture
+def live():
+    return preprocessing(pd.DataFrame(make_transactions(30, seed=9, start="2024-01-21", days=1, prefix="L")))
+
+
+def test_a_follower_attaches_to_what_the_leader_published(tmp_path, base, live):
+    leader = SharedHistory(str(tmp_path), chunk_size=16)
+    store = leader.open(load_history=lambda: base.copy())
+    store.extend(live)
+    leader.publish(store, leader.watermark)
+
+    follower = SharedHistory(str(tmp_path), chunk_size=16, can_lead=False)
+    attached = follower.open()
+
+    assert not any(name.endswith(".pkl") for _, _, files in os.walk(tmp_path) for name in files)
+    assert follower.generation == leader.generation == 2
+    assert len(attached) == len(store) == len(base) + len(live)
+
+    for account_no in pd.concat([base, live])['ACCOUNTNO'].unique():
+        assert attached.snapshot().account_history(account_no)['AMOUNTINBIRR'].tolist() == store.snapshot().account_history(account_no)['AMOUNTINBIRR'].tolist()
+
+    assert attached.group_statistics.state().keys() == store.group_statistics.state().keys()
+    for dimension, value in [("BRANCHNAME", "BRANCH 0"), ("TRANSACTIONTYPE", "DEPOSIT"), ("ACCOUNT_AGE_DAYS", int(base['ACCOUNT_AGE_DAYS'].iloc[0]))]:
+        assert attached.group_statistics.get(dimension, value) == pytest.approx(store.group_statistics.get(dimension, value))
+    for amount in (0, 100.0, 1000.0, 10 ** 6):
+        assert attached.group_percentiles.percentile("BRANCHNAME", "BRANCH 1", amount) == store.group_percentiles.percentile("BRANCHNAME", "BRANCH 1", amount)
+    assert attached.value_counts.count("FULL_NAME", "JOHN DOE") == store.value_counts.count("FULL_NAME", "JOHN DOE")
+
+    account_no = live.iloc[-1]['BENACCOUNTNO']
+    end = live['TIMESTAMP'].max()
+    assert attached.snapshot().inbound_amount(account_no, end - pd.Timedelta(days=30), end) == pytest.approx(store.snapshot().inbound_amount(account_no, end - pd.Timedelta(days=30), end))
+
+    leader.stop()
+
+
+def server_process(path, monkeypatch, pid):
+    # another uvicorn worker, its journal is named after its process id
+    with monkeypatch.context() as patched:
+        patched.setattr(os, "getpid", lambda: pid)
+        worker = SharedHistory(path, chunk_size=16)
+        worker.open()
+    assert not worker.is_leader
+    return worker
+
+
+def account_amounts(store, account_no):
+    return sorted(store.snapshot().account_history(account_no)['AMOUNTINBIRR'].tolist())
+
+
+def test_rows_scored_by_any_worker_reach_every_worker(tmp_path, monkeypatch, base, live):
+    leader = SharedHistory(str(tmp_path), chunk_size=16)
+    leader.open(load_history=lambda: base.copy())
+    first, second = server_process(str(tmp_path), monkeypatch, 1), server_process(str(tmp_path), monkeypatch, os.getppid())
+
+    records = live.to_dict('records')
+    for record in records[:20]:
+        assert first.record(record)
+    for record in records[20:]:
+        assert leader.record(record)
+    for worker in (leader, first, second):
+        worker._catch_up()
+
+    workers = (leader, first, second)
+    assert [len(worker.store) for worker in workers] == [len(base) + len(live)] * 3
+    for account_no in live['ACCOUNTNO'].unique():
+        assert account_amounts(first.store, account_no) == account_amounts(second.store, account_no) == account_amounts(leader.store, account_no)
+
+    # after a publish the followers switch without counting a journaled row twice
+    leader.publish(leader.store, leader.watermark)
+    late = preprocessing(pd.DataFrame(make_transactions(5, seed=10, start="2024-01-23", days=1, prefix="N"))).to_dict('records')
+    for record in late:
+        assert second.record(record)
+    for worker in (first, second):
+        worker._follow()
+    leader._catch_up()
+    first._catch_up()
+
+    assert [worker.generation for worker in workers] == [2, 2, 2]
+    assert [len(worker.store) for worker in workers] == [len(base) + len(live) + len(late)] * 3
+    assert first.store.group_statistics.state() == pytest.approx(leader.store.group_statistics.state())
+
+    for worker in workers:
+        worker.stop()
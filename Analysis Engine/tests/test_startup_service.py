@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+from app.service.startup_service import BackgroundStartup
+from tests.factories import make_transactions
+
+
+def test_scoring_answers_503_until_the_history_is_loaded():
+    import main
+
+    # the client is not entered, so the lifespan never starts loading the history
+    client = TestClient(main.app)
+
+    assert client.get("/health/live").status_code == 200
+    ready = client.get("/health/ready")
+    assert ready.status_code == 503 and ready.json()["status"] == "not ready"
+
+    response = client.post("/risk/transaction", json=make_transactions(1, seed=26)[0])
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+
+
+def test_a_failed_initialization_is_retried_until_it_succeeds():
+    attempts = []
+
+    def initializer():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise RuntimeError("database not up yet")
+
+    startup = BackgroundStartup(initializer, retry_seconds=0.01)
+    assert not startup.ready
+    startup.start()
+
+    assert startup.wait(timeout=5)
+    assert startup.stats()["attempts"] == 2
+    assert startup.stats()["state"] == "ready" and startup.stats()["error"] is None
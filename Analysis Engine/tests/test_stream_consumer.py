@@ -0,0 +1,94 @@
+import json
+import pytest
+from app.history.history_store import HistoryStore
+from app.streaming.broker_client import InMemoryBrokerClient
+from app.streaming.stream_consumer import StreamConsumer
+from tests.factories import make_transactions, history_frame
+
+
+class RecordingInsert:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.transaction_ids = []
+        self.customer_profiles = 0
+
+    def __call__(self, transaction_profiles, customer_profiles):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database unavailable")
+        self.transaction_ids += [profile.transaction_id for profile in transaction_profiles]
+        self.customer_profiles += len(customer_profiles)
+
+
+class FlakyCommitClient(InMemoryBrokerClient):
+    def __init__(self, values, failures=1):
+        super().__init__(values)
+        self.failures = failures
+
+    def commit(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("rebalance in progress")
+        super().commit(messages)
+
+
+@pytest.fixture
+def history():
+    return HistoryStore(history_frame(make_transactions(300, seed=1, prefix="H")))
+
+
+@pytest.fixture
+def live():
+    return make_transactions(20, seed=2, start="2024-01-21", days=1, prefix="L")
+
+
+def consume(consumer, client, attempts=5):
+    for _ in range(attempts):
+        try:
+            consumer.run_once()
+        except RuntimeError:
+            continue
+        if client.committed_offset == client._next_offset - 1:
+            return
+    raise AssertionError("the batch was never committed")
+
+
+def test_invalid_messages_are_set_aside_and_the_partition_moves_on(history, live):
+    missing_fields = {key: value for key, value in live[0].items() if key != "ACCOUNTNO"}
+    client = InMemoryBrokerClient([json.dumps(missing_fields), "not json", *[json.dumps(transaction) for transaction in live[1:]]])
+    insert = RecordingInsert()
+    dead_letters = []
+    consumer = StreamConsumer(client, history, insert_profiles=insert, dead_letter=lambda message, reason: dead_letters.append(message.offset))
+
+    assert consumer.run_once() == len(live) - 1
+
+    assert sorted(dead_letters) == [0, 1]
+    assert consumer.skipped == 2
+    assert client.committed_offset == len(live)
+    assert insert.transaction_ids == [transaction["TRANSACTIONID"] for transaction in live[1:]]
+
+
+def test_failed_insert_redelivers_the_batch_and_writes_it_once(history, live):
+    client = InMemoryBrokerClient([json.dumps(transaction) for transaction in live])
+    insert = RecordingInsert(failures=1)
+    rows = len(history)
+    consumer = StreamConsumer(client, history, insert_profiles=insert)
+
+    consume(consumer, client)
+
+    assert insert.transaction_ids == [transaction["TRANSACTIONID"] for transaction in live]
+    assert len(history) == rows + len(live)
+
+
+def test_failed_commit_redelivers_without_writing_profiles_or_history_twice(history, live):
+    client = FlakyCommitClient([json.dumps(transaction) for transaction in live])
+    insert = RecordingInsert()
+    rows = len(history)
+    consumer = StreamConsumer(client, history, insert_profiles=insert)
+
+    consume(consumer, client)
+
+    assert consumer.replayed == len(live)
+    assert insert.transaction_ids == [transaction["TRANSACTIONID"] for transaction in live]
+    assert insert.customer_profiles == len(live)
+    assert len(history) == rows + len(live)
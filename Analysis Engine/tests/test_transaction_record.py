@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+from app.dto.transaction_data import TransactionDataDTO
+from app.dto.transaction_record import NO_LEADING_DIGIT, parse_utc
+from app.service.data_processing_service import preprocessing
+from tests.factories import make_transactions
+
+COLUMNS = ["TIMESTAMP", "TRANSACTIONDATE", "BIRTHDATE", "OPENEDDATE", "CLOSEDDATE", "BRENTFORDIGIT", "ACCOUNTNO", "AMOUNTINBIRR"]
+
+
+@pytest.fixture
+def transactions():
+    transactions = make_transactions(20, seed=21, start="2023-03-01", days=3)
+    transactions[3]["AMOUNTINBIRR"] = -250.0
+    transactions[7]["AMOUNTINBIRR"] = 0.75
+    return transactions
+
+
+def test_a_record_matches_its_row_of_preprocessing(transactions):
+    processed = preprocessing(pd.DataFrame(transactions)).set_index("TRANSACTIONID")
+    assert processed["BRENTFORDIGIT"].dtype == "int64"
+
+    for transaction in transactions:
+        record = TransactionDataDTO(**transaction).to_record()
+        row = processed.loc[transaction["TRANSACTIONID"]]
+        for column in COLUMNS:
+            assert record[column] == row[column] or (pd.isna(record[column]) and pd.isna(row[column])), column
+        assert record["ACCOUNT_AGE_DAYS"] == row["ACCOUNT_AGE_DAYS"]
+        # the same number the history column holds, never the character of an amount without a leading digit
+        assert isinstance(record["BRENTFORDIGIT"], int)
+
+    assert processed.loc[transactions[3]["TRANSACTIONID"], "BRENTFORDIGIT"] == NO_LEADING_DIGIT
+    assert processed.loc[transactions[7]["TRANSACTIONID"], "BRENTFORDIGIT"] == 0
+
+
+def test_a_back_dated_time_of_day_takes_the_transaction_date(transactions):
+    record = TransactionDataDTO(**transactions[0]).to_record()
+
+    assert record["TRANSACTIONTIME"] == record["TIMESTAMP"]
+    assert record["TRANSACTIONTIME"].date() == pd.Timestamp(transactions[0]["TRANSACTIONDATE"]).date()
+    assert parse_utc("10:30:00").date() == pd.Timestamp.now(tz="UTC").date()
@@ -0,0 +1,26 @@
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from app.database.database import get_engine
+from app.dto.transaction_data import TransactionDataDTO
+from app.history.history_store import HistoryStore
+from app.model.transaction_risk_profile import TransactionRiskProfile
+from app.service.scoring_executor import score_transaction, TRANSACTION
+from tests.factories import make_transactions, history_frame
+
+
+def test_a_single_transaction_is_persisted_once_under_its_id():
+    with Session(get_engine()) as session:
+        session.execute(delete(TransactionRiskProfile))
+        session.commit()
+
+    store = HistoryStore(history_frame(make_transactions(200, seed=12, prefix="H")))
+    transaction = make_transactions(1, seed=13, start="2024-01-21", prefix="S")[0]
+
+    # the writer is not started here, profiles are written synchronously
+    for _ in range(2):
+        report = score_transaction(TRANSACTION, TransactionDataDTO(**transaction).to_record(), store.snapshot())["transaction_risk_report"]
+
+    with Session(get_engine()) as session:
+        profiles = session.execute(select(TransactionRiskProfile.transaction_id, TransactionRiskProfile.overall_risk_score)).all()
+
+    assert [tuple(profile) for profile in profiles] == [(transaction["TRANSACTIONID"], report["overall_risk_score"])]
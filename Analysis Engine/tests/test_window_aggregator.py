@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from app.analysis.window_aggregator import WindowAggregator
+
+WINDOWS = [1, 24, 168]
+
+
+def brute_force(df, current_time, hours):
+    window = df[(df["TIMESTAMP"] > current_time - pd.Timedelta(hours=hours)) & (df["TIMESTAMP"] <= current_time)]
+    amounts = window["AMOUNTINBIRR"].dropna()
+    return {"sum": float(amounts.sum()), "count": len(window), "variance": float(amounts.var()) if len(amounts) > 1 else np.nan}
+
+
+def test_the_windows_match_a_filter_over_the_history():
+    rng = np.random.default_rng(5)
+    timestamps = pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(np.sort(rng.integers(0, 14 * 24 * 3600, 400)), unit="s")
+    amounts = rng.choice([np.nan, 10.0, 250.5, 1000.0, 33.3], 400)
+    df = pd.DataFrame({"TIMESTAMP": timestamps, "AMOUNTINBIRR": amounts})
+    # missing timestamps sort last and are never part of a window
+    df.loc[len(df)] = [pd.NaT, 500.0]
+
+    aggregator = WindowAggregator(df)
+    for current_time in list(timestamps[::37]) + [timestamps[0] - pd.Timedelta(hours=1), timestamps[-1] + pd.Timedelta(days=2)]:
+        aggregates = aggregator.aggregate(current_time, WINDOWS)
+        for hours in WINDOWS:
+            expected = brute_force(df, current_time, hours)
+            assert aggregates[hours]["count"] == expected["count"]
+            assert np.isclose(aggregates[hours]["sum"], expected["sum"])
+            assert np.isclose(aggregates[hours]["variance"], expected["variance"], equal_nan=True)
+
+
+def test_a_window_excludes_its_start_and_includes_the_current_time():
+    current_time = pd.Timestamp("2024-01-02", tz="UTC")
+    df = pd.DataFrame({"TIMESTAMP": [current_time - pd.Timedelta(hours=24), current_time - pd.Timedelta(hours=1), current_time],
+                       "AMOUNTINBIRR": [1.0, 2.0, 4.0]})
+
+    aggregates = WindowAggregator(df).aggregate(current_time, [1, 24])
+
+    assert aggregates[1] == {"sum": 4.0, "count": 1, "variance": aggregates[1]["variance"]}
+    assert np.isnan(aggregates[1]["variance"])
+    assert aggregates[24]["sum"] == 6.0 and aggregates[24]["count"] == 2